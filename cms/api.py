@@ -0,0 +1,175 @@
+"""
+Serialisation of `Page`s and `Block`s for the read-only JSON API.
+
+Clients pick the fields they want, JSON:API style, as comma-separated
+`fields[page]` and `fields[block]` parameters, or get `DEFAULT_FIELDS`.
+The costlier `PAGE_RELATIONS` are only available on a single `Page`.
+Lists come `limit` at a time, as `{"results": [...], "next": cursor}`,
+with cursors from `cms.pagination`, except for the change feed, whose
+cursor is a `ChangeEvent.seq`.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+
+from .models import Block, ChangeEvent
+from .pagination import InvalidCursor, paginate
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+PAGE_FIELDS = {
+    'id': lambda page: page.pk,
+    'uuid': lambda page: str(page.uuid),
+    'title': lambda page: page.title,
+    'slug': lambda page: page.slug,
+    'url': lambda page: page.get_absolute_url(),
+    'parent': lambda page: page.parent_id,
+}
+PAGE_RELATIONS = ('breadcrumbs', 'navigation', 'blocks', 'children')
+
+BLOCK_FIELDS = {
+    'id': lambda block: block.pk,
+    'position': lambda block: block.position,
+    'type': lambda block: ContentType.objects.get_for_id(
+        block.polymorphic_ctype_id,
+    ).model,
+    'label': lambda block: block.label,
+    'rendered': lambda block: str(block.get_rendered()),
+    'content': lambda block: block.get_content(),
+}
+
+DEFAULT_FIELDS = {
+    'page': ('id', 'uuid', 'title', 'url', 'parent'),
+    'block': ('id', 'type', 'rendered'),
+}
+
+
+def get_fields(query, type_name, available):
+    value = query.get(f'fields[{type_name}]')
+    if value is None:
+        return DEFAULT_FIELDS[type_name]
+
+    fields = tuple(field for field in value.split(',') if field)
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise InvalidFields(
+            f'Unknown fields for {type_name}: {", ".join(unknown)}',
+        )
+
+    return fields
+
+
+def serialise_blocks(page, query, cursor=None, limit=50):
+    """
+    Lists `page`'s published `Block`s in order.  Unless their content
+    is asked for, or one needs rendering, they're loaded in a single
+    query, without their concrete types' tables.
+    """
+
+    fields = get_fields(query, 'block', BLOCK_FIELDS)
+
+    blocks, next_cursor = paginate(
+        page.blocks.published().non_polymorphic(),
+        ('position', ),
+        cursor=cursor,
+        limit=limit,
+    )
+    if 'content' in fields or (
+            'rendered' in fields
+            and any(block.rendered is None for block in blocks)):
+        blocks = Block.objects.get_real_instances(blocks)
+
+    return {
+        'results': [
+            {field: BLOCK_FIELDS[field](block) for field in fields}
+            for block in blocks
+        ],
+        'next': next_cursor,
+    }
+
+
+def serialise_pages(pages, query, cursor=None, limit=50, fields=None):
+    """
+    Lists `pages` by title.
+    """
+
+    if fields is None:
+        fields = get_fields(query, 'page', PAGE_FIELDS)
+
+    pages, next_cursor = paginate(
+        pages,
+        ('title', 'id'),
+        cursor=cursor,
+        limit=limit,
+    )
+
+    return {
+        'results': [
+            {field: PAGE_FIELDS[field](page) for field in fields}
+            for page in pages
+        ],
+        'next': next_cursor,
+    }
+
+
+def serialise_page(page, query, limit=50):
+    """
+    Serialises `page`, with the first `limit` of any `blocks` or
+    `children` asked for; the rest are at their own endpoints.
+    """
+
+    fields = get_fields(query, 'page', (*PAGE_FIELDS, *PAGE_RELATIONS))
+    relations = {
+        'breadcrumbs': page.get_breadcrumbs,
+        'navigation': page.get_cached_sidebar_links,
+        'blocks': lambda: serialise_blocks(page, query, limit=limit),
+        'children': lambda: serialise_pages(
+            page.children.live(),
+            query,
+            limit=limit,
+            fields=[field for field in fields if field in PAGE_FIELDS],
+        ),
+    }
+
+    return {
+        field: (
+            relations[field]() if field in relations
+            else PAGE_FIELDS[field](page)
+        )
+        for field in fields
+    }
+
+
+def serialise_changes(since, limit=50):
+    """
+    Lists the `ChangeEvent`s after the `seq` `since`, oldest first.
+    """
+
+    try:
+        since = int(since)
+    except (TypeError, ValueError):
+        raise InvalidCursor(since)
+
+    events = list(ChangeEvent.objects.since(since)[:limit + 1])
+
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = events[-1].seq
+
+    return {
+        'results': [
+            {
+                'seq': event.seq,
+                'kind': event.kind,
+                'created': event.created.isoformat(),
+                'page': event.page_id,
+                'block': event.block_id,
+                'reference': event.reference_id,
+            }
+            for event in events
+        ],
+        'next': next_cursor,
+    }
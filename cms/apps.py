@@ -2,6 +2,8 @@ from datetime import timedelta
 import os
 
 from django.apps import AppConfig
+from django.db import connection
+from django.utils.module_loading import import_string
 
 import markdown
 from mdx_bleach.extension import BleachExtension
@@ -17,9 +19,80 @@ class CmsConfig(AppConfig):
     markdown_parser = None
     delete_unsaved_work_after = timedelta(days=4)
     delete_unpublished_blocks_after = timedelta(days=1)
+    # `cms.unsaved_work.WriteBehindStorage` saves on writes, given a
+    # shared cache.
+    unsaved_work_storage_class = 'cms.unsaved_work.DatabaseStorage'
+    unsaved_work_storage = None
+    sweep_chunk_size = 500
+    # How long a render worker can hold `RenderJob`s for before they're
+    # assumed lost with it, and handed to another.
+    render_claim_timeout = timedelta(minutes=10)
+    # Seconds to cache listings of the `Page` tree for; they're
+    # invalidated by changes to the tree anyway, given a shared cache;
+    # see `cms.caching`.
+    page_list_cache_timeout = 60 * 60
+    # Search backends by database vendor.  Search is off on databases
+    # without one; only SQLite's index is created by migrations.
+    search_backend_classes = {
+        'sqlite': 'cms.search.SQLiteSearchBackend',
+    }
+    search_backend = None
+    # Addresses allowed to scrape `/metrics/`, or `None` for anyone.
+    metrics_allowed_ips = ('127.0.0.1', '::1')
+    # Views served to anonymous readers by `ReaderFastPathMiddleware`,
+    # and how long shared caches may keep them.
+    reader_views = (
+        'cms:home',
+        'cms:path_page',
+        'cms:path_page_root',
+        'cms:uuid_page',
+        'cms:api_pages',
+        'cms:api_page',
+        'cms:api_uuid_page',
+        'cms:api_page_blocks',
+        'cms:api_page_children',
+        'cms:api_path_page',
+    )
+    reader_cache_max_age = 60
+    # Database aliases to send readers' queries to, and how many seconds
+    # after writing a client's reads stay on `default` for.  See
+    # `cms.routers`.
+    replica_databases = ()
+    primary_after_write_window = 5
+    # Directory to write sampled profiles of slow requests to, or `None`
+    # to turn profiling off.  See `cms.middleware.ProfilingMiddleware`.
+    profile_output_dir = None
+    profile_requests_slower_than = 1.0
+    profile_every_nth_request = None
+    profile_sample_interval = 0.005
+    profiled_views = (
+        'cms:path_page',
+        'cms:path_page_root',
+        'cms:uuid_page',
+        'cms:edit_block',
+        'cms:add_page',
+        'cms:add_block',
+        'cms:add_block_of_type',
+        'cms:move_page',
+        'cms:move_block',
+        'cms:delete_page',
+    )
 
     def ready(self):
         self.markdown_parser = self._create_markdown_parser()
+        self.unsaved_work_storage = import_string(
+            self.unsaved_work_storage_class,
+        )()
+        self.search_backend = self._create_search_backend()
+
+    def _create_search_backend(self):
+        search_backend_class = self.search_backend_classes.get(
+            connection.vendor,
+        )
+        if search_backend_class is None:
+            return None
+
+        return import_string(search_backend_class)()
 
     def _create_markdown_parser(self):
         here = os.path.dirname(os.path.abspath(__file__))
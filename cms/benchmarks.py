@@ -0,0 +1,361 @@
+"""
+Benchmarks for `manage.py cms_bench`.
+
+Each benchmark builds whatever data it needs inside a transaction which
+is rolled back afterwards, so they're safe to run against a real
+database, and returns a list of JSON-serialisable results.
+"""
+
+from collections import deque, namedtuple
+from contextlib import contextmanager
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from .models import Block, Page, Reference, TextBlock, UnsavedWork
+from .unsaved_work import DatabaseStorage
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    try:
+        with transaction.atomic():
+            yield
+
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+def summarise(durations, queries=None):
+    durations_ms = sorted(duration * 1000 for duration in durations)
+
+    summary = {
+        'runs': len(durations_ms),
+        'mean_ms': statistics.mean(durations_ms),
+        'median_ms': statistics.median(durations_ms),
+        'min_ms': durations_ms[0],
+        'max_ms': durations_ms[-1],
+    }
+    if queries is not None:
+        summary['queries'] = max(queries)
+
+    return summary
+
+
+class QueryCounter(object):
+    """
+    Counts queries as a database execute wrapper; unlike
+    `CaptureQueriesContext`, there's no limit to how many it can see.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+
+        return execute(sql, params, many, context)
+
+
+def measure(func, repeat=1):
+    """
+    Calls `func` `repeat` times, summarising how long each call took and
+    how many queries it made.
+    """
+
+    durations = []
+    queries = []
+    for _run in range(repeat):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+
+        queries.append(counter.count)
+
+    return summarise(durations, queries)
+
+
+def make_text(size, seed=0):
+    """
+    Returns roughly `size` characters of Markdown-ish text.
+    """
+
+    rng = random.Random(seed)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'cms']
+
+    lines = []
+    length = 0
+    while length < size:
+        line = ' '.join(rng.choice(words) for _word in range(12))
+        if rng.random() < 0.1:
+            line = f'## {line}'
+
+        lines.append(line)
+        length += len(line) + 1
+
+    return '\n'.join(lines)
+
+
+def edit_text(text, seed):
+    """
+    Returns `text` with a line changed, as an editor might.
+    """
+
+    lines = text.split('\n')
+    rng = random.Random(seed)
+    lines[rng.randrange(len(lines))] = f'Edit number {seed}.'
+
+    return '\n'.join(lines)
+
+
+def benchmark_unsaved_work(sizes=(10000, 100000, 1000000), stashes=10):
+    """
+    Stashes edits of large `TextBlock`s, comparing stored size and stash
+    latency of plain JSON, compressed, and compressed diffed payloads.
+    """
+
+    modes = {
+        'json': {'compress': False, 'delta': False},
+        'compressed': {'compress': True, 'delta': False},
+        'compressed_delta': {'compress': True, 'delta': True},
+    }
+
+    results = []
+    with rolled_back():
+        user = get_user_model().objects.create(username='cms-bench')
+
+        for size in sizes:
+            content = make_text(size)
+            base = {'content': content}
+
+            for mode, options in modes.items():
+                storage = DatabaseStorage()
+                storage.compress = options['compress']
+
+                durations = []
+                for stash in range(stashes):
+                    work = {'content': edit_text(content, stash)}
+                    path = f'/{mode}/{size}/{stash}/'
+
+                    start = time.perf_counter()
+                    storage.stash(
+                        user,
+                        path,
+                        work,
+                        base=base if options['delta'] else None,
+                    )
+                    durations.append(time.perf_counter() - start)
+
+                stored = UnsavedWork.objects.filter(
+                    user=user,
+                    path__startswith=f'/{mode}/{size}/',
+                ).values_list('work', flat=True)
+                stored_bytes = sum(len(work) for work in stored)
+
+                results.append({
+                    'benchmark': 'unsaved_work',
+                    'content_size': size,
+                    'mode': mode,
+                    'table_bytes': stored_bytes,
+                    'bytes_per_stash': stored_bytes // stashes,
+                    **summarise(durations),
+                })
+
+    return results
+
+
+Site = namedtuple('Site', ('roots', 'pages', 'deepest', 'blocks'))
+
+
+def build_site(
+        pages=200,
+        depth=4,
+        fan_out=5,
+        blocks_per_page=5,
+        reference_density=0.2,
+        block_size=1000,
+        seed=0):
+    """
+    Creates a synthetic site of `pages` `Page`s, breadth first, giving
+    each up to `fan_out` children until `depth` levels deep, with enough
+    top level `Page`s to fill the tree, and `blocks_per_page` published
+    `TextBlock`s each.  On average
+    `reference_density` links to random `Page`s or `Block`s are added to
+    each `Block`.
+    """
+
+    rng = random.Random(seed)
+
+    roots = []
+    created = []
+    queue = deque([(None, 1)])
+    while queue and len(created) < pages:
+        parent, level = queue.popleft()
+
+        siblings = fan_out if parent is not None else max(
+            1, pages // fan_out ** (depth - 1),
+        )
+        for number in range(siblings):
+            if len(created) >= pages:
+                break
+
+            page = Page.objects.create(
+                parent=parent,
+                title=f'Page {len(created)}',
+            )
+            created.append(page)
+            if parent is None:
+                roots.append(page)
+            if level < depth:
+                queue.append((page, level + 1))
+
+    blocks = []
+    for page_number, page in enumerate(created):
+        for position in range(blocks_per_page):
+            blocks.append(TextBlock.objects.create(
+                parent_page=page,
+                position=(position + 1) * 100,
+                content=make_text(block_size, seed=page_number + position),
+                published=True,
+            ))
+
+    for block in blocks:
+        hooks = []
+        count = int(reference_density) + (
+            rng.random() < reference_density % 1
+        )
+        for _reference in range(count):
+            if rng.random() < 0.5:
+                target = {'referenced_page': rng.choice(created)}
+            else:
+                target = {'referenced_block': rng.choice(blocks)}
+
+            reference = Reference.objects.create(
+                containing_block=block,
+                **target,
+            )
+            hooks.append(f'[link]({reference.hook_text})')
+
+        if hooks:
+            block.content += '\n\n' + ' '.join(hooks)
+            TextBlock.objects.filter(pk=block.pk).update(
+                content=block.content,
+            )
+
+    deepest = max(created, key=lambda page: page.denormalised_path.count('/'))
+
+    return Site(roots=roots, pages=created, deepest=deepest, blocks=blocks)
+
+
+def benchmark_site(
+        pages=200,
+        depth=4,
+        fan_out=5,
+        blocks_per_page=5,
+        reference_density=0.2,
+        repeat=10):
+    """
+    Times the hot paths of reading and editing a synthetic site built by
+    `build_site()`.  Each operation's first run may include one-off
+    work, such as rendering `Block`s, so see `median_ms` for the steady
+    state and `max_ms` for the cold one.
+    """
+
+    profile = {
+        'pages': pages,
+        'depth': depth,
+        'fan_out': fan_out,
+        'blocks_per_page': blocks_per_page,
+        'reference_density': reference_density,
+    }
+
+    results = []
+    with rolled_back():
+        site = build_site(**profile)
+        page = site.deepest
+        block = TextBlock.objects.filter(
+            parent_page=page,
+        ).order_by('position').first()
+        # Subtrees one level down, to move and delete, or top level
+        # `Page`s if the site is flat.
+        branches = [
+            candidate for candidate in site.pages
+            if candidate.parent_id == site.roots[0].pk
+        ] or site.roots
+        moved, deleted = branches[0], branches[-1]
+        # Somewhere else to move it to, if there is anywhere.
+        new_parent_id = None
+        if moved.parent_id is None:
+            new_parent_id = next(
+                (root.pk for root in site.roots if root != moved),
+                None,
+            )
+
+        staff = get_user_model().objects.create(
+            username='cms-bench',
+            is_staff=True,
+        )
+        reader = Client()
+        editor = Client()
+        editor.force_login(staff)
+
+        def move_page():
+            # Alternate between the original parent and the new one, so
+            # every run moves the whole subtree.
+            subtree = Page.objects.get(pk=moved.pk)
+            subtree.parent_id = (
+                new_parent_id if subtree.parent_id == moved.parent_id
+                else moved.parent_id
+            )
+            subtree.save()
+
+        def redistribute_positions():
+            Block.objects.filter(parent_page=page).redistribute_positions()
+
+        def delete_page():
+            subtree = Page.objects.get(pk=deleted.pk)
+            with rolled_back():
+                # Links from elsewhere would protect the subtree.
+                Reference.objects.to_subtree(subtree).delete()
+                subtree.delete()
+
+        operations = {
+            'page_view': lambda: reader.get(page.get_absolute_url()),
+            'sidebar_links': page.get_sidebar_links,
+            'breadcrumbs': page.get_breadcrumbs,
+            'render': block.render,
+            'move_page': move_page,
+            'position_after': lambda: page.get_position_after(block),
+            'redistribute_positions': redistribute_positions,
+            'delete_preview': lambda: editor.get(
+                reverse('cms:delete_page', kwargs={'pk': deleted.pk}),
+            ),
+            'delete_page': delete_page,
+        }
+        for operation, func in operations.items():
+            results.append({
+                'benchmark': 'site',
+                'operation': operation,
+                **profile,
+                **measure(func, repeat),
+            })
+
+    return results
+
+
+BENCHMARKS = {
+    'site': benchmark_site,
+    'unsaved_work': benchmark_unsaved_work,
+}
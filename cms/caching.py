@@ -0,0 +1,96 @@
+"""
+Caching of data derived from the shape of the `Page` tree.
+
+Rather than tracking down every cached listing a change could affect,
+cache keys include a tree version, which `Page`s replace whenever they
+are added, deleted, renamed or moved.  The version is replaced once the
+change commits, with `transaction.on_commit()`; replaced any earlier,
+other connections could cache the tree as it was before the change
+against the new version.  Stale entries are simply never read again,
+and expire in their own time.
+
+Every process must see the same version, so the default cache must be
+shared between processes, e.g. memcached or Redis.  `manage.py check
+--deploy` warns about caches which aren't.
+"""
+
+from uuid import uuid4
+
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+from . import instrumentation
+from .routers import current_replica
+
+
+TREE_VERSION_KEY = 'cms:tree-version'
+# Backends which are local to a process, so would miss other processes'
+# changes to the tree.
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_cache_is_shared(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PROCESS_LOCAL_CACHE_BACKENDS:
+        return [checks.Warning(
+            f'The default cache, {backend}, is local to each process, so'
+            ' processes will serve listings of the page tree from before'
+            ' one another\'s changes.',
+            hint='Use a cache shared between processes, such as memcached.',
+            id='cms.W001',
+        )]
+
+    return []
+
+
+def get_tree_version():
+    version = cache.get(TREE_VERSION_KEY)
+    instrumentation.record_cache_lookup(version is not None)
+    if version is None:
+        # Evicted, or never set; anything cached against the old
+        # version can't be trusted, so start a new one.
+        version = new_tree_version()
+
+    return version
+
+
+def new_tree_version():
+    # Random rather than incremented, so a version can't be reused
+    # after being evicted.
+    version = uuid4().hex
+    cache.set(TREE_VERSION_KEY, version, None)
+
+    return version
+
+
+def make_tree_key(name, *parts):
+    return ':'.join(['cms', name, get_tree_version(), *map(str, parts)])
+
+
+def get_or_set(key, compute):
+    """
+    Returns the value cached under `key`, from `make_tree_key()`, or
+    caches and returns `compute()` if there isn't one.
+    """
+
+    value = cache.get(key)
+    instrumentation.record_cache_lookup(value is not None)
+    if value is not None:
+        return value
+
+    value = compute()
+
+    config = apps.get_app_config('cms')
+    timeout = config.page_list_cache_timeout
+    if current_replica() is not None:
+        # The replica may not have caught up with the change that
+        # made this tree version yet.
+        timeout = min(timeout, config.primary_after_write_window)
+    cache.set(key, value, timeout)
+
+    return value
@@ -0,0 +1,117 @@
+"""
+Streaming export of the whole site, in the format `cms.importing`
+reads, for `manage.py export_site` and `ExportView`.
+
+`Page`s come ordered by `(denormalised_path, slug)`, which puts every
+`Page` after its parent, then `Block`s by `Page` and position, then
+`Reference`s.  Rows are read as tuples, a chunk at a time with
+`.iterator()`, so memory use doesn't grow with the site.  `Page`s being
+deleted are left out, along with everything on or linking into them.
+
+Everything is read in one transaction, so the export is a consistent
+snapshot, without `Block`s whose `Page`s were created, or `Reference`s
+whose `Block`s were deleted, part way through.  On PostgreSQL this needs
+`REPEATABLE READ`, which is asked for unless the export is already
+running inside a transaction, when it's up to the caller.  Edits aren't
+held up by it, but on SQLite without WAL they wait for it to finish.
+"""
+
+import json
+
+from django.apps import apps
+from django.db import connections, router, transaction
+
+from .models import Block, Page, Reference
+
+
+def get_block_types():
+    return [
+        model for model in apps.get_app_config('cms').get_models()
+        if issubclass(model, Block) and model.content_field is not None
+    ]
+
+
+def export_pages(chunk_size, using):
+    pages = Page.objects.using(using).live().order_by(
+        'denormalised_path',
+        'slug',
+    ).values_list('id', 'uuid', 'parent', 'title', 'slug')
+
+    for page_id, uuid, parent_id, title, slug in pages.iterator(chunk_size):
+        yield {
+            'type': 'page',
+            'id': page_id,
+            'uuid': str(uuid),
+            'parent': parent_id,
+            'title': title,
+            'slug': slug,
+        }
+
+
+def export_blocks(chunk_size, using):
+    for block_type in get_block_types():
+        blocks = block_type.objects.using(using).filter(
+            parent_page__pending_deletion=False,
+        ).order_by('parent_page', 'position').values_list(
+            'id',
+            'parent_page',
+            'position',
+            'published',
+            block_type.content_field,
+        )
+
+        for block_id, page_id, position, published, content in (
+                blocks.iterator(chunk_size)):
+            yield {
+                'type': 'block',
+                'id': block_id,
+                'page': page_id,
+                'block_type': block_type._meta.model_name,
+                'position': position,
+                'published': published,
+                'content': content,
+            }
+
+
+def export_references(chunk_size, using):
+    references = Reference.objects.using(using).filter(
+        containing_block__parent_page__pending_deletion=False,
+        target_page__pending_deletion=False,
+    ).order_by('id').values_list(
+        'id',
+        'containing_block',
+        'referenced_page',
+        'referenced_block',
+    )
+
+    for reference_id, block_id, page_id, referenced_block_id in (
+            references.iterator(chunk_size)):
+        yield {
+            'type': 'reference',
+            'id': reference_id,
+            'block': block_id,
+            'referenced_page': page_id,
+            'referenced_block': referenced_block_id,
+        }
+
+
+def export_site(chunk_size=2000):
+    """
+    Yields the site as lines of JSON, as of a single moment.
+    """
+
+    using = router.db_for_read(Page)
+    connection = connections[using]
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using=using):
+        if outermost and connection.vendor == 'postgresql':
+            # The default `READ COMMITTED` snapshots each query.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ'
+                    ' READ ONLY',
+                )
+
+        for exporter in (export_pages, export_blocks, export_references):
+            for record in exporter(chunk_size, using):
+                yield f'{json.dumps(record, sort_keys=True)}\n'
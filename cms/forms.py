@@ -1,38 +1,106 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 
 from .models import Block, Page, Reference, TextBlock
 
 
-class PageForm(forms.ModelForm):
+class LivePageFormMixin(object):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        for field_name in self.live_page_fields:
+            field = self.fields[field_name]
+            field.queryset = field.queryset.filter(pending_deletion=False)
+
+
+class AutocompleteInput(forms.Widget):
+    """
+    A search box backed by a JSON endpoint, for choosing from more
+    objects than could sensibly be rendered into a `<select>`.  The
+    endpoint is passed `q`, and the value of the `forward` field, if
+    any, as `forward`.
+    """
+
+    template_name = 'cms/widgets/autocomplete.html'
+
+    def __init__(self, url, forward=None, attrs=None):
+        super().__init__(attrs)
+
+        self.url = url
+        self.forward = forward
+
+    def get_label(self, value):
+        # `choices` is the field's `ModelChoiceIterator`; use it to
+        # look up the current choice only, rather than iterating it.
+        if value in self.choices.field.empty_values:
+            return ''
+
+        try:
+            instance = self.choices.queryset.get(pk=value)
+        except (self.choices.queryset.model.DoesNotExist, ValueError):
+            return ''
+
+        return self.choices.field.label_from_instance(instance)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+
+        context['widget'].update({
+            'url': str(self.url),
+            'forward': self.forward,
+            'label': self.get_label(value),
+        })
+
+        return context
+
+
+class PageAutocompleteInput(AutocompleteInput):
+
+    def __init__(self, attrs=None):
+        super().__init__(url=reverse_lazy('cms:page_search'), attrs=attrs)
+
+
+class PageForm(LivePageFormMixin, forms.ModelForm):
+    live_page_fields = ('parent', )
 
     class Meta:
         fields = ('parent', 'title', 'slug')
         model = Page
+        widgets = {'parent': PageAutocompleteInput()}
 
 
-class MovePageForm(forms.ModelForm):
+class MovePageForm(LivePageFormMixin, forms.ModelForm):
+    live_page_fields = ('parent', )
 
     class Meta:
         fields = ('parent', )
         model = Page
+        widgets = {'parent': PageAutocompleteInput()}
 
 
 class BlockChoiceField(forms.ModelChoiceField):
 
     def label_from_instance(self, obj):
-        return f'{obj.parent_page} - {obj}'
+        return obj.label or f'Block {obj.pk}'
 
 
-class MoveBlockForm(forms.ModelForm):
+class MoveBlockForm(LivePageFormMixin, forms.ModelForm):
+    live_page_fields = ('parent_page', )
     after = BlockChoiceField(
-        queryset=Block.objects.order_by('parent_page', 'position'),
+        queryset=Block.objects.all(),
         required=False,
+        widget=AutocompleteInput(
+            url=reverse_lazy('cms:block_autocomplete'),
+            forward='parent_page',
+        ),
     )
 
     class Meta:
         fields = ('parent_page', )
         model = Block
+        widgets = {'parent_page': PageAutocompleteInput()}
 
     def clean(self):
         cleaned_data = super().clean()
@@ -81,7 +149,8 @@ class TextBlockForm(GenericBlockForm):
         model = TextBlock
 
 
-class ReferenceForm(forms.ModelForm):
+class ReferenceForm(LivePageFormMixin, forms.ModelForm):
+    live_page_fields = ('referenced_page', )
 
     class Meta:
         fields = ('referenced_page', 'referenced_block')
@@ -90,6 +159,11 @@ class ReferenceForm(forms.ModelForm):
     def __init__(self, containing_block, **kwargs):
         super().__init__(**kwargs)
 
+        self.fields['referenced_block'].queryset = (
+            self.fields['referenced_block'].queryset
+            .filter(parent_page__pending_deletion=False)
+        )
+
         self._containing_block = containing_block
 
     def save(self, *args, **kwargs):
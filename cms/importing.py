@@ -0,0 +1,392 @@
+"""
+Bulk import of whole sites, for `manage.py import_site`.
+
+Sites are streamed as JSON lines, one object per line, each with a
+`type`:
+
+    {"type": "page", "id": 1, "parent": null, "title": "Guide",
+     "slug": "guide", "uuid": "..."}
+    {"type": "block", "id": 1, "page": 1, "block_type": "textblock",
+     "position": 100, "published": true, "content": "See !ref(1)."}
+    {"type": "reference", "id": 1, "block": 1, "referenced_page": 1,
+     "referenced_block": null}
+
+`Page`s must come after their parents, and `Block`s after their
+`Page`s; `Reference`s may come anywhere.  `slug`, `uuid`, `position`
+and `block_type` may be left out.  A tar archive of such files is read
+a member at a time.
+
+`Page.save()` and friends cost several queries a row, so they're
+bypassed: paths, titles, positions and labels are worked out in memory,
+and rows inserted with `bulk_create()` a chunk at a time, parents first.
+IDs are offset past the highest already in use, so importing into an
+empty database keeps them, and hooks in content are rewritten to match.
+`Reference`s are inserted once everything they could point at is, and
+then every published `Block`'s hooks are validated in bulk.
+"""
+
+import json
+import tarfile
+from uuid import uuid4
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.text import slugify
+
+from .caching import new_tree_version
+from .models import Block, ChangeEvent, Page, Reference
+
+
+# `PositiveSmallIntegerField`'s limit.
+MAX_POSITION = 32767
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+def read_lines(lines):
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise InvalidImport(f'Line {number} is not JSON.')
+
+
+def read_tar(fileobj):
+    # Streamed, so it can be piped in.
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile():
+                yield from read_lines(archive.extractfile(member))
+
+
+def get_max_id(model):
+    return model.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+
+
+class SiteImporter(object):
+
+    def __init__(self, parent=None, chunk_size=1000, new_uuids=False):
+        self.chunk_size = chunk_size
+        self.new_uuids = new_uuids
+        self.search_backend = apps.get_app_config('cms').search_backend
+
+        self.page_offset = get_max_id(Page)
+        self.block_offset = get_max_id(Block)
+        self.reference_offset = get_max_id(Reference)
+
+        self.root_id = None if parent is None else parent.pk
+        # New `Page` IDs to the `denormalised_path` and
+        # `denormalised_titles` their children get.
+        self.subtrees = {None: ('', '')}
+        if parent is not None:
+            self.subtrees[parent.pk] = (
+                parent.get_subtree_path(),
+                '\n'.join(
+                    part for part in [parent.denormalised_titles, parent.title]
+                    if part
+                ),
+            )
+        # New `Page` IDs to the last `Block` position given out on them.
+        self.last_positions = {}
+        # New `Block` IDs to their `Page`s', for `Reference`s' targets.
+        self.block_pages = {}
+        self.published_block_ids = []
+
+        self.block_types = {
+            model._meta.model_name: model
+            for model in apps.get_app_config('cms').get_models()
+            if issubclass(model, Block) and model.content_field is not None
+        }
+        self.block_type_ids = {
+            name: ContentType.objects.get_for_model(
+                model,
+                for_concrete_model=False,
+            ).pk
+            for name, model in self.block_types.items()
+        }
+
+        self.pages = []
+        self.blocks = []
+        self.references = []
+        self.counts = {'pages': 0, 'blocks': 0, 'references': 0}
+
+    def rewrite_hooks(self, content):
+        return Reference.generic_hook_re.sub(
+            lambda match: (
+                f'{Reference.hook}'
+                f'({int(match.group("ref")) + self.reference_offset})'
+            ),
+            content,
+        )
+
+    def add_page(self, record):
+        page_id = record['id'] + self.page_offset
+        parent_id = record.get('parent')
+        if parent_id is None:
+            parent_id = self.root_id
+        else:
+            parent_id += self.page_offset
+            if parent_id not in self.subtrees:
+                raise InvalidImport(
+                    f'Page {record["id"]} comes before its parent.'
+                )
+
+        path, titles = self.subtrees[parent_id]
+        title = record['title']
+        page = Page(
+            id=page_id,
+            uuid=(
+                uuid4() if self.new_uuids or 'uuid' not in record
+                else record['uuid']
+            ),
+            parent_id=parent_id,
+            denormalised_path=path,
+            denormalised_titles=titles,
+            title=title,
+            slug=record.get('slug') or slugify(title, allow_unicode=True),
+        )
+        page.update_search_keys()
+        self.subtrees[page_id] = (
+            page.get_subtree_path(),
+            '\n'.join(part for part in [titles, title] if part),
+        )
+
+        self.pages.append(page)
+        if len(self.pages) >= self.chunk_size:
+            self.flush_pages()
+
+    def get_position(self, page_id, position):
+        if position is None:
+            last = self.last_positions.get(page_id)
+            if last is None:
+                position = 100
+            elif last + 100 <= MAX_POSITION:
+                position = last + 100
+            else:
+                position = last + 1
+
+        if position > MAX_POSITION:
+            raise InvalidImport(f'Page {page_id} has too many blocks.')
+
+        self.last_positions[page_id] = position
+
+        return position
+
+    def add_block(self, record):
+        block_type_name = record.get('block_type', 'textblock')
+        block_type = self.block_types.get(block_type_name)
+        if block_type is None:
+            raise InvalidImport(f'Unknown block type {block_type_name}.')
+
+        block_id = record['id'] + self.block_offset
+        page_id = record['page'] + self.page_offset
+        if page_id not in self.subtrees:
+            raise InvalidImport(
+                f'Block {record["id"]} comes before its page.'
+            )
+
+        block = block_type(
+            pk=block_id,
+            id=block_id,
+            parent_page_id=page_id,
+            position=self.get_position(page_id, record.get('position')),
+            published=record.get('published', False),
+            polymorphic_ctype_id=self.block_type_ids[block_type_name],
+            **{
+                block_type.content_field: self.rewrite_hooks(
+                    record.get('content', ''),
+                ),
+            },
+        )
+        block.update_label()
+
+        self.block_pages[block_id] = page_id
+        if block.published:
+            self.published_block_ids.append(block_id)
+
+        self.blocks.append(block)
+        if len(self.blocks) >= self.chunk_size:
+            self.flush_blocks()
+
+    def add_reference(self, record):
+        # Kept until every `Block` it could refer to is in.
+        self.references.append(record)
+
+    def flush_pages(self):
+        if not self.pages:
+            return
+
+        Page.objects.bulk_create(self.pages)
+        ChangeEvent.objects.bulk_create(
+            ChangeEvent(kind=ChangeEvent.PAGE_CREATED, page_id=page.pk)
+            for page in self.pages
+        )
+        if self.search_backend is not None:
+            self.search_backend.index_pages(
+                [(page.pk, page.title) for page in self.pages],
+            )
+
+        self.counts['pages'] += len(self.pages)
+        self.pages = []
+
+    def insert_concrete_rows(self, block_type, blocks):
+        # Django won't `bulk_create()` multi-table inherited models, so
+        # the concrete type's own table is filled in by hand.
+        fields = block_type._meta.local_concrete_fields
+        quote_name = connection.ops.quote_name
+        columns = ', '.join(quote_name(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        rows = [
+            [
+                field.get_db_prep_save(
+                    getattr(block, field.attname),
+                    connection,
+                )
+                for field in fields
+            ]
+            for block in blocks
+        ]
+
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {quote_name(block_type._meta.db_table)}'
+                f' ({columns}) VALUES ({placeholders})',
+                rows,
+            )
+
+    def flush_blocks(self):
+        # `Block`s need their `Page`s in first.
+        self.flush_pages()
+        if not self.blocks:
+            return
+
+        base_fields = [field.attname for field in Block._meta.concrete_fields]
+        Block.objects.non_polymorphic().bulk_create(
+            Block(**{
+                attname: getattr(block, attname) for attname in base_fields
+            })
+            for block in self.blocks
+        )
+
+        by_type = {}
+        for block in self.blocks:
+            by_type.setdefault(type(block), []).append(block)
+        for block_type, blocks in by_type.items():
+            self.insert_concrete_rows(block_type, blocks)
+
+        published = [block for block in self.blocks if block.published]
+        ChangeEvent.objects.bulk_create(
+            ChangeEvent(
+                kind=ChangeEvent.BLOCK_PUBLISHED,
+                page_id=block.parent_page_id,
+                block_id=block.pk,
+            )
+            for block in published
+        )
+        if self.search_backend is not None:
+            self.search_backend.index_blocks([
+                (block.pk, block.parent_page_id, block.get_content())
+                for block in published
+            ])
+
+        self.counts['blocks'] += len(self.blocks)
+        self.blocks = []
+
+    def make_reference(self, record):
+        block_id = record['block'] + self.block_offset
+        if block_id not in self.block_pages:
+            raise InvalidImport(
+                f'Reference {record["id"]} is in a block not imported.'
+            )
+
+        reference = Reference(
+            id=record['id'] + self.reference_offset,
+            containing_block_id=block_id,
+        )
+        if record.get('referenced_block') is not None:
+            reference.referenced_block_id = (
+                record['referenced_block'] + self.block_offset
+            )
+            target_page_id = self.block_pages.get(
+                reference.referenced_block_id,
+            )
+        elif record.get('referenced_page') is not None:
+            target_page_id = record['referenced_page'] + self.page_offset
+            if target_page_id not in self.subtrees:
+                target_page_id = None
+            reference.referenced_page_id = target_page_id
+        else:
+            target_page_id = None
+
+        if target_page_id is None:
+            raise InvalidImport(
+                f'Reference {record["id"]} refers to nothing imported.'
+            )
+        reference.target_page_id = target_page_id
+
+        return reference
+
+    def insert_references(self):
+        for start in range(0, len(self.references), self.chunk_size):
+            Reference.objects.bulk_create(
+                self.make_reference(record) for record
+                in self.references[start:start + self.chunk_size]
+            )
+
+        self.counts['references'] += len(self.references)
+        self.references = []
+
+    def validate_references(self):
+        for start in range(0, len(self.published_block_ids), self.chunk_size):
+            block_ids = self.published_block_ids[start:start + self.chunk_size]
+            try:
+                Block.objects.filter(pk__in=block_ids).validate_references()
+            except ValidationError as e:
+                raise InvalidImport('\n'.join(e.messages))
+
+    def run(self, records):
+        """
+        Imports `records`, all or nothing, and returns how many of each
+        were imported.  Raises `InvalidImport` if they don't make sense.
+        """
+
+        handlers = {
+            'page': self.add_page,
+            'block': self.add_block,
+            'reference': self.add_reference,
+        }
+
+        with transaction.atomic():
+            for record in records:
+                handler = handlers.get(record.get('type'))
+                if handler is None:
+                    raise InvalidImport(f'Unknown record type in {record}.')
+
+                try:
+                    handler(record)
+                except KeyError as e:
+                    raise InvalidImport(f'{record} is missing {e}.')
+
+            self.flush_blocks()
+            self.insert_references()
+            self.validate_references()
+
+            # Postgres and friends need telling about the IDs we chose.
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                        no_style(), [Page, Block, Reference]):
+                    cursor.execute(sql)
+
+            transaction.on_commit(new_tree_version)
+
+        return self.counts
@@ -0,0 +1,174 @@
+"""
+Per-request measurements of where the time goes.
+
+`cms.middleware.InstrumentationMiddleware` starts a `RequestMetrics`
+for each request, which the code doing the work adds to through the
+functions here: database queries are counted by an execute wrapper,
+and template and markdown rendering and cache lookups report
+themselves.  Outside
+a request these functions do nothing, so they're free to call from
+management commands and tests.
+
+Finished requests are folded into `view_aggregates`, per view, for the
+lifetime of the process.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+import threading
+import time
+
+from . import metrics
+
+
+_local = threading.local()
+
+
+class RequestMetrics(object):
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        # `Block` ID to seconds spent rendering its markdown.
+        self.markdown_times = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def markdown_time(self):
+        return sum(self.markdown_times.values())
+
+    def __call__(self, execute, sql, params, many, context):
+        # Used as a database execute wrapper.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def start_request():
+    _local.metrics = RequestMetrics()
+
+    return _local.metrics
+
+
+def finish_request():
+    _local.metrics = None
+
+
+def current():
+    """
+    Returns the `RequestMetrics` for the request being handled by this
+    thread, if any.
+    """
+
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def measure_markdown(block_id):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        metrics.markdown_render_duration.observe(duration)
+
+        request_metrics = current()
+        if request_metrics is not None:
+            request_metrics.markdown_times[block_id] = (
+                request_metrics.markdown_times.get(block_id, 0.0) + duration
+            )
+
+
+@contextmanager
+def measure_templates():
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_metrics = current()
+        if request_metrics is not None:
+            request_metrics.template_time += time.perf_counter() - start
+
+
+def record_cache_lookup(hit):
+    metrics.cache_lookups.inc(result='hit' if hit else 'miss')
+
+    request_metrics = current()
+    if request_metrics is None:
+        return
+
+    if hit:
+        request_metrics.cache_hits += 1
+    else:
+        request_metrics.cache_misses += 1
+
+
+class ViewAggregates(object):
+    """
+    Running totals of `RequestMetrics`, per view.
+    """
+
+    fields = (
+        'total_time',
+        'queries',
+        'db_time',
+        'template_time',
+        'markdown_time',
+        'cache_hits',
+        'cache_misses',
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(self._new_view)
+
+    def _new_view(self):
+        return {
+            'requests': 0,
+            'max_total_time': 0.0,
+            **{field: 0 for field in self.fields},
+        }
+
+    def add(self, view_name, metrics, total_time):
+        values = {
+            'total_time': total_time,
+            'queries': metrics.queries,
+            'db_time': metrics.db_time,
+            'template_time': metrics.template_time,
+            'markdown_time': metrics.markdown_time,
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+        }
+
+        with self._lock:
+            view = self._views[view_name]
+            view['requests'] += 1
+            view['max_total_time'] = max(view['max_total_time'], total_time)
+            for field, value in values.items():
+                view[field] += value
+
+    def snapshot(self):
+        """
+        Returns a copy of the totals, with means, keyed by view name.
+        """
+
+        with self._lock:
+            views = {name: dict(view) for name, view in self._views.items()}
+
+        for view in views.values():
+            for field in self.fields:
+                view[f'mean_{field}'] = view[field] / view['requests']
+
+        return views
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+view_aggregates = ViewAggregates()
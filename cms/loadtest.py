@@ -0,0 +1,427 @@
+"""
+An HTTP load test for `manage.py cms_loadtest`.
+
+A mix of reader and editor scenarios is replayed against the project's
+WSGI application, either called in-process or served on localhost, and
+each request is timed from the client's side.  The queries each request
+made are counted by wrapping the application, so counts are exact in
+either mode.
+
+The sequence of scenarios is drawn up front from a seeded generator,
+so runs with the same options make the same requests, whatever the
+concurrency.
+"""
+
+from collections import defaultdict, namedtuple
+import http.client
+from io import BytesIO
+import queue
+import random
+from socketserver import ThreadingMixIn
+import statistics
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+from wsgiref.simple_server import (
+    WSGIRequestHandler,
+    WSGIServer,
+    make_server,
+)
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test import Client
+
+from .benchmarks import QueryCounter
+from .models import Page, TextBlock
+
+
+QUERY_COUNT_HEADER = 'X-CMS-Load-Test-Queries'
+
+Response = namedtuple('Response', ('status', 'headers', 'elapsed'))
+
+
+class QueryCountingApplication(object):
+    """
+    Wraps a WSGI application, adding a header with the number of
+    queries made whilst handling each request.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        counter = QueryCounter()
+
+        def counting_start_response(status, headers, exc_info=None):
+            headers = headers + [(QUERY_COUNT_HEADER, str(counter.count))]
+
+            return start_response(status, headers, exc_info)
+
+        with connection.execute_wrapper(counter):
+            return self.application(environ, counting_start_response)
+
+
+class InProcessTransport(object):
+    """
+    Calls the WSGI application directly, in the calling thread.
+    """
+
+    def __init__(self, application):
+        self.application = QueryCountingApplication(application)
+
+    def request(self, method, path, body=b'', headers=None):
+        url = urlsplit(path)
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in (headers or {}).items():
+            if name.lower() == 'content-type':
+                environ['CONTENT_TYPE'] = value
+            else:
+                environ[f'HTTP_{name.upper().replace("-", "_")}'] = value
+
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = dict(response_headers)
+
+        start = time.perf_counter()
+        result = self.application(environ, start_response)
+        try:
+            for _chunk in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        elapsed = time.perf_counter() - start
+
+        return Response(started['status'], started['headers'], elapsed)
+
+    def close(self):
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class LocalhostTransport(object):
+    """
+    Serves the WSGI application on a free localhost port, a thread per
+    request, and makes real HTTP requests to it.
+    """
+
+    def __init__(self, application):
+        def close_connections(environ, start_response):
+            # Each request gets its own thread, and so connection.
+            try:
+                return application(environ, start_response)
+            finally:
+                connections.close_all()
+
+        self.server = make_server(
+            '127.0.0.1',
+            0,
+            QueryCountingApplication(close_connections),
+            server_class=ThreadingWSGIServer,
+            handler_class=QuietWSGIRequestHandler,
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True,
+        )
+        self.thread.start()
+
+    def request(self, method, path, body=b'', headers=None):
+        host, port = self.server.server_address
+
+        start = time.perf_counter()
+        http_connection = http.client.HTTPConnection(host, port)
+        try:
+            http_connection.request(method, path, body, headers or {})
+            response = http_connection.getresponse()
+            response.read()
+        finally:
+            http_connection.close()
+        elapsed = time.perf_counter() - start
+
+        return Response(response.status, dict(response.getheaders()), elapsed)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+TRANSPORTS = {
+    'in-process': InProcessTransport,
+    'localhost': LocalhostTransport,
+}
+
+
+class Session(object):
+    """
+    Makes requests as a reader, or as an editor with the given session
+    cookie, recording each against an endpoint name.
+    """
+
+    def __init__(self, transport, record, session_key=None):
+        self.transport = transport
+        self.record = record
+
+        # As a browser would have been given with a form: the cookie,
+        # and a token to send back which matches it.
+        request = HttpRequest()
+        self.csrf_token = get_token(request)
+
+        cookies = {settings.CSRF_COOKIE_NAME: request.META['CSRF_COOKIE']}
+        if session_key is not None:
+            cookies[settings.SESSION_COOKIE_NAME] = session_key
+        self.cookie = '; '.join(f'{k}={v}' for k, v in cookies.items())
+
+    def request(self, endpoint, method, path, data=None):
+        headers = {'Cookie': self.cookie}
+        body = b''
+        if data is not None:
+            body = urlencode(data).encode()
+            headers.update({
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-CSRFToken': self.csrf_token,
+            })
+
+        response = self.transport.request(method, path, body, headers)
+        self.record(endpoint, response)
+
+        return response
+
+    def get(self, endpoint, path):
+        return self.request(endpoint, 'GET', path)
+
+    def post(self, endpoint, path, data):
+        return self.request(endpoint, 'POST', path, data)
+
+
+def read_page_by_path(reader, editor, site, rng):
+    page = rng.choice(site.unmoved)
+    reader.get('page_by_path', page.get_absolute_url())
+
+
+def read_page_by_uuid(reader, editor, site, rng):
+    reader.get('page_by_uuid', f'/{rng.choice(site.pages).uuid}/')
+
+
+def read_home(reader, editor, site, rng):
+    reader.get('home', '/')
+
+
+def edit_block(reader, editor, site, rng):
+    path = f'/edit-block/{rng.choice(site.block_ids)}/'
+
+    editor.get('edit_block_form', path)
+    editor.post('edit_block_submit', path, {
+        'content': f'# Edited\n\nEdit number {rng.random()}.',
+    })
+
+
+def move_page(reader, editor, site, rng):
+    # Only leaves are moved, as they can't be moved beneath themselves,
+    # and they're moved back again so the tree keeps its shape.
+    page = rng.choice(site.leaves)
+    path = f'/move-page/{page.pk}/'
+
+    editor.get('move_page_form', path)
+    editor.post('move_page_submit', path, {
+        'parent': rng.choice(site.roots).pk,
+    })
+    editor.post('move_page_submit', path, {'parent': page.parent_id or ''})
+
+
+def add_block(reader, editor, site, rng):
+    page = rng.choice(site.pages)
+    response = editor.post(
+        'add_block_choose_type',
+        f'/add-block/?{urlencode({"page": page.uuid})}',
+        {'blocktype': 'textblock'},
+    )
+
+    location = urlsplit(response.headers['Location'])
+    path = f'{location.path}?{location.query}'
+    editor.get('add_block_form', path)
+    editor.post('add_block_submit', path, {
+        'content': f'# Added\n\nBlock number {rng.random()}.',
+    })
+
+
+# Scenarios, and how often they're picked relative to each other.
+SCENARIOS = {
+    read_page_by_path: 50,
+    read_page_by_uuid: 15,
+    read_home: 15,
+    edit_block: 8,
+    move_page: 4,
+    add_block: 8,
+}
+
+LoadTestSite = namedtuple(
+    'LoadTestSite',
+    ('pages', 'roots', 'leaves', 'unmoved', 'block_ids'),
+)
+
+
+def load_site():
+    pages = list(Page.objects.live().order_by('pk'))
+    parent_ids = {page.parent_id for page in pages}
+    leaves = [page for page in pages if page.pk not in parent_ids]
+
+    return LoadTestSite(
+        pages=pages,
+        roots=[page for page in pages if page.parent_id is None],
+        leaves=leaves,
+        # Readers look up `Page`s whose paths `move_page()` won't be
+        # changing underneath them.
+        unmoved=[page for page in pages if page not in leaves] or pages,
+        block_ids=list(
+            TextBlock.objects.order_by('pk').values_list('pk', flat=True),
+        ),
+    )
+
+
+def make_editor_session_key():
+    editor = get_user_model().objects.create(
+        username='cms-load-test',
+        is_staff=True,
+    )
+    client = Client()
+    client.force_login(editor)
+
+    return client.session.session_key
+
+
+def percentile(sorted_values, percent):
+    """
+    Returns the nearest-rank `percent`th percentile of `sorted_values`.
+    """
+
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+
+    return sorted_values[int(rank) - 1]
+
+
+def summarise(responses, wall_time):
+    durations_ms = sorted(response.elapsed * 1000 for response in responses)
+    queries = [
+        int(response.headers.get(QUERY_COUNT_HEADER, 0))
+        for response in responses
+    ]
+
+    return {
+        'requests': len(responses),
+        'errors': sum(response.status >= 400 for response in responses),
+        'throughput_rps': len(responses) / wall_time,
+        'mean_ms': statistics.mean(durations_ms),
+        'p50_ms': percentile(durations_ms, 50),
+        'p95_ms': percentile(durations_ms, 95),
+        'p99_ms': percentile(durations_ms, 99),
+        'max_ms': durations_ms[-1],
+        'mean_queries': statistics.mean(queries),
+        'max_queries': max(queries),
+    }
+
+
+def run_load_test(application, transport='in-process', scenarios=200,
+                  concurrency=4, seed=0):
+    """
+    Runs `scenarios` scenarios, drawn from `SCENARIOS`, over
+    `concurrency` threads against `application`, and returns a summary
+    per endpoint and overall.  The database should already hold a site.
+    """
+
+    site = load_site()
+    session_key = make_editor_session_key()
+
+    rng = random.Random(seed)
+    picks = rng.choices(
+        list(SCENARIOS),
+        weights=list(SCENARIOS.values()),
+        k=scenarios,
+    )
+    work = queue.Queue()
+    for number, scenario in enumerate(picks):
+        work.put((number, scenario))
+
+    responses = defaultdict(list)
+    lock = threading.Lock()
+
+    def record(endpoint, response):
+        with lock:
+            responses[endpoint].append(response)
+
+    errors = []
+    transport = TRANSPORTS[transport](application)
+
+    def worker():
+        reader = Session(transport, record)
+        editor = Session(transport, record, session_key=session_key)
+        try:
+            while True:
+                try:
+                    number, scenario = work.get_nowait()
+                except queue.Empty:
+                    return
+
+                # Seeded per scenario, so the requests made don't depend
+                # on which thread picks it up.
+                scenario(reader, editor, site, random.Random(seed + number))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        transport.close()
+    wall_time = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+
+    return {
+        'endpoints': {
+            endpoint: summarise(endpoint_responses, wall_time)
+            for endpoint, endpoint_responses in sorted(responses.items())
+        },
+        'overall': summarise(
+            [r for rs in responses.values() for r in rs],
+            wall_time,
+        ),
+    }
@@ -0,0 +1,90 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from cms.models import Block, Reference
+
+
+class Command(BaseCommand):
+    help = (
+        'Checks every `Block` on the site for hooks to `Reference`s which'
+        ' don\'t exist or belong to another `Block`, `Reference`s which'
+        ' aren\'t hooked by their `Block`, and `Reference`s to unpublished'
+        ' `Block`s.  Exits with an error if any are found.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of `Block`s to fetch from the database at a time.',
+        )
+        parser.add_argument(
+            '--published-only',
+            action='store_true',
+            help='Only audit `Block`s visible to readers.',
+        )
+
+    def get_block_types(self):
+        return [
+            model for model in apps.get_app_config('cms').get_models()
+            if issubclass(model, Block) and model.content_field is not None
+        ]
+
+    def handle(self, *args, chunk_size, published_only, **options):
+        references = Reference.objects.all()
+        if published_only:
+            references = references.filter(containing_block__published=True)
+
+        # Only the `Reference`s are held in memory; `Block`s are
+        # streamed past them.
+        containing_blocks = dict(
+            references.values_list('id', 'containing_block')
+            .iterator(chunk_size=chunk_size)
+        )
+        hooked = set()
+
+        problems = 0
+        for block_type in self.get_block_types():
+            blocks = block_type.objects.all()
+            if published_only:
+                blocks = blocks.published()
+
+            contents = blocks.values_list('pk', block_type.content_field)
+            for block_id, content in contents.iterator(chunk_size=chunk_size):
+                for reference_id in Reference.find_reference_ids(content):
+                    if containing_blocks.get(reference_id) == block_id:
+                        hooked.add(reference_id)
+                        continue
+
+                    problems += 1
+                    self.stdout.write(
+                        f'Dangling hook: block {block_id} hooks reference'
+                        f' {reference_id}, which does not exist or belongs'
+                        ' to another block.'
+                    )
+
+        for reference_id, block_id in sorted(containing_blocks.items()):
+            if reference_id not in hooked:
+                problems += 1
+                self.stdout.write(
+                    f'Orphaned reference: reference {reference_id} is not'
+                    f' hooked by its block {block_id}.'
+                )
+
+        unpublished_targets = (
+            references.filter(referenced_block__published=False)
+            .values_list('id', 'referenced_block')
+        )
+        for reference_id, block_id in unpublished_targets.iterator(
+                chunk_size=chunk_size):
+            problems += 1
+            self.stdout.write(
+                f'Unpublished target: reference {reference_id} refers to'
+                f' unpublished block {block_id}.'
+            )
+
+        if problems:
+            raise CommandError(f'Found {problems} problem(s).')
+
+        self.stdout.write('No problems found.')
@@ -0,0 +1,90 @@
+import inspect
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cms.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs benchmarks of core CMS operations, writing the results as'
+        ' JSON.  Data is created in a transaction which is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'benchmarks',
+            nargs='*',
+            metavar='benchmark',
+            help=(
+                'Benchmarks to run, from:'
+                f' {", ".join(sorted(BENCHMARKS))}.  Defaults to all.'
+            ),
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write results to, rather than stdout.',
+        )
+
+        site = parser.add_argument_group(
+            'synthetic site',
+            'The shape of the site built by the `site` benchmark.',
+        )
+        site.add_argument('--pages', type=int, help='Number of `Page`s.')
+        site.add_argument(
+            '--depth',
+            type=int,
+            help='Levels of `Page`s below and including the top level.',
+        )
+        site.add_argument(
+            '--fan-out',
+            type=int,
+            help='Children of each `Page` above the bottom level.',
+        )
+        site.add_argument(
+            '--blocks-per-page',
+            type=int,
+            help='Published `TextBlock`s on each `Page`.',
+        )
+        site.add_argument(
+            '--reference-density',
+            type=float,
+            help='Average number of `Reference`s in each `Block`.',
+        )
+        site.add_argument(
+            '--repeat',
+            type=int,
+            help='Times to run each timed operation.',
+        )
+
+    def get_benchmark_kwargs(self, benchmark, options):
+        # Only pass along the options a benchmark accepts, and only when
+        # given, so benchmarks keep their own defaults.
+        parameters = inspect.signature(benchmark).parameters
+
+        return {
+            name: value for name, value in options.items()
+            if name in parameters and value is not None
+        }
+
+    def handle(self, *args, benchmarks, output, **options):
+        unknown = set(benchmarks).difference(BENCHMARKS)
+        if unknown:
+            raise CommandError(
+                f'Unknown benchmark(s): {", ".join(sorted(unknown))}.'
+            )
+
+        results = []
+        for name in benchmarks or sorted(BENCHMARKS):
+            benchmark = BENCHMARKS[name]
+            results.extend(
+                benchmark(**self.get_benchmark_kwargs(benchmark, options)),
+            )
+
+        report = json.dumps(results, indent=2)
+        if output is None:
+            self.stdout.write(report)
+        else:
+            with open(output, 'w') as f:
+                f.write(report)
@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.db import connection
+
+from cms.benchmarks import build_site
+from cms.loadtest import TRANSPORTS, run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Load tests the WSGI application with a mix of reader and editor'
+        ' requests against a synthetic site, in a throwaway database,'
+        ' reporting latency percentiles, throughput and query counts per'
+        ' endpoint as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--transport',
+            choices=sorted(TRANSPORTS),
+            default='in-process',
+            help=(
+                'Call the application directly, or serve it on a localhost'
+                ' port and make real HTTP requests.'
+            ),
+        )
+        parser.add_argument(
+            '--scenarios',
+            type=int,
+            default=200,
+            help='Number of reader or editor scenarios to run.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of scenarios to run at once.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for choosing scenarios; keep it fixed to compare.',
+        )
+        parser.add_argument('--pages', type=int, default=200)
+        parser.add_argument('--depth', type=int, default=4)
+        parser.add_argument('--fan-out', type=int, default=5)
+        parser.add_argument('--blocks-per-page', type=int, default=5)
+        parser.add_argument('--reference-density', type=float, default=0.2)
+        parser.add_argument(
+            '--output',
+            help='File to write results to, rather than stdout.',
+        )
+
+    def create_database(self, directory):
+        if connection.vendor == 'sqlite':
+            # A file, rather than SQLite's default of shared memory, so
+            # concurrent writers wait for each other rather than fail.
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                directory,
+                'db.sqlite3',
+            )
+
+        return connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False,
+        )
+
+    def handle(self, *args, transport, scenarios, concurrency, seed, output,
+               pages, depth, fan_out, blocks_per_page, reference_density,
+               **options):
+        profile = {
+            'pages': pages,
+            'depth': depth,
+            'fan_out': fan_out,
+            'blocks_per_page': blocks_per_page,
+            'reference_density': reference_density,
+        }
+
+        old_name = connection.settings_dict['NAME']
+        with tempfile.TemporaryDirectory(prefix='cms-loadtest-') as directory:
+            self.create_database(directory)
+            try:
+                build_site(**profile)
+
+                results = run_load_test(
+                    get_internal_wsgi_application(),
+                    transport=transport,
+                    scenarios=scenarios,
+                    concurrency=concurrency,
+                    seed=seed,
+                )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = json.dumps({
+            'transport': transport,
+            'scenarios': scenarios,
+            'concurrency': concurrency,
+            'seed': seed,
+            **profile,
+            **results,
+        }, indent=2)
+        if output is None:
+            self.stdout.write(report)
+        else:
+            with open(output, 'w') as f:
+                f.write(report)
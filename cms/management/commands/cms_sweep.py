@@ -0,0 +1,54 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from cms.sweeper import sweep
+
+
+logger = logging.getLogger('cms.sweeper')
+
+
+class Command(BaseCommand):
+    help = (
+        'Flushes buffered unsaved work, then deletes expired unsaved work'
+        ' and old unpublished `Block`s in chunks.  Intended to be run'
+        ' periodically, such as from cron, or left running with'
+        ' `--interval`; either way, by one process at a time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Number of rows to delete per transaction.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Seconds to wait between sweeps, rather than sweeping once.',
+        )
+
+    def sweep(self, chunk_size):
+        for name, deleted in sweep(chunk_size).items():
+            self.stdout.write(f'Deleted {deleted} {name.replace("_", " ")}.')
+
+    def handle(self, *args, chunk_size, interval, **options):
+        if interval is None:
+            self.sweep(chunk_size)
+
+            return
+
+        while True:
+            try:
+                self.sweep(chunk_size)
+            except Exception:
+                # Try again next time, rather than stopping sweeping.
+                logger.exception('Sweep failed.')
+            finally:
+                connection.close()
+
+            time.sleep(interval)
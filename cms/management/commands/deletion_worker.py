@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cms.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes the subtrees of `Page`s queued for deletion, a batch of'
+        ' `Page`s per transaction, leaves first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of `Page`s to delete per transaction.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when there are no jobs.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once there are no jobs left, rather than polling.',
+        )
+
+    def handle(self, *args, batch_size, interval, once, **options):
+        while True:
+            job = DeletionJob.objects.unfinished().order_by('created').first()
+            if job is None:
+                if once:
+                    break
+
+                time.sleep(interval)
+                continue
+
+            while job.run_batch(batch_size):
+                self.stdout.write(f'{job}: {job.progress}%')
+
+            if job.error:
+                self.stderr.write(f'{job}: failed. {job.error}')
+            else:
+                self.stdout.write(f'{job}: done.')
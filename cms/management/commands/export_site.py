@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from cms.exporting import export_site
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes every live `Page`, `Block` and `Reference` as JSON lines,'
+        ' streamed from the database a chunk at a time, in the format'
+        ' `manage.py import_site` reads.  The export is a consistent'
+        ' snapshot, read in a single transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='File to write the export to, rather than stdout.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of rows to fetch from the database at a time.',
+        )
+
+    def handle(self, *args, output, chunk_size, **options):
+        lines = export_site(chunk_size)
+
+        if output is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+
+            return
+
+        with open(output, 'w') as f:
+            f.writelines(lines)
@@ -0,0 +1,80 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from cms.importing import InvalidImport, SiteImporter, read_lines, read_tar
+from cms.models import Page
+
+
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports `Page`s, `Block`s and `Reference`s in bulk from JSON'
+        ' lines, or a tar archive of them, as described in'
+        ' `cms.importing`.  The import is all or nothing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='File to import, or - for stdin.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'tar'),
+            help='Defaults to tar for .tar files and the like, else jsonl.',
+        )
+        parser.add_argument(
+            '--parent',
+            type=int,
+            help='ID of an existing `Page` to import the top level beneath.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of rows to insert at a time.',
+        )
+        parser.add_argument(
+            '--new-uuids',
+            action='store_true',
+            help=(
+                'Give `Page`s new UUIDs, e.g. when importing a copy of'
+                ' this site.'
+            ),
+        )
+
+    def handle(self, *args, path, format, parent, chunk_size, new_uuids,
+               **options):
+        if format is None:
+            format = 'tar' if path.endswith(TAR_SUFFIXES) else 'jsonl'
+
+        if parent is not None:
+            try:
+                parent = Page.objects.live().get(pk=parent)
+            except Page.DoesNotExist:
+                raise CommandError(f'There is no page {parent}.')
+
+        importer = SiteImporter(
+            parent=parent,
+            chunk_size=chunk_size,
+            new_uuids=new_uuids,
+        )
+        read = read_tar if format == 'tar' else read_lines
+
+        fileobj = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        try:
+            counts = importer.run(read(fileobj))
+        except (InvalidImport, IntegrityError) as e:
+            raise CommandError(f'Nothing was imported: {e}')
+        finally:
+            if fileobj is not sys.stdin.buffer:
+                fileobj.close()
+
+        self.stdout.write(
+            f'Imported {counts["pages"]} page(s), {counts["blocks"]}'
+            f' block(s) and {counts["references"]} reference(s).'
+        )
@@ -0,0 +1,121 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from cms.models import Block, Page
+
+
+class Command(BaseCommand):
+    help = (
+        'Reindexes every live `Page` title and published `Block`, and'
+        ' removes entries for anything else from the search index, a'
+        ' chunk at a time, each chunk in its own transaction.  Searches'
+        ' and edits carry on meanwhile.  The index is kept up to date as'
+        ' content changes, so this is only needed after bulk imports or'
+        ' index corruption.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of rows to fetch and index per transaction.',
+        )
+
+    def get_block_types(self):
+        return [
+            model for model in apps.get_app_config('cms').get_models()
+            if issubclass(model, Block) and model.content_field is not None
+        ]
+
+    def index_in_chunks(self, rows, index, chunk_size):
+        """
+        Passes `rows`, a `values_list()` starting with the primary key,
+        to `index` a chunk at a time, and returns how many there were.
+        """
+
+        indexed = 0
+        last_pk = 0
+        while True:
+            # Read and indexed together, so a chunk can't overwrite
+            # newer entries with what it read before an edit.
+            with transaction.atomic():
+                chunk = list(
+                    rows.filter(pk__gt=last_pk).order_by('pk')[:chunk_size]
+                )
+                if not chunk:
+                    return indexed
+
+                index(chunk)
+
+            last_pk = chunk[-1][0]
+            indexed += len(chunk)
+
+    def remove_stale_entries(self, search_backend, chunk_size):
+        removed = 0
+        after = None
+        while True:
+            with transaction.atomic():
+                entries = search_backend.get_entries(after, chunk_size)
+                if not entries:
+                    return removed
+
+                page_ids = {
+                    page_id for _entry_id, page_id, block_id in entries
+                    if block_id is None
+                }
+                block_ids = {
+                    block_id for _entry_id, _page_id, block_id in entries
+                    if block_id is not None
+                }
+                stale_page_ids = page_ids.difference(
+                    Page.objects.live().filter(
+                        pk__in=page_ids,
+                    ).values_list('pk', flat=True)
+                )
+                stale_block_ids = block_ids.difference(
+                    Block.objects.published().filter(
+                        pk__in=block_ids,
+                        parent_page__pending_deletion=False,
+                    ).values_list('pk', flat=True)
+                )
+
+                search_backend.remove_blocks(stale_block_ids)
+                search_backend.remove_pages(stale_page_ids)
+
+            after = entries[-1][0]
+            removed += len(stale_page_ids) + len(stale_block_ids)
+
+    def handle(self, *args, chunk_size, **options):
+        search_backend = apps.get_app_config('cms').search_backend
+        if search_backend is None:
+            raise CommandError('Search is turned off.')
+
+        indexed_pages = self.index_in_chunks(
+            Page.objects.live().values_list('pk', 'title'),
+            search_backend.index_pages,
+            chunk_size,
+        )
+
+        indexed_blocks = 0
+        for block_type in self.get_block_types():
+            indexed_blocks += self.index_in_chunks(
+                block_type.objects.published().filter(
+                    parent_page__pending_deletion=False,
+                ).values_list(
+                    'pk',
+                    'parent_page',
+                    block_type.content_field,
+                ),
+                search_backend.index_blocks,
+                chunk_size,
+            )
+
+        removed = self.remove_stale_entries(search_backend, chunk_size)
+        entries = 'entry' if removed == 1 else 'entries'
+
+        self.stdout.write(
+            f'Indexed {indexed_pages} page(s) and {indexed_blocks} block(s),'
+            f' and removed {removed} stale {entries}.'
+        )
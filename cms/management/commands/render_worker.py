@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from cms.models import Block, RenderJob
+
+
+def render_jobs(jobs):
+    """
+    Renders the `Block`s `jobs` are for, then removes the jobs from the
+    queue.  If rendering fails, they're left for another worker.
+    """
+
+    Block.objects.filter(pk__in=[job.block_id for job in jobs]).rerender()
+    RenderJob.objects.finish(jobs)
+
+
+def render_jobs_in_thread(jobs):
+    try:
+        render_jobs(jobs)
+    finally:
+        # Each thread gets its own connection; don't leak them.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-renders `Block`s whose output has gone stale, such as those'
+        ' linking to a `Page` which has since moved.  Readers are served'
+        ' the previous render until the new one is ready.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of threads to render with.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of jobs to claim from the queue at a time.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls of an empty queue.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty, rather than polling.',
+        )
+
+    def handle(self, *args, workers, batch_size, interval, once, **options):
+        executor = None
+        if workers > 1:
+            executor = ThreadPoolExecutor(max_workers=workers)
+
+        try:
+            while True:
+                jobs = RenderJob.objects.claim(batch_size)
+                if not jobs:
+                    if once:
+                        break
+
+                    time.sleep(interval)
+                    continue
+
+                self.render(jobs, executor, workers)
+
+                self.stdout.write(f'Rendered {len(jobs)} block(s).')
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def render(self, jobs, executor, workers):
+        if executor is None:
+            render_jobs(jobs)
+
+            return
+
+        chunks = [jobs[i::workers] for i in range(workers)]
+        list(executor.map(
+            render_jobs_in_thread,
+            [chunk for chunk in chunks if chunk],
+        ))
@@ -0,0 +1,209 @@
+"""
+Counters and histograms of the CMS's hot paths, served in Prometheus'
+text exposition format by `MetricsView`.
+
+Everything is aggregated in memory, per process, behind a lock per
+metric; recording a value is a dictionary lookup and a bisection, so
+it stays on in production.  With several worker processes, each
+reports its own totals, so scrape them individually or sum them.
+"""
+
+from bisect import bisect_left
+import threading
+
+
+# Seconds, from a fast cache hit up to a painfully slow request.
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+# Numbers of `Page`s or `Block`s.
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'),
+        )
+        for name, value in labels
+    )
+
+    return f'{{{pairs}}}'
+
+
+class Metric(object):
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name} takes labels {self.labelnames}, not'
+                f' {tuple(labels)}'
+            )
+
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self):
+        raise NotImplementedError()
+
+    def expose(self):
+        lines = [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        for name, labels, value in self.samples():
+            lines.append(
+                f'{name}{format_labels(labels)} {format_value(value)}'
+            )
+
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+
+        for key, value in values:
+            yield self.name, list(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        super().__init__(name, help, labelnames)
+
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                # A count per bucket, not cumulative, including +Inf,
+                # then the sum.
+                values = self._values[key] = [0] * (len(self.buckets) + 2)
+
+            values[index] += 1
+            values[-1] += value
+
+    def get_count(self, **labels):
+        with self._lock:
+            values = self._values.get(self._key(labels))
+
+            return 0 if values is None else sum(values[:-1])
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                (key, list(counts)) for key, counts in self._values.items()
+            )
+
+        for key, counts in values:
+            labels = list(zip(self.labelnames, key))
+
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'), ), counts):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket',
+                    labels + [('le', format_value(bound))],
+                    cumulative,
+                )
+
+            yield f'{self.name}_sum', labels, counts[-1]
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Registry(object):
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+        return metric
+
+    def expose(self):
+        return ''.join(f'{metric.expose()}\n' for metric in self.metrics)
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+
+registry = Registry()
+
+view_duration = registry.register(Histogram(
+    'cms_view_duration_seconds',
+    'Time taken to handle requests, including rendering, by view.',
+    DURATION_BUCKETS,
+    labelnames=('view', ),
+))
+markdown_render_duration = registry.register(Histogram(
+    'cms_markdown_render_duration_seconds',
+    'Time taken to convert a Block\'s markdown to HTML.',
+    DURATION_BUCKETS,
+))
+redenormalisation_pages = registry.register(Histogram(
+    'cms_redenormalisation_pages',
+    'Descendants whose paths were redenormalised when a Page moved.',
+    SIZE_BUCKETS,
+))
+redenormalisation_duration = registry.register(Histogram(
+    'cms_redenormalisation_duration_seconds',
+    'Time taken to redenormalise the paths of a moved Page\'s subtree.',
+    DURATION_BUCKETS,
+))
+position_redistribution_blocks = registry.register(Histogram(
+    'cms_position_redistribution_blocks',
+    'Blocks given new positions when a Page\'s positions ran out.',
+    SIZE_BUCKETS,
+))
+cache_lookups = registry.register(Counter(
+    'cms_cache_lookups_total',
+    'Lookups of CMS data in the cache, by whether they hit.',
+    labelnames=('result', ),
+))
+sweep_duration = registry.register(Histogram(
+    'cms_sweep_duration_seconds',
+    'Time taken by sweeps of expired unsaved work and unpublished Blocks.',
+    DURATION_BUCKETS,
+))
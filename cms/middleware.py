@@ -0,0 +1,328 @@
+from contextlib import ExitStack
+from datetime import datetime
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from . import instrumentation
+from .metrics import view_duration
+from .profiling import format_collapsed, get_sampler
+from .routers import use_replicas
+
+
+logger = logging.getLogger('cms.instrumentation')
+
+
+class InstrumentationMiddleware(object):
+    """
+    Measures each request's queries, database time, template rendering
+    time, markdown rendering time per `Block`, and cache hits and
+    misses.  They're reported to the client in a `Server-Timing` header,
+    logged as a line of JSON to the `cms.instrumentation` logger, and
+    added to `instrumentation.view_aggregates`.
+
+    Put this first in `MIDDLEWARE`, so it sees as much as possible.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = instrumentation.start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+
+                response = self.get_response(request)
+
+            total_time = time.perf_counter() - start
+        finally:
+            instrumentation.finish_request()
+
+        view_name = self.get_view_name(request)
+        response['Server-Timing'] = self.make_server_timing(
+            metrics,
+            total_time,
+        )
+        self.log(request, response, view_name, metrics, total_time)
+        instrumentation.view_aggregates.add(view_name, metrics, total_time)
+        view_duration.observe(total_time, view=view_name)
+
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = instrumentation.current()
+        if metrics is None:
+            return response
+
+        # Templates are rendered after this, by the handler; the
+        # callback runs once they're done.
+        start = time.perf_counter()
+
+        def stop(response):
+            metrics.template_time += time.perf_counter() - start
+
+        response.add_post_render_callback(stop)
+
+        return response
+
+    def get_view_name(self, request):
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return 'unresolved'
+
+        return resolver_match.view_name
+
+    def make_server_timing(self, metrics, total_time):
+        def ms(seconds):
+            return f'{seconds * 1000:.1f}'
+
+        return ', '.join([
+            f'db;dur={ms(metrics.db_time)};desc="{metrics.queries} queries"',
+            f'tpl;dur={ms(metrics.template_time)};desc="Templates"',
+            (
+                f'md;dur={ms(metrics.markdown_time)};'
+                f'desc="Markdown, {len(metrics.markdown_times)} blocks"'
+            ),
+            (
+                f'cache;desc="{metrics.cache_hits} hits,'
+                f' {metrics.cache_misses} misses"'
+            ),
+            f'total;dur={ms(total_time)}',
+        ])
+
+    def log(self, request, response, view_name, metrics, total_time):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'total_ms': total_time * 1000,
+            'queries': metrics.queries,
+            'db_ms': metrics.db_time * 1000,
+            'template_ms': metrics.template_time * 1000,
+            'markdown_ms': {
+                str(block_id): seconds * 1000
+                for block_id, seconds in metrics.markdown_times.items()
+            },
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+        }, sort_keys=True))
+
+
+class ProfilingMiddleware(object):
+    """
+    Samples the stacks of requests to `CmsConfig.profiled_views`, and
+    writes those slower than `profile_requests_slower_than` seconds,
+    every `profile_every_nth_request`th one, and any a member of staff
+    adds `?profile` to, to `profile_output_dir` as collapsed stacks.
+
+    Does nothing unless `profile_output_dir` is set.  Put this above
+    `ReaderFastPathMiddleware`, so readers' requests are seen too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = apps.get_app_config('cms')
+        self.request_numbers = itertools.count(1)
+
+    def get_view_name(self, request):
+        try:
+            return resolve(request.path_info).view_name
+        except Resolver404:
+            return None
+
+    def __call__(self, request):
+        if self.config.profile_output_dir is None:
+            return self.get_response(request)
+
+        view_name = self.get_view_name(request)
+        if view_name not in self.config.profiled_views:
+            return self.get_response(request)
+
+        sampler = get_sampler(self.config.profile_sample_interval)
+        sampler.start_profiling(threading.get_ident())
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - start
+            stacks = sampler.stop_profiling(threading.get_ident())
+
+        if stacks and self.should_write(request, duration):
+            self.write(view_name, duration, stacks)
+
+        return response
+
+    def should_write(self, request, duration):
+        # Counted whether or not it's slow, so every nth really is.
+        request_number = next(self.request_numbers)
+
+        threshold = self.config.profile_requests_slower_than
+        if threshold is not None and duration >= threshold:
+            return True
+
+        every_nth = self.config.profile_every_nth_request
+        if every_nth and request_number % every_nth == 0:
+            return True
+
+        user = getattr(request, 'user', None)
+        return (
+            'profile' in request.GET
+            and user is not None
+            and user.is_staff
+        )
+
+    def write(self, view_name, duration, stacks):
+        view_name = view_name.replace(':', '.')
+        timestamp = datetime.now().strftime('%Y%m%dT%H%M%S.%f')
+        filename = f'{timestamp}-{view_name}-{duration * 1000:.0f}ms.txt'
+
+        os.makedirs(self.config.profile_output_dir, exist_ok=True)
+        path = os.path.join(self.config.profile_output_dir, filename)
+        with open(path, 'w') as f:
+            f.write(format_collapsed(stacks))
+
+
+class ReaderFastPathMiddleware(object):
+    """
+    Serves `CmsConfig.reader_views` to anonymous readers, meaning GET
+    and HEAD requests without a session cookie, straight from the view.
+    The session, authentication, CSRF and messages middleware below
+    this are skipped, as there's nobody to look up, and responses are
+    marked as cacheable by shared caches for `reader_cache_max_age`
+    seconds.
+
+    Put this above `SessionMiddleware`; anything above it still runs.
+    """
+
+    safe_methods = ('GET', 'HEAD')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = apps.get_app_config('cms')
+
+    def is_reader(self, request):
+        return (
+            request.method in self.safe_methods
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+
+    def __call__(self, request):
+        if not self.is_reader(request):
+            return self.get_response(request)
+
+        try:
+            resolver_match = resolve(request.path_info)
+        except Resolver404:
+            return self.get_response(request)
+
+        if resolver_match.view_name not in self.config.reader_views:
+            return self.get_response(request)
+
+        request.resolver_match = resolver_match
+        request.user = AnonymousUser()
+        request.cms_reader = True
+
+        try:
+            response = resolver_match.func(
+                request,
+                *resolver_match.args,
+                **resolver_match.kwargs,
+            )
+            if hasattr(response, 'render'):
+                # `process_template_response()`s are skipped along with
+                # the rest of the handler, so time this ourselves.
+                with instrumentation.measure_templates():
+                    response = response.render()
+        except Http404:
+            # Let the full stack render the error page.
+            return self.get_response(request)
+
+        if response.status_code == 200:
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=self.config.reader_cache_max_age,
+            )
+            # Anyone with a session cookie must not be served this.
+            patch_vary_headers(response, ('Cookie', ))
+
+        return response
+
+
+class ReplicaRoutingMiddleware(object):
+    """
+    Reads from the replicas while handling GET and HEAD requests for
+    `CmsConfig.reader_views`; see `cms.routers`.  A successful request
+    with any other method sets a cookie keeping its client's reads on
+    `default` for `primary_after_write_window` seconds.
+
+    Does nothing unless `replica_databases` is set.  Put this above
+    `ReaderFastPathMiddleware`.
+    """
+
+    safe_methods = ('GET', 'HEAD')
+    cookie_name = 'cms_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = apps.get_app_config('cms')
+
+    def is_pinned_to_primary(self, request):
+        try:
+            until = float(request.COOKIES[self.cookie_name])
+        except (KeyError, ValueError):
+            return False
+
+        return time.time() < until
+
+    def pin_to_primary(self, response):
+        window = self.config.primary_after_write_window
+        response.set_cookie(
+            self.cookie_name,
+            str(time.time() + window),
+            max_age=window,
+            httponly=True,
+        )
+
+    def __call__(self, request):
+        if not self.config.replica_databases:
+            return self.get_response(request)
+
+        if request.method not in self.safe_methods:
+            response = self.get_response(request)
+            if response.status_code < 400:
+                self.pin_to_primary(response)
+
+            return response
+
+        if self.is_pinned_to_primary(request):
+            return self.get_response(request)
+
+        try:
+            view_name = resolve(request.path_info).view_name
+        except Resolver404:
+            return self.get_response(request)
+
+        if view_name not in self.config.reader_views:
+            return self.get_response(request)
+
+        with use_replicas():
+            return self.get_response(request)
@@ -0,0 +1,31 @@
+# Generated by Django 2.0.13 on 2026-10-18 21:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0010_auto_20180525_0145'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queued', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='block',
+            name='rendered',
+            field=models.TextField(editable=False, help_text='The output of `.render()`, as of the last time it was run.  Readers are served this until a `RenderJob` replaces it, and it is regenerated on demand when missing.', null=True),
+        ),
+        migrations.AddField(
+            model_name='renderjob',
+            name='block',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='render_job', to='cms.Block'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.0.13 on 2026-10-18 21:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_target_pages(apps, schema_editor):
+    Reference = apps.get_model('cms', 'Reference')
+
+    references = Reference.objects.select_related('referenced_block')
+    for reference in references.iterator():
+        if reference.referenced_block is not None:
+            target_page_id = reference.referenced_block.parent_page_id
+        else:
+            target_page_id = reference.referenced_page_id
+
+        Reference.objects.filter(pk=reference.pk).update(
+            target_page=target_page_id,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0011_block_rendered_renderjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reference',
+            name='target_page',
+            field=models.ForeignKey(editable=False, help_text="The `Page` the rendered link lands on; either `referenced_page`, or `referenced_block`'s `parent_page`.  Indexed so stale links can be found when `Page`s move.", null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.Page'),
+        ),
+        migrations.RunPython(
+            populate_target_pages,
+            migrations.RunPython.noop,
+        ),
+    ]
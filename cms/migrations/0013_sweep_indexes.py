@@ -0,0 +1,17 @@
+# Generated by Django 2.0.13 on 2026-10-18 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0012_reference_target_page'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='block',
+            index=models.Index(fields=['published', 'created'], name='cms_block_publish_4c8f4e_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+import json
+import zlib
+
+
+def compress_work(apps, schema_editor):
+    UnsavedWork = apps.get_model('cms', 'UnsavedWork')
+
+    for unsaved_work in UnsavedWork.objects.iterator():
+        payload = json.dumps({
+            'fields': json.loads(unsaved_work.work),
+            'deltas': {},
+        }).encode('utf-8')
+
+        UnsavedWork.objects.filter(pk=unsaved_work.pk).update(
+            encoded_work=b'z' + zlib.compress(payload),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0013_sweep_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unsavedwork',
+            name='encoded_work',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.RunPython(compress_work, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='unsavedwork',
+            name='work',
+        ),
+        migrations.RenameField(
+            model_name='unsavedwork',
+            old_name='encoded_work',
+            new_name='work',
+        ),
+        migrations.AlterField(
+            model_name='unsavedwork',
+            name='work',
+            field=models.BinaryField(help_text='Encoded by `cms.unsaved_work.encode_work()`.'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.0.13 on 2026-10-18 21:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0014_compress_unsaved_work'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.TextField()),
+                ('return_url', models.TextField()),
+                ('total_pages', models.PositiveIntegerField()),
+                ('deleted_pages', models.PositiveIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('finished', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='pending_deletion',
+            field=models.BooleanField(db_index=True, default=False, editable=False, help_text='Set on a whole subtree as soon as its deletion is requested, hiding it from readers whilst a `DeletionJob` deletes it.'),
+        ),
+        migrations.AddField(
+            model_name='deletionjob',
+            name='page',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='cms.Page'),
+        ),
+    ]
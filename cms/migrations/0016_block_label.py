@@ -0,0 +1,44 @@
+# Generated by Django 2.0.13 on 2026-10-18 21:35
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def text_block_label(content):
+    # Mirrors `TextBlock.__str__()`.
+    lines = content.strip().split('\n')
+    if lines[0].strip().startswith('#'):
+        return lines[0].strip()[1:].strip()
+
+    return Truncator(content).chars(25)
+
+
+def populate_labels(apps, schema_editor):
+    Block = apps.get_model('cms', 'Block')
+    TextBlock = apps.get_model('cms', 'TextBlock')
+
+    text_blocks = TextBlock.objects.values_list('pk', 'content')
+    for pk, content in text_blocks.iterator():
+        Block.objects.filter(pk=pk).update(
+            label=Truncator(text_block_label(content)).chars(255),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0015_deletion_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='block',
+            name='label',
+            field=models.CharField(blank=True, editable=False, help_text="A copy of `str()` of this `Block`, kept for searching and listing without loading every `Block`'s content.", max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='block',
+            index=models.Index(fields=['parent_page', 'label'], name='cms_block_parent__0b1116_idx'),
+        ),
+        migrations.RunPython(populate_labels, migrations.RunPython.noop),
+    ]
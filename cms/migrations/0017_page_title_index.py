@@ -0,0 +1,17 @@
+# Generated by Django 2.0.13 on 2026-10-18 21:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0016_block_label'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(fields=['title', 'id'], name='cms_page_title_42351f_idx'),
+        ),
+    ]
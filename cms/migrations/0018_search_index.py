@@ -0,0 +1,52 @@
+import re
+
+from django.db import migrations
+
+
+# Mirrors `Reference.generic_hook_re`.
+hook_re = re.compile(r'(?<!\\)!ref\(\d+\)')
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE cms_search USING fts5('
+        ' page_id UNINDEXED, title, content,'
+        ' tokenize = \'porter unicode61\')'
+    )
+
+    Page = apps.get_model('cms', 'Page')
+    TextBlock = apps.get_model('cms', 'TextBlock')
+    schema_editor.connection.cursor().executemany(
+        'INSERT INTO cms_search (rowid, page_id, title, content)'
+        ' VALUES (%s, %s, %s, %s)',
+        [
+            (page_id * 2 + 1, page_id, title, '')
+            for page_id, title in Page.objects.values_list('pk', 'title')
+        ] + [
+            (block_id * 2, page_id, '', hook_re.sub('', content))
+            for block_id, page_id, content in TextBlock.objects.filter(
+                published=True,
+            ).values_list('pk', 'parent_page', 'content')
+        ],
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute('DROP TABLE cms_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0017_page_title_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
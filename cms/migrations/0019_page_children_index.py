@@ -0,0 +1,17 @@
+# Generated by Django 2.0.13 on 2026-10-18 21:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0018_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(fields=['parent', 'title', 'id'], name='cms_page_parent__83dcd9_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.0.13 on 2026-10-18 21:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0019_page_children_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('page.created', 'page.created'), ('page.moved', 'page.moved'), ('page.renamed', 'page.renamed'), ('page.deleted', 'page.deleted'), ('block.published', 'block.published'), ('block.unpublished', 'block.unpublished'), ('block.edited', 'block.edited'), ('block.moved', 'block.moved'), ('block.deleted', 'block.deleted'), ('reference.created', 'reference.created'), ('reference.deleted', 'reference.deleted')], max_length=32)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('page_id', models.PositiveIntegerField(help_text='The `Page` changed, or holding the `Block` changed.')),
+                ('block_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('reference_id', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+        ),
+    ]
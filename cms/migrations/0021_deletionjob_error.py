@@ -0,0 +1,18 @@
+# Generated by Django 2.0.13 on 2026-10-18 22:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0020_changeevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletionjob',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+    ]
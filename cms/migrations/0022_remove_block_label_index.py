@@ -0,0 +1,17 @@
+# Generated by Django 2.0.13 on 2026-10-18 22:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0021_deletionjob_error'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='block',
+            name='cms_block_parent__0b1116_idx',
+        ),
+    ]
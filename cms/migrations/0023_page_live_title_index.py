@@ -0,0 +1,21 @@
+# Generated by Django 2.0.13 on 2026-10-18 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0022_remove_block_label_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='page',
+            name='cms_page_title_42351f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(fields=['pending_deletion', 'title', 'id'], name='cms_page_pending_9603be_idx'),
+        ),
+    ]
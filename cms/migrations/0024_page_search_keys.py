@@ -0,0 +1,47 @@
+# Generated by Django 2.0.13 on 2026-10-18 22:38
+
+from django.db import migrations, models
+
+
+def populate_search_keys(apps, schema_editor):
+    Page = apps.get_model('cms', 'Page')
+
+    pages = Page.objects.values_list('pk', 'title', 'denormalised_path', 'slug')
+    for pk, title, denormalised_path, slug in pages.iterator():
+        # Mirrors `Page.update_search_keys()`.
+        path = '/'.join(part for part in [denormalised_path, slug] if part)
+        Page.objects.filter(pk=pk).update(
+            search_title=title.casefold()[:1024],
+            search_path=path.casefold(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0023_page_live_title_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='search_path',
+            field=models.TextField(default='', editable=False, help_text="This `Page`'s path, including its own slug, case-folded for searching."),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='search_title',
+            field=models.CharField(default='', editable=False, help_text='`title`, case-folded for searching.', max_length=1024),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(fields=['pending_deletion', 'search_title', 'id'], name='cms_page_pending_d60443_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(fields=['pending_deletion', 'search_path', 'id'], name='cms_page_pending_825f92_idx'),
+        ),
+        migrations.RunPython(populate_search_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.0.13 on 2026-10-18 22:39
+
+from django.db import migrations, models
+
+
+def populate_search_labels(apps, schema_editor):
+    Block = apps.get_model('cms', 'Block')
+
+    for pk, label in Block.objects.values_list('pk', 'label').iterator():
+        # Mirrors `Block.update_label()`.
+        Block.objects.filter(pk=pk).update(
+            search_label=label.casefold()[:255],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0024_page_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='block',
+            name='search_label',
+            field=models.CharField(blank=True, editable=False, help_text='`label`, case-folded for searching.', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='block',
+            index=models.Index(fields=['parent_page', 'search_label'], name='cms_block_parent__bf8834_idx'),
+        ),
+        migrations.RunPython(populate_search_labels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.0.13 on 2026-10-18 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0025_block_search_label'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='block',
+            name='render_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Incremented whenever `rendered` is discarded for a change to this `Block`'s `Reference`s, so renders begun beforehand aren't stored."),
+        ),
+        migrations.AddField(
+            model_name='renderjob',
+            name='claimed',
+            field=models.DateTimeField(editable=False, help_text='When a worker claimed this job, if one has.', null=True),
+        ),
+    ]
@@ -1,11 +1,12 @@
 from functools import reduce
 import re
+import time
 from uuid import uuid4
 
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
+from django.db import IntegrityError, models, transaction
 from django.shortcuts import reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -14,6 +15,9 @@ from django.utils.text import Truncator, mark_safe, slugify
 from polymorphic.models import PolymorphicManager, PolymorphicModel
 from polymorphic.query import PolymorphicQuerySet
 
+from . import instrumentation, metrics
+from .caching import get_or_set, make_tree_key, new_tree_version
+
 
 """
 Pages are ordered in a hierarchy.  Each Page exists as a child of
@@ -25,6 +29,81 @@ Blocks can contain References, which refer to a Page or Block.
 """
 
 
+def delete_in_chunks(queryset, chunk_size=None):
+    """
+    Deletes everything in `queryset`, `chunk_size` rows per
+    transaction, so other writers aren't locked out for the duration.
+    Returns the number of rows from `queryset` deleted.
+    """
+
+    chunk_size = chunk_size or queryset.model._meta.app_config.sweep_chunk_size
+
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return deleted
+
+            queryset.model.objects.filter(pk__in=pks).delete()
+
+        deleted += len(pks)
+
+
+class PageQuerySet(models.QuerySet):
+
+    def live(self):
+        """
+        Excludes `Page`s which are waiting to be deleted.
+        """
+
+        return self.filter(pending_deletion=False)
+
+    def search(self, query):
+        """
+        Finds live `Page`s by the start of their title, ignoring case,
+        ordered by it or, given a path like `parent/path/sl`, by the
+        start of their path, ordered by that.
+        """
+
+        query = query.strip()
+        field_name = 'search_title'
+        if '/' in query:
+            query = query.strip('/')
+            field_name = 'search_path'
+        query = query.casefold()
+
+        # A range over the case-folded copy rather than `istartswith`,
+        # which is a `LIKE`, so can't use the index.
+        return self.filter(
+            pending_deletion=False,
+            **{
+                f'{field_name}__gte': query,
+                f'{field_name}__lt': f'{query}\uffff',
+            },
+        ).order_by(field_name, 'id')
+
+    def subtree(self, page):
+        """
+        Returns `page` and all of its descendants, found by their
+        denormalised paths rather than by walking the hierarchy.
+        """
+
+        path = page.get_subtree_path()
+
+        # A range rather than `startswith`, which is a `LIKE`, so
+        # ignores case on SQLite and can't use the index.  '0' is the
+        # character after '/'.
+        return self.filter(
+            models.Q(pk=page.pk)
+            | models.Q(denormalised_path=path)
+            | models.Q(
+                denormalised_path__gte=f'{path}/',
+                denormalised_path__lt=f'{path}0',
+            )
+        )
+
+
 class Page(models.Model):
     uuid = models.UUIDField(default=uuid4, editable=False, unique=True)
 
@@ -56,8 +135,44 @@ class Page(models.Model):
     title = models.CharField(max_length=1024)
     slug = models.SlugField(blank=True)
 
+    search_title = models.CharField(
+        max_length=1024,
+        editable=False,
+        help_text='`title`, case-folded for searching.',
+    )
+    search_path = models.TextField(
+        editable=False,
+        help_text=(
+            'This `Page`\'s path, including its own slug, case-folded for'
+            ' searching.'
+        ),
+    )
+
+    pending_deletion = models.BooleanField(
+        default=False,
+        db_index=True,
+        editable=False,
+        help_text=(
+            'Set on a whole subtree as soon as its deletion is requested,'
+            ' hiding it from readers whilst a `DeletionJob` deletes it.'
+        ),
+    )
+
+    objects = models.Manager.from_queryset(PageQuerySet)()
+
     class Meta:
         unique_together = ('denormalised_path', 'slug')
+        indexes = [
+            # Listing live `Page`s by title, in keyset order, without
+            # sorting.
+            models.Index(fields=['pending_deletion', 'title', 'id']),
+            # Searching live `Page`s by the start of their title or
+            # path, in keyset order.
+            models.Index(fields=['pending_deletion', 'search_title', 'id']),
+            models.Index(fields=['pending_deletion', 'search_path', 'id']),
+            # Listing a `Page`'s children, or the top level, in order.
+            models.Index(fields=['parent', 'title', 'id']),
+        ]
 
     def __str__(self):
         titles = [
@@ -71,6 +186,7 @@ class Page(models.Model):
 
         self._old_slug = self.slug
         self._old_parent_id = self.parent_id
+        self._old_title = self.title
 
         self._children_paths_redenormalisation_scheduled = False
 
@@ -101,6 +217,21 @@ class Page(models.Model):
 
         return ''
 
+    def get_subtree_path(self):
+        """
+        Returns the `denormalised_path` this `Page`'s children have.
+        """
+
+        return '/'.join(
+            part for part in [self.denormalised_path, self.slug] if part
+        )
+
+    def update_search_keys(self):
+        # Case-folding can lengthen text, e.g. 'ß' to 'ss'.
+        max_length = self._meta.get_field('search_title').max_length
+        self.search_title = self.title.casefold()[:max_length]
+        self.search_path = self.get_subtree_path().casefold()
+
     def _denormalise_path(self):
         # Update own `denormalised_path`
         self.denormalised_path = self.generate_denormalised_path()
@@ -109,12 +240,23 @@ class Page(models.Model):
         self._children_paths_redenormalisation_scheduled = True
 
     def _redenormalise_children_paths(self):
+        """
+        Returns the number of descendants redenormalised.
+        """
+
+        descendants = 0
         for child in self.children.all():
             child.save(redenormalise_path=True)
+            descendants += 1 + child._redenormalised_descendants
+
+        return descendants
 
     def _redenormalise_children_paths_if_needed(self):
+        self._redenormalised_descendants = 0
         if self._children_paths_redenormalisation_scheduled:
-            self._redenormalise_children_paths()
+            self._redenormalised_descendants = (
+                self._redenormalise_children_paths()
+            )
 
         self._children_paths_redenormalisation_scheduled = False
 
@@ -169,7 +311,7 @@ class Page(models.Model):
     def get_absolute_url(self):
         url = 'path_page'
         kwargs = {'slug': self.slug, 'path': self.denormalised_path}
-        if self.parent is None:
+        if self.parent_id is None:
             url += '_root'
             kwargs.pop('path')
 
@@ -230,13 +372,13 @@ class Page(models.Model):
         def make_link(page):
             return {'title': page.title, 'url': page.get_absolute_url()}
 
-        root_pages = Page.objects.filter(parent=None).order_by('title')
+        root_pages = Page.objects.live().filter(parent=None).order_by('title')
         parents = self.get_parents()
         if self.parent is not None:
-            siblings = self.parent.children.all().order_by('title')
+            siblings = self.parent.children.live().order_by('title')
         else:
             siblings = root_pages
-        children = self.children.all().order_by('title')
+        children = self.children.live().order_by('title')
 
         # Build the tree from the leaves "upwards".
         child_links = [make_link(child) for child in children]
@@ -268,6 +410,13 @@ class Page(models.Model):
 
         return links
 
+    def get_cached_sidebar_links(self):
+        # Only the shape of the tree goes into these.
+        return get_or_set(
+            make_tree_key('sidebar-links', self.pk),
+            self.get_sidebar_links,
+        )
+
     def get_first_position(self):
         blocks = self.blocks.order_by('position')
         if not blocks.exists():
@@ -306,15 +455,50 @@ class Page(models.Model):
 
         return (after.position + before.position) // 2
 
+    @transaction.atomic
     def delete(self, *args, **kwargs):
-        for reference in self.referees.from_unpublished():
-            reference.delete()
+        ChangeEvent.objects.record(ChangeEvent.PAGE_DELETED, self.pk)
 
-        for reference in self.blocks.referees().from_unpublished():
-            reference.delete()
+        # Links from unpublished `Block`s shouldn't prevent deletion,
+        # so clear them out of the way.  Links from published `Block`s
+        # are left to `PROTECT` the subtree as usual.
+        Reference.objects.to_subtree(self).from_unpublished().delete()
 
-        return super().delete(*args, **kwargs)
+        search_backend = self._meta.app_config.search_backend
+        if search_backend is not None:
+            search_backend.remove_pages(
+                Page.objects.subtree(self).values_list('pk', flat=True),
+            )
+
+        ret = super().delete(*args, **kwargs)
+
+        transaction.on_commit(new_tree_version)
+
+        return ret
+
+    def get_dependent_blocks(self):
+        """
+        Returns the `Block`s containing links to this `Page`, any of
+        its descendants, or any of their `Block`s.  These are the
+        `Block`s whose renders go stale when this `Page` moves.
+        """
+
+        return Block.objects.filter(
+            references__in=Reference.objects.to_subtree(self),
+        ).distinct()
 
+    def get_dependent_pages(self):
+        """
+        Returns the `Page`s on which `.get_dependent_blocks()` sit, in
+        one query.
+        """
+
+        return Page.objects.filter(
+            blocks__references__in=Reference.objects.to_subtree(self),
+        ).distinct()
+
+    # Without a savepoint, as saves cascade through whole subtrees.
+    @transaction.atomic(savepoint=False)
     def save(self, *args, redenormalise_path=False, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title, allow_unicode=True)
@@ -322,10 +506,54 @@ class Page(models.Model):
         self._validate_noncyclic_hierarchy()
 
         self._redenormalise_path_if_needed(force=redenormalise_path)
+        self.update_search_keys()
+
+        adding = self._state.adding
+        renamed = not adding and self._old_title != self.title
+        tree_changed = (
+            adding
+            or renamed
+            or self._children_paths_redenormalisation_scheduled
+        )
 
         ret = super().save(*args, **kwargs)
 
+        search_backend = self._meta.app_config.search_backend
+        if search_backend is not None and (
+                adding or self._old_title != self.title):
+            search_backend.index_pages([(self.pk, self.title)])
+        self._old_title = self.title
+        # Otherwise saving again would look like another move.
+        self._old_slug = self.slug
+        self._old_parent_id = self.parent_id
+
+        path_changed = self._children_paths_redenormalisation_scheduled
+        start = time.perf_counter()
         self._redenormalise_children_paths_if_needed()
+        # Only count moves, not new `Page`s' paths being initialised.
+        if path_changed and not adding and not redenormalise_path:
+            metrics.redenormalisation_duration.observe(
+                time.perf_counter() - start,
+            )
+            metrics.redenormalisation_pages.observe(
+                self._redenormalised_descendants,
+            )
+
+        # Only the `Page` the move started from needs to look for
+        # stale links; its subtree is covered by the same lookup.
+        if path_changed and not redenormalise_path:
+            RenderJob.objects.enqueue(self.get_dependent_blocks())
+
+        if not redenormalise_path:
+            if adding:
+                ChangeEvent.objects.record(ChangeEvent.PAGE_CREATED, self.pk)
+            if renamed:
+                ChangeEvent.objects.record(ChangeEvent.PAGE_RENAMED, self.pk)
+            if path_changed and not adding:
+                ChangeEvent.objects.record(ChangeEvent.PAGE_MOVED, self.pk)
+
+        if tree_changed and not redenormalise_path:
+            transaction.on_commit(new_tree_version)
 
         return ret
 
@@ -351,6 +579,8 @@ class BlockQuerySet(PolymorphicQuerySet):
         space = round(32767 * 0.8)
         gap_size = space // self.count()
 
+        metrics.position_redistribution_blocks.observe(self.count())
+
         position = round(32767 * 0.1)
         with transaction.atomic():
             for block in self.order_by('position'):
@@ -373,12 +603,84 @@ class BlockQuerySet(PolymorphicQuerySet):
 
         return self.unpublished().filter(created__lte=best_before)
 
-    def delete_old_unpublished(self):
-        self.old_unpublished().delete()
+    def delete_old_unpublished(self, chunk_size=None):
+        # Anything still referenced is left for its referees to sort
+        # out, rather than having the whole sweep fail.
+        return delete_in_chunks(
+            self.old_unpublished().filter(referees__isnull=True),
+            chunk_size,
+        )
 
     def referees(self):
         return Reference.objects.filter(referenced_block__in=self.values('pk'))
 
+    def rerender(self):
+        for block in self:
+            block.rerender()
+
+    def find_missing_references(self):
+        """
+        The bulk version of `Block.find_missing_references()`.  Returns
+        a `dict` of `Block` IDs to the IDs of the `Reference`s they
+        hook which don't exist, or belong to another `Block`, checking
+        every `Block` with a single query for `Reference`s.
+        """
+
+        hooked = {}
+        for block in self.iterator():
+            try:
+                content = block.get_content()
+            except NotImplementedError:
+                # Not yet cast to a concrete type, so no content.
+                continue
+
+            reference_ids = Reference.find_reference_ids(content)
+            if reference_ids:
+                hooked[block.pk] = reference_ids
+
+        if not hooked:
+            return {}
+
+        existing = set(
+            Reference.objects
+            .filter(containing_block__in=self.values('pk'))
+            .values_list('id', 'containing_block')
+        )
+
+        missing = {}
+        for block_id, reference_ids in hooked.items():
+            missing_ids = {
+                reference_id for reference_id in reference_ids
+                if (reference_id, block_id) not in existing
+            }
+            if missing_ids:
+                missing[block_id] = missing_ids
+
+        return missing
+
+    def validate_references(self):
+        missing = self.find_missing_references()
+        if missing:
+            raise ValidationError([
+                f'Block {block_id}: {missing_references_message(ids)}'
+                for block_id, ids in sorted(missing.items())
+            ])
+
+
+def missing_references_message(missing_ids):
+    missing_ids = sorted(missing_ids)
+
+    if len(missing_ids) == 1:
+        return (
+            f'Reference {missing_ids} does not exist, or belong to this'
+            ' block.  Please recreate it.'
+        )
+
+    return (
+        f'References {missing_ids} do not exist, or belong to this'
+        ' block.  Please recreate them.'
+    )
+
 
 class CastablePolymorphicModelMixin(object):
 
@@ -429,49 +731,134 @@ class Block(CastablePolymorphicModelMixin, PolymorphicModel):
     position = models.PositiveSmallIntegerField(editable=False)
     published = models.BooleanField(default=False)
     created = models.DateTimeField(auto_now_add=True)
+    rendered = models.TextField(
+        help_text=(
+            'The output of `.render()`, as of the last time it was run.'
+            '  Readers are served this until a `RenderJob` replaces it,'
+            ' and it is regenerated on demand when missing.'
+        ),
+        editable=False,
+        null=True,
+    )
+    render_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=(
+            'Incremented whenever `rendered` is discarded for a change to'
+            ' this `Block`\'s `Reference`s, so renders begun beforehand'
+            ' aren\'t stored.'
+        ),
+    )
+    label = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text=(
+            'A copy of `str()` of this `Block`, kept for searching and'
+            ' listing without loading every `Block`\'s content.'
+        ),
+    )
+    search_label = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text='`label`, case-folded for searching.',
+    )
+
+    # The name of the field holding the raw content of a concrete
+    # `Block` type, so it can be read without loading whole instances.
+    content_field = None
 
     objects = PolymorphicManager.from_queryset(BlockQuerySet)()
 
     class Meta:
         unique_together = ('parent_page', 'position')
+        indexes = [
+            models.Index(fields=['published', 'created']),
+            # Searching a `Page`'s `Block`s by the start of their labels.
+            models.Index(fields=['parent_page', 'search_label']),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._old_parent_page_id = self.parent_page_id
+        self._old_position = self.position
+        self._old_published = self.published
+        self._old_content = (
+            None if self.content_field is None
+            else getattr(self, self.content_field)
+        )
 
     def render(self):
         raise NotImplementedError()
 
-    def get_content(self):
-        raise NotImplementedError()
+    def rerender(self):
+        rendered_from = self.get_content()
+        self.rendered = self.render()
+
+        if self.pk is not None:
+            # Only stored if neither the content nor the `Reference`s
+            # have changed since we read them, lest we overwrite a
+            # fresher render (or the discarding of it) with this stale
+            # one.  Filtered from `Block`, joining our type's table, to
+            # update in one query.
+            content_lookup = f'{self._meta.model_name}__{self.content_field}'
+            Block.objects.filter(
+                pk=self.pk,
+                render_version=self.render_version,
+                **{content_lookup: rendered_from},
+            ).update(rendered=self.rendered)
+
+    def get_rendered(self):
+        if self.rendered is None:
+            self.rerender()
+
+        return mark_safe(self.rendered)
 
-    def validate_references(self, content=None):
-        reference_ids = Reference.find_references(
-            content or self.get_content(),
-        )
-        references = Reference.objects.filter(
-            id__in=reference_ids,
-            containing_block=self,
-        )
+    def get_content(self):
+        if self.content_field is None:
+            raise NotImplementedError()
 
-        if references.count() != len(reference_ids):
-            ids = references.values_list('id', flat=True)
-            missing_ids = reference_ids.difference(ids)
+        return getattr(self, self.content_field)
 
-            if not missing_ids:
-                return
+    def find_missing_references(self, content=None):
+        """
+        Returns the IDs of `Reference`s hooked in `content` (or this
+        `Block`'s current content) which don't exist, or belong to
+        another `Block`.  The result for the last content checked is
+        remembered until `Reference`s change, as forms and `.publish()`
+        both validate.
+        """
 
-            error_message = (
-                f'Reference {missing_ids} does not exist, or belong to'
-                ' this block.  Please recreate it.'
-            )
-            error_message_plural = (
-                f'References {missing_ids} do not exist, or belong to'
-                ' this block.  Please recreate them.'
-            )
+        if content is None:
+            content = self.get_content()
+
+        memo = getattr(self, '_missing_references_memo', None)
+        if memo is not None and memo[:2] == (content, Reference.generation):
+            return memo[2]
+
+        reference_ids = Reference.find_reference_ids(content)
+        missing_ids = set()
+        if reference_ids:
+            existing_ids = Reference.objects.filter(
+                id__in=reference_ids,
+                containing_block=self,
+            ).values_list('id', flat=True)
+            missing_ids = reference_ids.difference(existing_ids)
+
+        self._missing_references_memo = (
+            content,
+            Reference.generation,
+            missing_ids,
+        )
 
-            if len(missing_ids) == 1:
-                error_message = error_message
-            else:
-                error_message = error_message_plural
+        return missing_ids
 
-            raise ValidationError(error_message)
+    def validate_references(self, content=None):
+        missing_ids = self.find_missing_references(content)
+        if missing_ids:
+            raise ValidationError(missing_references_message(missing_ids))
 
     def publish(self, commit=True):
         self.validate_references()
@@ -484,9 +871,94 @@ class Block(CastablePolymorphicModelMixin, PolymorphicModel):
     def get_absolute_url(self):
         return f'{self.parent_page.get_absolute_url()}#{self.id}'
 
+    def _update_search_index(self):
+        search_backend = self._meta.app_config.search_backend
+        if search_backend is None or self.content_field is None:
+            return
+
+        if self.published:
+            search_backend.index_blocks(
+                [(self.pk, self.parent_page_id, self.get_content())],
+            )
+        elif self._old_published:
+            search_backend.remove_blocks([self.pk])
+
+        self._old_published = self.published
+
+    def _record_change_event(self):
+        # Only published `Block`s are of interest to anyone following
+        # changes.
+        kind = None
+        if self.published and not self._old_published:
+            kind = ChangeEvent.BLOCK_PUBLISHED
+        elif self._old_published and not self.published:
+            kind = ChangeEvent.BLOCK_UNPUBLISHED
+        elif self.published and (
+                self._old_parent_page_id != self.parent_page_id
+                or self._old_position != self.position):
+            kind = ChangeEvent.BLOCK_MOVED
+        elif self.published and (
+                self.content_field is not None
+                and self._old_content != self.get_content()):
+            kind = ChangeEvent.BLOCK_EDITED
+
+        if kind is not None:
+            ChangeEvent.objects.record(
+                kind,
+                self.parent_page_id,
+                block_id=self.pk,
+            )
+
+    @transaction.atomic
+    def delete(self, *args, **kwargs):
+        if self.published:
+            ChangeEvent.objects.record(
+                ChangeEvent.BLOCK_DELETED,
+                self.parent_page_id,
+                block_id=self.pk,
+            )
+
+        search_backend = self._meta.app_config.search_backend
+        if search_backend is not None:
+            search_backend.remove_blocks([self.pk])
+
+        return super().delete(*args, **kwargs)
+
+    def update_label(self):
+        self.label = Truncator(str(self)).chars(255)
+        # Case-folding can lengthen text, e.g. 'ß' to 'ss'.
+        self.search_label = self.label.casefold()[:255]
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        self.update_label()
+
+        ret = super().save(*args, **kwargs)
+
+        self._record_change_event()
+        self._update_search_index()
+
+        # Moving to another `Page` changes our URL, so anything linking
+        # to us is now out of date.
+        if self._old_parent_page_id != self.parent_page_id:
+            if self._old_parent_page_id is not None:
+                self.referees.update(target_page=self.parent_page_id)
+                RenderJob.objects.enqueue(
+                    Block.objects.filter(references__referenced_block=self),
+                )
+
+            self._old_parent_page_id = self.parent_page_id
+
+        self._old_position = self.position
+        if self.content_field is not None:
+            self._old_content = self.get_content()
+
+        return ret
+
 
 class TextBlock(Block):
     template_name = 'cms/blocks/textblock.html'
+    content_field = 'content'
 
     content = models.TextField(blank=True)
 
@@ -499,17 +971,23 @@ class TextBlock(Block):
         # Otherwise return a truncation of the block.
         return Truncator(self.content).chars(25)
 
-    def get_content(self):
-        return self.content
-
     def render(self):
         content = self.get_content()
         for reference in self.references.all():
             content = reference.update_references(content)
 
-        return mark_safe(
-            self._meta.app_config.markdown_parser.convert(content)
-        )
+        with instrumentation.measure_markdown(self.pk):
+            rendered = self._meta.app_config.markdown_parser.convert(content)
+
+        return mark_safe(rendered)
+
+    def save(self, *args, **kwargs):
+        # Editors expect to see their own changes immediately, so
+        # rather than queueing a render, have the next reader do it.
+        if self._old_content != self.content:
+            self.rendered = None
+
+        return super().save(*args, **kwargs)
 
 
 class ReferenceQuerySet(models.QuerySet):
@@ -517,10 +995,63 @@ class ReferenceQuerySet(models.QuerySet):
     def from_unpublished(self):
         return self.filter(containing_block__published=False)
 
+    @transaction.atomic
+    def delete(self):
+        # Go around `Reference.delete()` to do this in bulk, but the
+        # containing `Block`s' renders still need discarding, and
+        # deletions from published ones recording.
+        Block.objects.filter(references__in=self.values('pk')).update(
+            rendered=None,
+            render_version=models.F('render_version') + 1,
+        )
+        ChangeEvent.objects.bulk_create(
+            ChangeEvent(
+                kind=ChangeEvent.REFERENCE_DELETED,
+                page_id=page_id,
+                block_id=block_id,
+                reference_id=reference_id,
+            )
+            for reference_id, block_id, page_id
+            in self.filter(containing_block__published=True).values_list(
+                'pk',
+                'containing_block',
+                'containing_block__parent_page',
+            )
+        )
+        Reference.generation += 1
+
+        return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def to_subtree(self, page):
+        """
+        Returns the `Reference`s to `page`, any of its descendants, or
+        any of their `Block`s.
+        """
+
+        return self.filter(target_page__in=Page.objects.subtree(page))
+
+    def protecting(self, page):
+        """
+        Returns the `Reference`s from published `Block`s outside
+        `page`'s subtree into it, which stop it being deleted.
+        """
+
+        return self.to_subtree(page).filter(
+            containing_block__published=True,
+        ).exclude(
+            containing_block__parent_page__in=Page.objects.subtree(page),
+        )
+
 
 class Reference(models.Model):
     hook = '!ref'
     generic_hook_re = re.compile(f'(?<!\\\\){hook}\\((?P<ref>\\d+)\)')
+    # Incremented by every change to `Reference`s in this process, so
+    # `Block`s' memos of which are missing can tell they're stale.
+    generation = 0
 
     containing_block = models.ForeignKey(
         'cms.Block',
@@ -544,6 +1075,19 @@ class Reference(models.Model):
         blank=True,
     )
 
+    target_page = models.ForeignKey(
+        'cms.Page',
+        related_name='+',
+        on_delete=models.CASCADE,
+        help_text=(
+            'The `Page` the rendered link lands on; either'
+            ' `referenced_page`, or `referenced_block`\'s `parent_page`.'
+            '  Indexed so stale links can be found when `Page`s move.'
+        ),
+        editable=False,
+        null=True,
+    )
+
     objects = models.Manager.from_queryset(ReferenceQuerySet)()
 
     def __init__(self, *args, **kwargs):
@@ -588,13 +1132,282 @@ class Reference(models.Model):
     def find_references(cls, content):
         return set(cls.generic_hook_re.findall(content))
 
+    @classmethod
+    def find_reference_ids(cls, content):
+        return {int(ref) for ref in cls.find_references(content)}
+
     def clean(self):
         self._validate()
 
+    def _clear_containing_block_render(self):
+        Block.objects.filter(pk=self.containing_block_id).update(
+            rendered=None,
+            render_version=models.F('render_version') + 1,
+        )
+
+    def _record_change_event(self, kind):
+        page_id, published = (
+            Block.objects.filter(pk=self.containing_block_id)
+            .values_list('parent_page', 'published').get()
+        )
+        # Readers can't see unpublished `Block`s' links.
+        if published:
+            ChangeEvent.objects.record(
+                kind,
+                page_id,
+                block_id=self.containing_block_id,
+                reference_id=self.pk,
+            )
+
+    @transaction.atomic
     def save(self, *args, **kwargs):
         self._validate()
 
-        return super().save(*args, **kwargs)
+        adding = self._state.adding
+        if self.referenced_block is not None:
+            self.target_page_id = self.referenced_block.parent_page_id
+        else:
+            self.target_page_id = self.referenced_page_id
+
+        ret = super().save(*args, **kwargs)
+        Reference.generation += 1
+
+        self._clear_containing_block_render()
+        if adding:
+            self._record_change_event(ChangeEvent.REFERENCE_CREATED)
+
+        return ret
+
+    @transaction.atomic
+    def delete(self, *args, **kwargs):
+        self._clear_containing_block_render()
+        self._record_change_event(ChangeEvent.REFERENCE_DELETED)
+        Reference.generation += 1
+
+        return super().delete(*args, **kwargs)
+
+
+class RenderJobQuerySet(models.QuerySet):
+
+    def enqueue(self, blocks):
+        """
+        Queues a render of each `Block` in the `blocks` queryset.
+        `Block`s which already have a render queued are skipped, so
+        the worker only renders each of them once.  Those being
+        rendered already are queued again, as their render may have
+        begun before whatever changed.
+        """
+
+        self.filter(
+            block__in=blocks.values('pk'),
+            claimed__isnull=False,
+        ).update(claimed=None)
+
+        new_jobs = (
+            RenderJob(block_id=block_id) for block_id
+            in blocks.exclude(pk__in=self.values('block_id'))
+            .values_list('pk', flat=True).distinct()
+        )
+
+        try:
+            with transaction.atomic():
+                self.bulk_create(new_jobs)
+        except IntegrityError:
+            # Someone else queued some of the same `Block`s in the
+            # meantime.  Fall back to doing it the slow way.
+            for block_id in blocks.values_list('pk', flat=True).distinct():
+                self.get_or_create(block_id=block_id)
+
+    def claim(self, limit):
+        """
+        Claims up to `limit` jobs, oldest first, and returns them.
+        Jobs stay queued until `finish()`ed, and are claimable again
+        `render_claim_timeout` later, so a worker crashing part way
+        through loses nothing.
+        """
+
+        now = timezone.now()
+        timeout = self.model._meta.app_config.render_claim_timeout
+
+        with transaction.atomic():
+            jobs = list(
+                self.filter(
+                    models.Q(claimed=None)
+                    | models.Q(claimed__lt=now - timeout),
+                ).order_by('queued').only('pk', 'block_id')[:limit]
+            )
+            self.filter(pk__in=[job.pk for job in jobs]).update(claimed=now)
+
+        for job in jobs:
+            job.claimed = now
+
+        return jobs
+
+    def finish(self, jobs):
+        """
+        Removes claimed `jobs`, once their `Block`s are rendered, from
+        the queue.  Any queued again since they were claimed are left
+        for another render.
+        """
+
+        self.filter(
+            pk__in=[job.pk for job in jobs],
+            claimed__in={job.claimed for job in jobs},
+        ).delete()
+
+
+class RenderJob(models.Model):
+    block = models.OneToOneField(
+        'cms.Block',
+        related_name='render_job',
+        on_delete=models.CASCADE,
+    )
+    queued = models.DateTimeField(auto_now_add=True, db_index=True)
+    claimed = models.DateTimeField(
+        null=True,
+        editable=False,
+        help_text='When a worker claimed this job, if one has.',
+    )
+
+    objects = models.Manager.from_queryset(RenderJobQuerySet)()
+
+
+class DeletionJobQuerySet(models.QuerySet):
+
+    def unfinished(self):
+        return self.filter(finished=None)
+
+    def start(self, page):
+        """
+        Hides `page` and its descendants from readers, and queues a job
+        to delete them.  Raises `ProtectedError` without changing
+        anything if published `Block`s elsewhere link into the subtree.
+        """
+
+        subtree = Page.objects.subtree(page)
+
+        with transaction.atomic():
+            # Locked, so nothing can start linking in between checking
+            # and hiding the subtree.
+            list(subtree.select_for_update().values_list('pk', flat=True))
+            protected = list(
+                Reference.objects.protecting(page)
+                .select_related('containing_block')
+                .select_for_update()
+            )
+            if protected:
+                raise models.ProtectedError(
+                    f'Cannot delete {page} because published blocks'
+                    ' elsewhere reference it or its descendants.',
+                    protected,
+                )
+
+            total_pages = subtree.update(pending_deletion=True)
+            transaction.on_commit(new_tree_version)
+            # Readers can no longer see it, so nor should mirrors.
+            ChangeEvent.objects.record(ChangeEvent.PAGE_DELETED, page.pk)
+
+            if page.parent is not None:
+                return_url = page.parent.get_absolute_url()
+            else:
+                return_url = reverse('cms:home')
+
+            return self.create(
+                page=page,
+                description=str(page),
+                return_url=return_url,
+                total_pages=total_pages,
+            )
+
+
+class DeletionJob(models.Model):
+    page = models.ForeignKey(
+        'cms.Page',
+        related_name='+',
+        on_delete=models.SET_NULL,
+        null=True,
+    )
+    description = models.TextField()
+    return_url = models.TextField()
+
+    total_pages = models.PositiveIntegerField()
+    deleted_pages = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = models.Manager.from_queryset(DeletionJobQuerySet)()
+
+    def __str__(self):
+        return f'Deletion of {self.description}'
+
+    @property
+    def progress(self):
+        if not self.total_pages:
+            return 100
+
+        return 100 * self.deleted_pages // self.total_pages
+
+    def run_batch(self, batch_size):
+        """
+        Deletes up to `batch_size` `Page`s from the subtree, leaves
+        first, in a single transaction.  Returns `False` once there's
+        nothing left to delete, or if a published `Block` elsewhere has
+        since linked in, in which case the job fails and what's left of
+        the subtree is shown to readers again.
+        """
+
+        if self.finished is not None:
+            return False
+
+        if self.page is None:
+            self.finished = timezone.now()
+            self.save()
+
+            return False
+
+        with transaction.atomic():
+            subtree = Page.objects.subtree(self.page)
+            list(subtree.select_for_update().values_list('pk', flat=True))
+            if Reference.objects.protecting(self.page).exists():
+                self.fail(
+                    f'Published blocks elsewhere have started referencing'
+                    f' {self.description} or its descendants.',
+                )
+
+                return False
+
+            leaves = list(
+                subtree.filter(children__isnull=True)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+
+            # Anything else linking in is unpublished, so it's fine to
+            # go.
+            Reference.objects.filter(target_page__in=leaves).delete()
+            search_backend = self._meta.app_config.search_backend
+            if search_backend is not None:
+                search_backend.remove_pages(leaves)
+            Page.objects.filter(pk__in=leaves).delete()
+
+            self.deleted_pages += len(leaves)
+            if self.page.pk in leaves:
+                self.page = None
+                self.finished = timezone.now()
+
+            self.save()
+
+        return self.finished is None
+
+    def fail(self, error):
+        Page.objects.subtree(self.page).update(pending_deletion=False)
+        transaction.on_commit(new_tree_version)
+        ChangeEvent.objects.record(ChangeEvent.PAGE_CREATED, self.page.pk)
+
+        self.error = error
+        self.finished = timezone.now()
+        self.save()
 
 
 class UnsavedWorkQuerySet(models.QuerySet):
@@ -605,8 +1418,8 @@ class UnsavedWorkQuerySet(models.QuerySet):
 
         return self.filter(updated__lte=best_before)
 
-    def delete_old_unsaved_work(self):
-        return self.old().delete()
+    def delete_old_unsaved_work(self, chunk_size=None):
+        return delete_in_chunks(self.old(), chunk_size)
 
 
 class UnsavedWork(models.Model):
@@ -617,7 +1430,9 @@ class UnsavedWork(models.Model):
     )
 
     path = models.TextField(db_index=True)
-    work = models.TextField()
+    work = models.BinaryField(
+        help_text='Encoded by `cms.unsaved_work.encode_work()`.',
+    )
 
     updated = models.DateTimeField(auto_now=True, db_index=True)
 
@@ -635,3 +1450,72 @@ class UnsavedWork(models.Model):
             return False
 
         return True
+
+
+class ChangeEventQuerySet(models.QuerySet):
+
+    def record(self, kind, page_id, block_id=None, reference_id=None):
+        return self.create(
+            kind=kind,
+            page_id=page_id,
+            block_id=block_id,
+            reference_id=reference_id,
+        )
+
+    def since(self, seq):
+        return self.filter(seq__gt=seq).order_by('seq')
+
+
+class ChangeEvent(models.Model):
+    """
+    An append-only log of changes to content readers can see, for
+    mirrors and indexers to follow rather than recrawling.  Events are
+    recorded in the same transaction as the change, and `seq` only
+    increases, so anyone who has seen up to one `seq` has only to ask
+    for those after it.
+
+    The IDs are plain integers, not foreign keys, as what they refer to
+    may since have been deleted.
+    """
+
+    PAGE_CREATED = 'page.created'
+    PAGE_MOVED = 'page.moved'
+    PAGE_RENAMED = 'page.renamed'
+    PAGE_DELETED = 'page.deleted'
+    BLOCK_PUBLISHED = 'block.published'
+    BLOCK_UNPUBLISHED = 'block.unpublished'
+    BLOCK_EDITED = 'block.edited'
+    BLOCK_MOVED = 'block.moved'
+    BLOCK_DELETED = 'block.deleted'
+    REFERENCE_CREATED = 'reference.created'
+    REFERENCE_DELETED = 'reference.deleted'
+    KIND_CHOICES = [
+        (kind, kind) for kind in (
+            PAGE_CREATED,
+            PAGE_MOVED,
+            PAGE_RENAMED,
+            PAGE_DELETED,
+            BLOCK_PUBLISHED,
+            BLOCK_UNPUBLISHED,
+            BLOCK_EDITED,
+            BLOCK_MOVED,
+            BLOCK_DELETED,
+            REFERENCE_CREATED,
+            REFERENCE_DELETED,
+        )
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    created = models.DateTimeField(auto_now_add=True)
+
+    page_id = models.PositiveIntegerField(
+        help_text='The `Page` changed, or holding the `Block` changed.',
+    )
+    block_id = models.PositiveIntegerField(null=True, blank=True)
+    reference_id = models.PositiveIntegerField(null=True, blank=True)
+
+    objects = models.Manager.from_queryset(ChangeEventQuerySet)()
+
+    def __str__(self):
+        return f'{self.seq}: {self.kind}'
@@ -0,0 +1,106 @@
+"""
+Keyset ("cursor") pagination.
+
+Rather than counting through `OFFSET` rows, each page of results
+carries an opaque cursor holding the ordering values of its last row,
+and the next page starts after them.  This costs the same however deep
+into the results the client is, so long as the ordering is indexed.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    return urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()).decode())
+    except (Base64Error, UnicodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+
+    return values
+
+
+def clean_values(model, ordering, values):
+    """
+    Returns `values` converted to the types of `model`'s `ordering`
+    fields.  Raises `InvalidCursor` if any can't be, as clients can send
+    anything.
+    """
+
+    if len(values) != len(ordering):
+        raise InvalidCursor(values)
+
+    cleaned = []
+    for field_name, value in zip(ordering, values):
+        if value is None or isinstance(value, (list, dict)):
+            raise InvalidCursor(values)
+
+        try:
+            cleaned.append(model._meta.get_field(field_name).to_python(value))
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidCursor(values)
+
+    return cleaned
+
+
+def after(ordering, values):
+    """
+    Returns a `Q` matching rows which come after `values` when ordered
+    by the `ordering` field names, all ascending.
+    """
+
+    condition = Q()
+    for index in reversed(range(len(ordering))):
+        equal = {
+            field_name: value for field_name, value
+            in zip(ordering[:index], values[:index])
+        }
+        condition |= Q(**equal, **{f'{ordering[index]}__gt': values[index]})
+
+    return condition
+
+
+def paginate(queryset, ordering, cursor=None, limit=50):
+    """
+    Returns up to `limit` objects from `queryset`, ordered by the
+    `ordering` field names (which must end with something unique), and
+    the cursor for the next page, or `None` if this was the last.
+    Raises `InvalidCursor` for cursors not returned by this function.
+    """
+
+    queryset = queryset.order_by(*ordering)
+
+    if cursor is not None:
+        values = clean_values(
+            queryset.model,
+            ordering,
+            decode_cursor(cursor),
+        )
+        queryset = queryset.filter(after(ordering, values))
+
+    objects = list(queryset[:limit + 1])
+
+    next_cursor = None
+    if len(objects) > limit:
+        objects = objects[:limit]
+        last = objects[-1]
+        next_cursor = encode_cursor([
+            getattr(last, field_name) for field_name in ordering
+        ])
+
+    return objects, next_cursor
@@ -0,0 +1,91 @@
+"""
+A sampling profiler for individual requests.
+
+One background thread wakes every `interval` seconds and records the
+stack of each thread currently being profiled, from
+`sys._current_frames()`.  Nothing is traced, so profiled code runs at
+full speed, and while nothing is being profiled the thread sleeps.
+
+Stacks are kept collapsed, outermost call first, as
+`module:function;module:function` strings with a count of the samples
+they were seen in; the format `flamegraph.pl` and speedscope read.
+"""
+
+from collections import Counter
+import sys
+import threading
+import time
+
+
+def collapse(frame):
+    calls = []
+    while frame is not None:
+        calls.append(
+            f'{frame.f_globals.get("__name__", "?")}:{frame.f_code.co_name}'
+        )
+        frame = frame.f_back
+
+    return ';'.join(reversed(calls))
+
+
+def format_collapsed(stacks):
+    return ''.join(
+        f'{stack} {count}\n' for stack, count in sorted(stacks.items())
+    )
+
+
+class Sampler(threading.Thread):
+
+    def __init__(self, interval):
+        super().__init__(name='cms-profiler', daemon=True)
+
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self._active = threading.Event()
+
+    def start_profiling(self, thread_id):
+        with self._lock:
+            self._profiles[thread_id] = Counter()
+            self._active.set()
+
+    def stop_profiling(self, thread_id):
+        """
+        Stops sampling `thread_id`, returning its collapsed stacks.
+        """
+
+        with self._lock:
+            stacks = self._profiles.pop(thread_id, Counter())
+            if not self._profiles:
+                self._active.clear()
+
+        return stacks
+
+    def sample(self):
+        with self._lock:
+            frames = sys._current_frames()
+            for thread_id, stacks in self._profiles.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[collapse(frame)] += 1
+
+    def run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            self.sample()
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler(interval):
+    global _sampler
+
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = Sampler(interval)
+            _sampler.start()
+
+    return _sampler
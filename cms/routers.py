@@ -0,0 +1,70 @@
+"""
+Routing of readers' queries to read replicas.
+
+`ReplicaRoutingMiddleware` wraps requests for `CmsConfig.reader_views`
+in `use_replicas()`, during which `ReplicaRouter` sends reads of the
+CMS's own models to one of `CmsConfig.replica_databases`, picked per
+request.  Everything else, including every write and anything read
+whilst handling the staff views or `Page.save()`'s cascades, goes to
+`default`.  Sessions and users are always read from `default`, as a
+replica that's behind could otherwise log people out.
+
+Replicas lag, so after a client's write succeeds their reads stay on
+`default` for `primary_after_write_window` seconds, to show them their
+change.  Set the window to comfortably more than the usual lag.
+
+To try this out locally, copy `db.sqlite3` to `replica.sqlite3`, the
+`replica` database in the project's settings, and add `'replica'` to
+`replica_databases`.  Copy it again to "replicate".
+"""
+
+from contextlib import contextmanager
+import random
+import threading
+
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS
+
+
+_local = threading.local()
+
+
+def current_replica():
+    """
+    Returns the replica this thread's reads are going to, if any.
+    """
+
+    return getattr(_local, 'replica', None)
+
+
+@contextmanager
+def use_replicas():
+    replicas = apps.get_app_config('cms').replica_databases
+    previous = current_replica()
+    _local.replica = random.choice(replicas) if replicas else None
+    try:
+        yield _local.replica
+    finally:
+        _local.replica = previous
+
+
+class ReplicaRouter(object):
+
+    app_label = 'cms'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != self.app_label:
+            return None
+
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as `default`.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from `default`, by replication.
+        return db not in apps.get_app_config('cms').replica_databases
@@ -0,0 +1,239 @@
+"""
+Full-text search over published `Block`s and `Page` titles.
+
+The index is kept up to date by `Block.save()`/`.delete()`,
+`Page.save()`/`.delete()` and `DeletionJob`s, one row at a time, and
+can be rebuilt from scratch with `manage.py rebuild_search_index`.
+Only `Page` IDs are stored against rows; URLs are built from
+`cms_page` when searching, so moving a `Page` needs no reindexing.
+"""
+
+from collections import namedtuple
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+
+class SearchResult(namedtuple(
+        'SearchResult',
+        ('page', 'block_id', 'snippet', 'rank'))):
+
+    @property
+    def url(self):
+        url = self.page.get_absolute_url()
+        if self.block_id is not None:
+            url += f'#{self.block_id}'
+
+        return url
+
+
+def rowid_for_block(block_id):
+    return block_id * 2
+
+
+def rowid_for_page(page_id):
+    return page_id * 2 + 1
+
+
+def strip_hooks(content):
+    from .models import Reference
+
+    return Reference.generic_hook_re.sub('', content)
+
+
+def make_match_expression(query):
+    """
+    Turns free text into an FTS5 query matching rows containing every
+    word, treating the last as a prefix as it may be half typed.
+    """
+
+    terms = [
+        '"{}"'.format(term.replace('"', '""')) for term in query.split()
+    ]
+    if terms:
+        terms[-1] += '*'
+
+    return ' '.join(terms)
+
+
+class SQLiteSearchBackend(object):
+    """
+    Searches the `cms_search` FTS5 table created by migration 0018.
+
+    `Block`s and `Page`s share the table, `Block`s at even rowids and
+    `Page`s at odd ones, so either can be replaced or removed by rowid
+    without scanning.
+    """
+
+    table = 'cms_search'
+    # Separates the highlighted parts of snippets; replaced with
+    # `<mark>` once the rest has been escaped.
+    highlight_start = '\x02'
+    highlight_end = '\x03'
+    snippet_tokens = 16
+    # `bm25()` weights for the title and content columns; `page_id`
+    # comes first, but isn't indexed.
+    title_weight = 10.0
+    content_weight = 1.0
+
+    def _replace(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(row[0], ) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, page_id, title, content)'
+                ' VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def _remove(self, rowids):
+        rowids = list(rowids)
+        if not rowids:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(rowid, ) for rowid in rowids],
+            )
+
+    def index_blocks(self, blocks):
+        """
+        Indexes `(block_id, page_id, content)` triples, replacing any
+        earlier entries for the same `Block`s.
+        """
+
+        self._replace(
+            (rowid_for_block(block_id), page_id, '', strip_hooks(content))
+            for block_id, page_id, content in blocks
+        )
+
+    def index_pages(self, pages):
+        """
+        Indexes `(page_id, title)` pairs, replacing any earlier entries
+        for the same `Page`s.
+        """
+
+        self._replace(
+            (rowid_for_page(page_id), page_id, title, '')
+            for page_id, title in pages
+        )
+
+    def remove_blocks(self, block_ids):
+        self._remove(rowid_for_block(block_id) for block_id in block_ids)
+
+    def remove_pages(self, page_ids):
+        """
+        Removes `Page`s and all of their `Block`s from the index.
+        """
+
+        from .models import Block
+
+        page_ids = list(page_ids)
+        block_ids = Block.objects.filter(
+            parent_page__in=page_ids,
+        ).values_list('pk', flat=True)
+
+        self.remove_blocks(block_ids)
+        self._remove(rowid_for_page(page_id) for page_id in page_ids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def get_entries(self, after=None, limit=1000):
+        """
+        Returns up to `limit` entries, in order, as `(entry_id, page_id,
+        block_id)`, with a `block_id` of `None` for `Page` titles.  Pass
+        the last `entry_id` as `after` for the next lot.
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, page_id FROM {self.table}'
+                ' WHERE rowid > %s ORDER BY rowid LIMIT %s',
+                [after or 0, limit],
+            )
+            rows = cursor.fetchall()
+
+        return [
+            (rowid, page_id, rowid // 2 if rowid % 2 == 0 else None)
+            for rowid, page_id in rows
+        ]
+
+    def make_snippet(self, snippet):
+        return mark_safe(
+            escape(snippet)
+            .replace(self.highlight_start, '<mark>')
+            .replace(self.highlight_end, '</mark>')
+        )
+
+    def search(self, query, limit=20):
+        """
+        Returns up to `limit` `SearchResult`s for `query`, best first,
+        leaving out `Page`s which are being deleted.
+        """
+
+        from .models import Page
+
+        match = make_match_expression(query)
+        if not match:
+            return []
+
+        # FTS5 functions and `MATCH` need the table's own name, not an
+        # alias.
+        t = self.table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {t}.rowid,'
+                f' snippet({t}, -1, %s, %s, %s, %s),'
+                f' bm25({t}, 0, %s, %s) AS rank,'
+                ' page.id, page.parent_id, page.title, page.slug,'
+                ' page.denormalised_path, page.denormalised_titles'
+                f' FROM {t}'
+                f' INNER JOIN {Page._meta.db_table} AS page'
+                f' ON page.id = {t}.page_id'
+                f' WHERE {t} MATCH %s AND NOT page.pending_deletion'
+                ' ORDER BY rank LIMIT %s',
+                [
+                    self.highlight_start,
+                    self.highlight_end,
+                    '…',
+                    self.snippet_tokens,
+                    self.title_weight,
+                    self.content_weight,
+                    match,
+                    limit,
+                ],
+            )
+            rows = cursor.fetchall()
+
+        results = []
+        for rowid, snippet, rank, *page_values in rows:
+            page = Page(**dict(zip(
+                (
+                    'id',
+                    'parent_id',
+                    'title',
+                    'slug',
+                    'denormalised_path',
+                    'denormalised_titles',
+                ),
+                page_values,
+            )))
+            block_id = rowid // 2 if rowid % 2 == 0 else None
+            results.append(SearchResult(
+                page=page,
+                block_id=block_id,
+                snippet=self.make_snippet(snippet),
+                rank=rank,
+            ))
+
+        return results
@@ -0,0 +1,34 @@
+"""
+Housekeeping which used to be done on the request path: flushing
+buffered unsaved work, and deleting old unsaved work and unpublished
+`Block`s.  Run by `manage.py cms_sweep`, once or, given `--interval`,
+repeatedly, in a process of its own.
+"""
+
+import time
+
+from .metrics import sweep_duration
+from .models import Block, UnsavedWork
+
+
+def sweep(chunk_size=None):
+    """
+    Runs every sweep, returning a `dict` of how many rows each deleted.
+    """
+
+    start = time.perf_counter()
+
+    UnsavedWork._meta.app_config.unsaved_work_storage.flush()
+
+    deleted = {
+        'unsaved_work': UnsavedWork.objects.delete_old_unsaved_work(
+            chunk_size,
+        ),
+        'unpublished_blocks': Block.objects.delete_old_unpublished(
+            chunk_size,
+        ),
+    }
+
+    sweep_duration.observe(time.perf_counter() - start)
+
+    return deleted
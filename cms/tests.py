@@ -1,7 +1,48 @@
-from django.core.exceptions import ValidationError
-from django.test import TestCase, tag
-
-from .models import Block, Page, Reference, TextBlock
+from datetime import timedelta
+from io import StringIO
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import CommandError, call_command
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.db import connection, connections, transaction
+from django.db.models import ProtectedError
+from django.test import RequestFactory, TestCase, TransactionTestCase, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import (
+    Block,
+    ChangeEvent,
+    DeletionJob,
+    Page,
+    Reference,
+    RenderJob,
+    TextBlock,
+    UnsavedWork,
+)
+from . import api, instrumentation, metrics
+from .benchmarks import build_site
+from .caching import check_cache_is_shared
+from .loadtest import run_load_test
+from .middleware import ProfilingMiddleware
+from .pagination import encode_cursor
+from .routers import ReplicaRouter, use_replicas
+from .unsaved_work import (
+    DatabaseStorage,
+    WriteBehindStorage,
+    decode_work,
+    encode_work,
+)
+from .views import ApiView, HomeView
 
 
 class PolymorphicCasting(TestCase):
@@ -408,3 +449,2401 @@ class PathDenormalisationTestCase(TestCase):
                 {'title': 'A', 'url': '/a/'},
             ],
         )
+
+
+class BackgroundRendering(TestCase):
+
+    def setUp(self):
+        self.a = Page.objects.create(title='A')
+        self.b = Page.objects.create(title='B')
+        self.c = Page.objects.create(title='C', parent=self.b)
+
+        self.block = TextBlock.objects.create(parent_page=self.a, position=0)
+        self.reference = Reference.objects.create(
+            containing_block=self.block,
+            referenced_page=self.c,
+        )
+        self.block.content = self.reference.hook_text
+        self.block.save()
+
+    def render_queued_blocks(self):
+        call_command(
+            'render_worker',
+            once=True,
+            workers=1,
+            stdout=StringIO(),
+        )
+
+    @tag('functional')
+    def test_render_is_stored_for_subsequent_readers(self):
+        self.block.get_rendered()
+
+        block = Block.objects.get(id=self.block.id)
+        with self.assertNumQueries(0):
+            self.assertIn('/b/c/', block.get_rendered())
+
+    @tag('functional')
+    def test_editing_content_discards_stored_render(self):
+        self.block.get_rendered()
+
+        self.block.content = 'Something else'
+        self.block.save()
+
+        block = Block.objects.get(id=self.block.id)
+        self.assertIsNone(block.rendered)
+        self.assertIn('Something else', block.get_rendered())
+
+    @tag('functional')
+    def test_renders_of_since_edited_content_are_not_stored(self):
+        stale = Block.objects.get(id=self.block.id)
+
+        self.block.content = 'Something else'
+        self.block.save()
+        stale.rerender()
+
+        block = Block.objects.get(id=self.block.id)
+        self.assertIsNone(block.rendered)
+        self.assertIn('Something else', block.get_rendered())
+
+    @tag('functional')
+    def test_renders_begun_before_references_change_are_not_stored(self):
+        stale = Block.objects.get(id=self.block.id)
+
+        Reference.objects.create(
+            containing_block=self.block,
+            referenced_page=self.b,
+        )
+        stale.rerender()
+
+        self.assertIsNone(Block.objects.get(id=self.block.id).rendered)
+
+    @tag('functional')
+    def test_jobs_are_only_removed_once_rendered(self):
+        RenderJob.objects.enqueue(Block.objects.filter(id=self.block.id))
+
+        jobs = RenderJob.objects.claim(10)
+        self.assertEqual([job.block_id for job in jobs], [self.block.id])
+        self.assertEqual(RenderJob.objects.claim(10), [])
+
+        with mock.patch.object(
+                Page._meta.app_config, 'render_claim_timeout', timedelta(0)):
+            # As if the worker crashed.
+            reclaimed = RenderJob.objects.claim(10)
+        self.assertEqual([job.pk for job in reclaimed], [jobs[0].pk])
+
+        RenderJob.objects.finish(reclaimed)
+        self.assertFalse(RenderJob.objects.exists())
+
+    @tag('functional')
+    def test_blocks_queued_again_whilst_rendering_are_rendered_again(self):
+        RenderJob.objects.enqueue(Block.objects.filter(id=self.block.id))
+        jobs = RenderJob.objects.claim(10)
+
+        RenderJob.objects.enqueue(Block.objects.filter(id=self.block.id))
+        RenderJob.objects.finish(jobs)
+
+        self.assertEqual(
+            [job.block_id for job in RenderJob.objects.claim(10)],
+            [self.block.id],
+        )
+
+    @tag('functional')
+    def test_moving_referenced_page_serves_stale_render_until_worker_runs(self):  # noqa
+        self.block.get_rendered()
+
+        self.b.parent = self.a
+        self.b.save()
+
+        block = Block.objects.get(id=self.block.id)
+        self.assertIn('/b/c/', block.get_rendered())
+
+        self.render_queued_blocks()
+
+        block = Block.objects.get(id=self.block.id)
+        self.assertIn('/a/b/c/', block.get_rendered())
+        self.assertFalse(RenderJob.objects.exists())
+
+    @tag('functional')
+    def test_moving_referenced_block_queues_a_render(self):
+        target = TextBlock.objects.create(parent_page=self.b, position=0)
+        Reference.objects.create(
+            containing_block=self.block,
+            referenced_block=target,
+        )
+
+        target.parent_page = self.a
+        target.position = 1
+        target.save()
+
+        self.assertTrue(RenderJob.objects.filter(block=self.block).exists())
+
+    @tag('functional')
+    def test_queued_renders_for_the_same_block_are_coalesced(self):
+        self.b.parent = self.a
+        self.b.save()
+        self.b.parent = None
+        self.b.save()
+
+        RenderJob.objects.enqueue(Block.objects.filter(id=self.block.id))
+
+        self.assertEqual(RenderJob.objects.count(), 1)
+
+
+class DependentLookup(TestCase):
+
+    def setUp(self):
+        """
+        A
+        |
+        +- B
+           |
+           +- C
+
+        D (links to B's block and C)
+        E (links to D)
+        """
+
+        self.a = Page.objects.create(title='A')
+        self.b = Page.objects.create(title='B', parent=self.a)
+        self.c = Page.objects.create(title='C', parent=self.b)
+        self.d = Page.objects.create(title='D')
+        self.e = Page.objects.create(title='E')
+
+        self.b_block = TextBlock.objects.create(parent_page=self.b, position=0)
+
+        self.d_block = TextBlock.objects.create(parent_page=self.d, position=0)
+        Reference.objects.create(
+            containing_block=self.d_block,
+            referenced_block=self.b_block,
+        )
+        Reference.objects.create(
+            containing_block=self.d_block,
+            referenced_page=self.c,
+        )
+
+        self.e_block = TextBlock.objects.create(parent_page=self.e, position=0)
+        Reference.objects.create(
+            containing_block=self.e_block,
+            referenced_page=self.d,
+        )
+
+    @tag('functional')
+    def test_links_to_descendants_and_their_blocks_are_dependents(self):
+        self.assertEqual(list(self.a.get_dependent_blocks()), [self.d_block])
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.a.get_dependent_pages()), [self.d])
+
+    @tag('functional')
+    def test_links_to_ancestors_are_not_dependents(self):
+        self.assertFalse(self.c.get_dependent_blocks().filter(
+            id=self.b_block.id,
+        ).exists())
+        self.assertFalse(self.b.get_dependent_blocks().filter(
+            id=self.e_block.id,
+        ).exists())
+        self.assertFalse(self.b.get_dependent_pages().filter(
+            id=self.e.id,
+        ).exists())
+
+    @tag('functional')
+    def test_dependents_follow_referenced_blocks_between_pages(self):
+        self.b_block.parent_page = self.e
+        self.b_block.position = 1
+        self.b_block.save()
+
+        self.assertFalse(Reference.objects.to_subtree(self.a).filter(
+            referenced_block=self.b_block,
+        ).exists())
+        self.assertEqual(list(self.e.get_dependent_blocks()), [self.d_block])
+
+    @tag('functional')
+    def test_moving_a_subtree_queues_renders_in_constant_queries(self):
+        self.a.slug = 'z'
+        with self.assertNumQueries(12):
+            # Three `Page` saves and child lookups, then re-queueing
+            # renders under way, one dependent lookup, the queueing, and
+            # a `ChangeEvent`.
+            self.a.save()
+
+        self.assertEqual(
+            list(RenderJob.objects.values_list('block', flat=True)),
+            [self.d_block.id],
+        )
+
+
+class PageDeletion(TestCase):
+
+    def setUp(self):
+        self.page = Page.objects.create(title='A')
+        self.child = Page.objects.create(title='B', parent=self.page)
+        self.block = TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+        )
+
+        self.other_page = Page.objects.create(title='C')
+
+    def create_referencing_blocks(self, count, published=False):
+        blocks = []
+        for position in range(count):
+            block = TextBlock.objects.create(
+                parent_page=self.other_page,
+                position=position,
+                published=published,
+            )
+            for target in (self.page, self.child):
+                Reference.objects.create(
+                    containing_block=block,
+                    referenced_page=target,
+                )
+            Reference.objects.create(
+                containing_block=block,
+                referenced_block=self.block,
+            )
+
+            blocks.append(block)
+
+        return blocks
+
+    def count_deletion_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            self.page.delete()
+
+        return len(context.captured_queries)
+
+    @tag('functional')
+    def test_references_from_unpublished_blocks_are_deleted_with_the_subtree(self):  # noqa
+        blocks = self.create_referencing_blocks(2)
+
+        self.page.delete()
+
+        self.assertFalse(
+            Reference.objects.filter(containing_block__in=blocks).exists(),
+        )
+
+    @tag('functional')
+    def test_references_from_published_blocks_protect_the_subtree(self):
+        self.create_referencing_blocks(1, published=True)
+
+        with self.assertRaises(ProtectedError):
+            self.page.delete()
+
+    @tag('functional', 'performance')
+    def test_number_of_queries_does_not_depend_on_number_of_references(self):
+        self.create_referencing_blocks(1)
+        few = self.count_deletion_queries()
+
+        self.other_page.delete()
+        self.setUp()
+        self.create_referencing_blocks(25)
+        many = self.count_deletion_queries()
+
+        self.assertEqual(few, many)
+
+
+class ReferenceValidation(TestCase):
+
+    def setUp(self):
+        self.page = Page.objects.create(title='A')
+        self.block = TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+        )
+        self.other_block = TextBlock.objects.create(
+            parent_page=self.page,
+            position=1,
+        )
+
+        self.reference = Reference.objects.create(
+            containing_block=self.block,
+            referenced_page=self.page,
+        )
+        self.other_reference = Reference.objects.create(
+            containing_block=self.other_block,
+            referenced_page=self.page,
+        )
+
+    @tag('functional', 'performance')
+    def test_validation_takes_a_single_query(self):
+        self.block.content = self.reference.hook_text
+
+        with self.assertNumQueries(1):
+            self.block.validate_references()
+
+    @tag('functional', 'performance')
+    def test_validation_of_the_same_content_is_remembered(self):
+        self.block.content = self.reference.hook_text
+        self.block.validate_references()
+
+        with self.assertNumQueries(0):
+            self.block.publish(commit=False)
+
+    @tag('functional')
+    def test_remembered_validation_is_forgotten_when_references_change(self):
+        self.block.content = self.reference.hook_text
+        self.block.validate_references()
+
+        Reference.objects.filter(id=self.reference.id).delete()
+
+        self.assertEqual(
+            self.block.find_missing_references(),
+            {self.reference.id},
+        )
+
+    @tag('functional')
+    def test_references_belonging_to_other_blocks_are_reported(self):
+        content = (
+            f'{self.reference.hook_text} {self.other_reference.hook_text}'
+        )
+
+        self.assertEqual(
+            self.block.find_missing_references(content),
+            {self.other_reference.id},
+        )
+        with self.assertRaisesMessage(ValidationError, 'Reference ['):
+            self.block.validate_references(content)
+
+    @tag('functional')
+    def test_bulk_validation_reports_missing_references_per_block(self):
+        self.block.content = self.other_reference.hook_text
+        self.block.save()
+        self.other_block.content = (
+            f'{self.other_reference.hook_text} {Reference.hook}(9999)'
+        )
+        self.other_block.save()
+
+        # Two to load the `Block`s polymorphically, one for `Reference`s.
+        with self.assertNumQueries(3):
+            missing = self.page.blocks.find_missing_references()
+
+        self.assertEqual(missing, {
+            self.block.id: {self.other_reference.id},
+            self.other_block.id: {9999},
+        })
+        with self.assertRaises(ValidationError):
+            Block.objects.validate_references()
+
+
+class ReferenceAudit(TestCase):
+
+    def setUp(self):
+        self.page = Page.objects.create(title='A')
+        self.block = TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+            published=True,
+        )
+
+    def audit(self, **options):
+        stdout = StringIO()
+        call_command('audit_references', stdout=stdout, **options)
+
+        return stdout.getvalue()
+
+    @tag('functional')
+    def test_site_with_only_valid_references_passes(self):
+        reference = Reference.objects.create(
+            containing_block=self.block,
+            referenced_page=self.page,
+        )
+        self.block.content = reference.hook_text
+        self.block.save()
+
+        self.assertIn('No problems found', self.audit(chunk_size=1))
+
+    @tag('functional')
+    def test_problems_are_reported(self):
+        draft = TextBlock.objects.create(parent_page=self.page, position=1)
+        orphan = Reference.objects.create(
+            containing_block=self.block,
+            referenced_block=draft,
+        )
+        self.block.content = f'{Reference.hook}(9999)'
+        self.block.save()
+
+        stdout = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('audit_references', stdout=stdout)
+
+        output = stdout.getvalue()
+        self.assertIn('Dangling hook: block', output)
+        self.assertIn(f'reference {orphan.id} is not hooked', output)
+        self.assertIn(f'unpublished block {draft.id}', output)
+
+    @tag('functional')
+    def test_unpublished_blocks_can_be_skipped(self):
+        draft = TextBlock.objects.create(
+            parent_page=self.page,
+            position=1,
+            content=f'{Reference.hook}(9999)',
+        )
+        Reference.objects.create(
+            containing_block=draft,
+            referenced_page=self.page,
+        )
+
+        self.assertIn('No problems found', self.audit(published_only=True))
+
+
+class WriteBehindUnsavedWork(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        # The tests' `LocMemCache` is only shared within their process.
+        patcher = mock.patch.object(
+            WriteBehindStorage,
+            'unshared_cache_backends',
+            (),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = get_user_model().objects.create(username='barret')
+        self.storage = WriteBehindStorage()
+        self.storage.flush_batch_size = 3
+
+    @tag('functional', 'performance')
+    def test_stashing_and_restoring_does_not_touch_the_database(self):
+        with self.assertNumQueries(0):
+            self.storage.stash(self.user, '/a/', {'content': 'Hi'})
+
+            self.assertEqual(
+                self.storage.get(self.user, '/a/'),
+                {'content': 'Hi'},
+            )
+
+    def get_stored_work(self):
+        return {
+            path: decode_work(work) for path, work
+            in UnsavedWork.objects.values_list('path', 'work')
+        }
+
+    @tag('functional')
+    def test_stashes_are_flushed_in_batches(self):
+        self.storage.stash(self.user, '/a/', {'content': 'A'})
+        self.storage.stash(self.user, '/b/', {'content': 'B'})
+        self.assertFalse(UnsavedWork.objects.exists())
+
+        self.storage.stash(self.user, '/a/', {'content': 'A2'})
+        self.assertEqual(
+            self.get_stored_work(),
+            {'/a/': {'content': 'A2'}, '/b/': {'content': 'B'}},
+        )
+
+        self.storage.stash(self.user, '/c/', {'content': 'C'})
+        self.assertNotIn('/c/', self.get_stored_work())
+
+    @tag('functional')
+    def test_stashes_from_other_processes_are_all_flushed(self):
+        other_storage = WriteBehindStorage()
+        other_user = get_user_model().objects.create(username='cloud')
+
+        self.storage.stash(self.user, '/a/', {'content': 'A'})
+        other_storage.stash(other_user, '/a/', {'content': 'B'})
+        self.storage.flush()
+
+        self.assertEqual(
+            set(UnsavedWork.objects.values_list('user__username', 'path')),
+            {('barret', '/a/'), ('cloud', '/a/')},
+        )
+
+    @tag('functional')
+    def test_stashes_whose_slots_were_skipped_go_to_the_database(self):
+        # A stash has numbered its slot, but not yet written it.
+        slot = self.storage.next_slot()
+        self.storage.flush()
+
+        with mock.patch.object(self.storage, 'next_slot', return_value=slot):
+            self.storage.stash(self.user, '/a/', {'content': 'A'})
+
+        self.assertEqual(self.get_stored_work(), {'/a/': {'content': 'A'}})
+
+    @tag('functional')
+    def test_overdue_stashes_are_flushed(self):
+        self.storage.flush_after = 0
+
+        self.storage.stash(self.user, '/a/', {'content': 'A'})
+
+        self.assertTrue(UnsavedWork.objects.filter(path='/a/').exists())
+
+    @tag('functional')
+    def test_work_missing_from_the_cache_is_read_from_the_database(self):
+        self.storage.stash(self.user, '/a/', {'content': 'A'})
+        self.storage.flush()
+        cache.clear()
+
+        self.assertEqual(
+            self.storage.get(self.user, '/a/'),
+            {'content': 'A'},
+        )
+
+    @tag('functional')
+    def test_discarded_work_is_gone_from_both_cache_and_database(self):
+        self.storage.stash(self.user, '/a/', {'content': 'A'})
+        self.storage.flush()
+        self.storage.stash(self.user, '/a/', {'content': 'A2'})
+
+        self.storage.discard(self.user, '/a/')
+        self.storage.flush()
+
+        self.assertIsNone(self.storage.get(self.user, '/a/'))
+        self.assertFalse(UnsavedWork.objects.exists())
+
+    @tag('functional')
+    def test_work_discarded_during_a_flush_is_not_written_back(self):
+        self.storage.stash(self.user, '/a/', {'content': 'A'})
+        write = self.storage.write
+
+        def write_after_discard(entries):
+            # The flush has read the entry, but not yet written it.
+            self.storage.discard(self.user, '/a/')
+            write(entries)
+
+        with mock.patch.object(
+                self.storage, 'write', side_effect=write_after_discard):
+            self.storage.flush()
+
+        self.assertIsNone(self.storage.get(self.user, '/a/'))
+        self.assertFalse(UnsavedWork.objects.exists())
+
+    @tag('functional')
+    def test_caches_local_to_a_process_are_refused(self):
+        with mock.patch.object(
+                WriteBehindStorage,
+                'unshared_cache_backends',
+                ('django.core.cache.backends.locmem.LocMemCache', )):
+            with self.assertRaises(ImproperlyConfigured):
+                WriteBehindStorage()
+
+    @tag('functional')
+    def test_editor_work_is_restored_after_adding_a_reference(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+
+        page = Page.objects.create(title='A')
+        block = TextBlock.objects.create(parent_page=page, position=0)
+        url = f'/edit-block/{block.id}/'
+
+        self.client.post(url, {'content': 'Unsaved', 'addReference': ''})
+        response = self.client.get(url)
+
+        form = response.context['form']
+        self.assertEqual(form.initial['content'], 'Unsaved')
+
+
+class Sweeping(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.page = Page.objects.create(title='A')
+        self.user = get_user_model().objects.create(username='aeris')
+
+        long_ago = timezone.now() - timedelta(days=30)
+
+        self.old_blocks = []
+        for position in range(3):
+            block = TextBlock.objects.create(
+                parent_page=self.page,
+                position=position,
+            )
+            self.old_blocks.append(block)
+        self.published = TextBlock.objects.create(
+            parent_page=self.page,
+            position=10,
+            published=True,
+        )
+        self.new = TextBlock.objects.create(parent_page=self.page, position=11)
+        Block.objects.exclude(id=self.new.id).update(created=long_ago)
+
+        UnsavedWork.objects.create(user=self.user, path='/old/', work=b'')
+        UnsavedWork.objects.create(user=self.user, path='/new/', work=b'')
+        UnsavedWork.objects.filter(path='/old/').update(updated=long_ago)
+
+    def sweep(self):
+        stdout = StringIO()
+        call_command('cms_sweep', chunk_size=2, stdout=stdout)
+
+        return stdout.getvalue()
+
+    @tag('functional')
+    def test_old_unpublished_blocks_and_unsaved_work_are_swept(self):
+        output = self.sweep()
+
+        self.assertIn('Deleted 3 unpublished blocks.', output)
+        self.assertIn('Deleted 1 unsaved work.', output)
+        self.assertEqual(
+            set(Block.objects.all()),
+            {self.published, self.new},
+        )
+        self.assertEqual(
+            list(UnsavedWork.objects.values_list('path', flat=True)),
+            ['/new/'],
+        )
+
+    @tag('functional')
+    def test_sweeping_repeats_given_an_interval(self):
+        command = 'cms.management.commands.cms_sweep'
+        stdout = StringIO()
+        with mock.patch(f'{command}.connection'), mock.patch(
+                f'{command}.time.sleep',
+                side_effect=[None, KeyboardInterrupt]) as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('cms_sweep', interval=5, stdout=stdout)
+
+        sleep.assert_called_with(5)
+        self.assertEqual(stdout.getvalue().count('unpublished blocks'), 2)
+
+    @tag('functional')
+    def test_referenced_unpublished_blocks_are_not_swept(self):
+        Reference.objects.create(
+            containing_block=self.published,
+            referenced_block=self.old_blocks[0],
+        )
+
+        self.sweep()
+
+        self.assertTrue(Block.objects.filter(
+            id=self.old_blocks[0].id,
+        ).exists())
+
+    @tag('functional')
+    def test_reading_stale_unsaved_work_does_not_sweep(self):
+        storage = DatabaseStorage()
+
+        self.assertIsNone(storage.get(self.user, '/old/'))
+        self.assertTrue(UnsavedWork.objects.filter(path='/old/').exists())
+
+
+class UnsavedWorkEncoding(TestCase):
+
+    def setUp(self):
+        self.base = {'content': '# Title\n\nFirst.\n\nSecond.\n' * 100}
+        self.work = {
+            'content': self.base['content'].replace('Second.', 'Third.', 1),
+            'csrfmiddlewaretoken': 'abc',
+        }
+
+    @tag('functional')
+    def test_work_round_trips(self):
+        self.assertEqual(decode_work(encode_work(self.work)), self.work)
+
+    @tag('functional')
+    def test_work_round_trips_as_a_diff_against_its_base(self):
+        encoded = encode_work(self.work, self.base)
+
+        self.assertEqual(decode_work(encoded, self.base), self.work)
+        self.assertLess(len(encoded), len(encode_work(self.work)))
+
+    @tag('functional')
+    def test_diffs_against_changed_bases_are_dropped(self):
+        encoded = encode_work(self.work, self.base)
+
+        self.assertEqual(
+            decode_work(encoded, {'content': 'Changed.'}),
+            {'csrfmiddlewaretoken': 'abc'},
+        )
+
+    @tag('functional')
+    def test_work_is_stored_compressed(self):
+        user = get_user_model().objects.create(username='tifa')
+        DatabaseStorage().stash(user, '/a/', self.work)
+
+        stored = UnsavedWork.objects.get(user=user).work
+        self.assertLess(len(stored), len(self.work['content']) // 10)
+
+
+class DeletionPreview(TestCase):
+
+    def setUp(self):
+        staff = get_user_model().objects.create(
+            username='reeve',
+            is_staff=True,
+        )
+        self.client.force_login(staff)
+
+        self.page = Page.objects.create(title='A')
+
+    def build_subtree(self, children, grandchildren, prefix=''):
+        for child_number in range(children):
+            child = Page.objects.create(
+                title=f'{prefix}Child {child_number}',
+                parent=self.page,
+            )
+            TextBlock.objects.create(
+                parent_page=child,
+                position=0,
+                published=True,
+            )
+            TextBlock.objects.create(parent_page=child, position=1)
+
+            for grandchild_number in range(grandchildren):
+                Page.objects.create(
+                    title=f'Grandchild {grandchild_number}',
+                    parent=child,
+                )
+
+    def get_preview(self, **params):
+        return self.client.get(f'/delete-page/{self.page.id}/', params)
+
+    @tag('functional')
+    def test_preview_counts_published_content_in_the_subtree(self):
+        self.build_subtree(children=2, grandchildren=2)
+        block = Block.objects.filter(published=True).first()
+        Reference.objects.create(
+            containing_block=block,
+            referenced_page=self.page,
+        )
+
+        context = self.get_preview().context
+
+        self.assertEqual(context['page_count'], 7)
+        self.assertEqual(
+            context['block_counts'],
+            [{'type': 'text blocks', 'count': 2}],
+        )
+        self.assertEqual(context['reference_count'], 1)
+        self.assertEqual(
+            [child.published_block_count for child in context['children']],
+            [1, 1],
+        )
+
+    @tag('functional')
+    def test_descendants_are_paginated(self):
+        self.build_subtree(children=3, grandchildren=20)
+
+        first = self.get_preview().context['descendants']
+        last = self.get_preview(descendants_page=2).context['descendants']
+
+        self.assertEqual(first.paginator.count, 63)
+        self.assertEqual(len(first), 50)
+        self.assertEqual(len(last), 13)
+
+    @tag('functional', 'performance')
+    def test_number_of_queries_does_not_depend_on_subtree_size(self):
+        self.build_subtree(children=1, grandchildren=1)
+        with CaptureQueriesContext(connection) as small:
+            self.get_preview()
+
+        self.build_subtree(children=5, grandchildren=5, prefix='More ')
+        with CaptureQueriesContext(connection) as large:
+            self.get_preview()
+
+        self.assertEqual(
+            len(small.captured_queries),
+            len(large.captured_queries),
+        )
+
+
+class SubtreeDeletion(TestCase):
+
+    def setUp(self):
+        """
+        A
+        |
+        +- B
+        |  |
+        |  +- C
+        |
+        +- D
+
+        E
+        """
+
+        staff = get_user_model().objects.create(
+            username='cid',
+            is_staff=True,
+        )
+        self.client.force_login(staff)
+
+        self.a = Page.objects.create(title='A')
+        self.b = Page.objects.create(title='B', parent=self.a)
+        self.c = Page.objects.create(title='C', parent=self.b)
+        self.d = Page.objects.create(title='D', parent=self.a)
+        self.e = Page.objects.create(title='E')
+
+        self.c_block = TextBlock.objects.create(
+            parent_page=self.c,
+            position=0,
+            published=True,
+        )
+        self.e_block = TextBlock.objects.create(
+            parent_page=self.e,
+            position=0,
+            published=True,
+        )
+
+    def run_worker(self, batch_size=1):
+        call_command(
+            'deletion_worker',
+            once=True,
+            batch_size=batch_size,
+            stdout=StringIO(),
+        )
+
+    @tag('functional')
+    def test_subtree_is_hidden_from_readers_immediately(self):
+        DeletionJob.objects.start(self.a)
+
+        self.assertEqual(self.client.get('/a/b/c/').status_code, 404)
+        self.assertNotIn(
+            'A',
+            [link['title'] for link in self.e.get_sidebar_links()],
+        )
+        self.assertEqual(Page.objects.count(), 5)
+
+    @tag('functional')
+    def test_subtrees_are_matched_case_sensitively(self):
+        upper_a = Page.objects.create(title='A', slug='A')
+        upper_b = Page.objects.create(title='B', parent=upper_a)
+        upper_c = Page.objects.create(title='C', parent=upper_b)
+
+        self.assertEqual(
+            set(Page.objects.subtree(self.a)),
+            {self.a, self.b, self.c, self.d},
+        )
+        self.assertEqual(
+            set(Page.objects.subtree(upper_a)),
+            {upper_a, upper_b, upper_c},
+        )
+
+    @tag('functional')
+    def test_subtree_is_deleted_in_batches_leaves_first(self):
+        job = DeletionJob.objects.start(self.a)
+
+        self.assertTrue(job.run_batch(2))
+        self.assertEqual(job.deleted_pages, 2)
+        self.assertEqual(
+            set(Page.objects.values_list('title', flat=True)),
+            {'A', 'B', 'E'},
+        )
+
+        self.run_worker()
+
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished)
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(list(Page.objects.all()), [self.e])
+
+    @tag('functional')
+    def test_published_references_from_outside_protect_the_subtree(self):
+        Reference.objects.create(
+            containing_block=self.e_block,
+            referenced_block=self.c_block,
+        )
+
+        with self.assertRaises(ProtectedError):
+            DeletionJob.objects.start(self.a)
+
+        self.assertFalse(Page.objects.filter(pending_deletion=True).exists())
+
+    @tag('functional')
+    def test_job_fails_if_published_references_appear_while_running(self):
+        job = DeletionJob.objects.start(self.a)
+        job.run_batch(1)
+
+        # B can't have gone in the first batch, having a child.
+        reference = Reference.objects.create(
+            containing_block=self.e_block,
+            referenced_page=self.b,
+        )
+
+        self.assertFalse(job.run_batch(1))
+        self.assertIsNotNone(job.finished)
+        self.assertTrue(job.error)
+        self.assertTrue(Reference.objects.filter(pk=reference.pk).exists())
+        self.assertFalse(Page.objects.filter(pending_deletion=True).exists())
+        self.assertEqual(self.client.get('/a/b/').status_code, 200)
+
+    @tag('functional')
+    def test_references_within_the_subtree_do_not_protect_it(self):
+        d_block = TextBlock.objects.create(
+            parent_page=self.d,
+            position=0,
+            published=True,
+        )
+        Reference.objects.create(
+            containing_block=d_block,
+            referenced_block=self.c_block,
+        )
+
+        DeletionJob.objects.start(self.a)
+        self.run_worker()
+
+        self.assertEqual(list(Page.objects.all()), [self.e])
+
+    @tag('functional')
+    def test_deleting_from_the_view_reports_progress(self):
+        response = self.client.post(f'/delete-page/{self.b.id}/')
+        job = DeletionJob.objects.get()
+        self.assertRedirects(response, f'/deletion-job/{job.id}/')
+
+        self.run_worker()
+
+        response = self.client.get(f'/deletion-job/{job.id}/')
+        self.assertContains(response, '2 of 2 pages deleted')
+        self.assertContains(response, 'href="/a/"')
+
+
+class BlockAutocomplete(TestCase):
+
+    def setUp(self):
+        staff = get_user_model().objects.create(
+            username='vincent',
+            is_staff=True,
+        )
+        self.client.force_login(staff)
+
+        self.page = Page.objects.create(title='A')
+        self.other_page = Page.objects.create(title='B')
+
+        self.intro = TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+            content='# Introduction\n\nHello.',
+        )
+        self.instructions = TextBlock.objects.create(
+            parent_page=self.page,
+            position=1,
+            content='# Instructions\n\nDo things.',
+        )
+        self.outro = TextBlock.objects.create(
+            parent_page=self.page,
+            position=2,
+            content='# Outro\n\nGoodbye.',
+        )
+        TextBlock.objects.create(
+            parent_page=self.other_page,
+            position=0,
+            content='# Intermission',
+        )
+
+    def autocomplete(self, q, page):
+        response = self.client.get(
+            '/block-autocomplete/',
+            {'q': q, 'forward': page.id},
+        )
+
+        return response.json()['results']
+
+    @tag('functional')
+    def test_labels_are_stored_on_save(self):
+        self.intro.refresh_from_db()
+
+        self.assertEqual(self.intro.label, 'Introduction')
+
+    @tag('functional')
+    def test_only_blocks_on_the_chosen_page_with_matching_labels_are_listed(self):  # noqa
+        self.assertEqual(
+            self.autocomplete('in', self.page),
+            [
+                {'id': self.intro.id, 'label': 'Introduction'},
+                {'id': self.instructions.id, 'label': 'Instructions'},
+            ],
+        )
+
+    @tag('functional')
+    def test_case_is_ignored(self):
+        self.assertEqual(
+            self.autocomplete('OUT', self.page),
+            [{'id': self.outro.id, 'label': 'Outro'}],
+        )
+
+    @tag('performance')
+    @skipUnless(connection.vendor == 'sqlite', 'Uses SQLite query plans')
+    def test_matches_are_found_from_an_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.autocomplete('in', self.page)
+
+        [sql] = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "cms_block"' in query['sql']
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+
+        self.assertIn(
+            'USING INDEX cms_block_parent__bf8834_idx (parent_page_id=?'
+            ' AND search_label>? AND search_label<?)',
+            plan,
+        )
+
+    @tag('functional', 'performance')
+    def test_move_form_does_not_render_every_block(self):
+        for position in range(3, 30):
+            TextBlock.objects.create(parent_page=self.page, position=position)
+
+        with self.assertNumQueries(5):
+            # Session, user, the `Block` being moved (polymorphically),
+            # and the label of its `Page`.
+            response = self.client.get(f'/move-block/{self.outro.id}/')
+
+        self.assertNotContains(response, 'Instructions')
+
+
+class PageSearch(TestCase):
+
+    def setUp(self):
+        staff = get_user_model().objects.create(
+            username='vincent',
+            is_staff=True,
+        )
+        self.client.force_login(staff)
+
+        self.docs = Page.objects.create(title='Docs', slug='docs')
+        self.install = Page.objects.create(
+            parent=self.docs,
+            title='Installing',
+            slug='install',
+        )
+        self.intro = Page.objects.create(
+            parent=self.docs,
+            title='Introduction',
+            slug='intro',
+        )
+        Page.objects.create(title='Index', slug='index', pending_deletion=True)
+
+    def search(self, q, cursor=None):
+        parameters = {'q': q}
+        if cursor is not None:
+            parameters['cursor'] = cursor
+
+        return self.client.get('/page-search/', parameters).json()
+
+    @tag('functional')
+    def test_live_pages_are_found_by_the_start_of_their_title(self):
+        self.assertEqual(
+            self.search('in')['results'],
+            [
+                {'id': self.install.id, 'label': str(self.install)},
+                {'id': self.intro.id, 'label': str(self.intro)},
+            ],
+        )
+
+    @tag('functional')
+    def test_pages_are_found_by_path(self):
+        self.assertEqual(
+            [result['id'] for result in self.search('/docs/intr')['results']],
+            [self.intro.id],
+        )
+
+    @tag('functional')
+    def test_paths_are_kept_up_to_date_and_case_is_ignored(self):
+        self.docs.slug = 'guide'
+        self.docs.save()
+
+        self.assertEqual(self.search('docs/INST')['results'], [])
+        self.assertEqual(
+            [result['id'] for result in self.search('Guide/INST')['results']],
+            [self.install.id],
+        )
+
+    @tag('functional')
+    def test_results_are_paginated_by_cursor(self):
+        for number in range(25):
+            Page.objects.create(title=f'Item {number:02}', slug=f'i{number}')
+
+        first = self.search('item')
+        second = self.search('item', cursor=first['next'])
+
+        self.assertEqual(len(first['results']), 20)
+        self.assertEqual(
+            [result['label'] for result in second['results']],
+            [f'Item {number}' for number in range(20, 25)],
+        )
+        self.assertIsNone(second['next'])
+
+    @tag('functional')
+    def test_malformed_cursors_are_rejected(self):
+        response = self.client.get(
+            '/page-search/',
+            {'q': 'in', 'cursor': 'nonsense'},
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    @tag('functional', 'performance')
+    def test_page_form_does_not_render_every_page(self):
+        for number in range(30):
+            Page.objects.create(title=f'Item {number:02}', slug=f'i{number}')
+
+        with self.assertNumQueries(3):
+            # Session, user, and the label of the initial parent.
+            response = self.client.get(
+                '/add-page/',
+                {'from': self.docs.id},
+            )
+
+        self.assertContains(response, f'value="{self.docs.id}"')
+        self.assertNotContains(response, 'Item 01')
+
+    @tag('performance')
+    @skipUnless(connection.vendor == 'sqlite', 'Uses SQLite query plans')
+    def test_results_are_found_and_read_in_order_from_an_index(self):
+        for q, field_name, index_name in (
+                ('in', 'search_title', 'cms_page_pending_d60443_idx'),
+                ('docs/in', 'search_path', 'cms_page_pending_825f92_idx')):
+            after_install = encode_cursor([
+                getattr(self.install, field_name),
+                self.install.id,
+            ])
+            with self.subTest(q=q), \
+                    CaptureQueriesContext(connection) as queries:
+                self.search(q, cursor=after_install)
+
+                [sql] = [
+                    query['sql'] for query in queries.captured_queries
+                    if 'FROM "cms_page"' in query['sql']
+                ]
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    plan = ' '.join(row[-1] for row in cursor.fetchall())
+
+                self.assertIn(f'USING INDEX {index_name}', plan)
+                self.assertIn(f'{field_name}>? AND {field_name}<?', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Search needs SQLite FTS5')
+class Search(TestCase):
+
+    def setUp(self):
+        self.page = Page.objects.create(title='Gardening')
+        self.child = Page.objects.create(parent=self.page, title='Roses')
+        self.block = TextBlock.objects.create(
+            parent_page=self.child,
+            position=0,
+            content='# Pruning\n\nCut back <b>roses</b> in early spring.',
+        )
+        self.block.publish()
+
+    def search(self, query):
+        return Page._meta.app_config.search_backend.search(query)
+
+    @tag('functional')
+    def test_published_blocks_are_found_with_snippets_and_urls(self):
+        [result] = self.search('spring')
+
+        self.assertEqual(result.block_id, self.block.id)
+        self.assertEqual(result.url, f'/gardening/roses/#{self.block.id}')
+        self.assertIn('<mark>spring</mark>', result.snippet)
+        self.assertIn('&lt;b&gt;', result.snippet)
+
+    @tag('functional')
+    def test_unpublished_blocks_are_not_found(self):
+        TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+            content='Plant tulips in autumn.',
+        )
+
+        self.assertEqual(self.search('tulips'), [])
+
+    @tag('functional')
+    def test_titles_rank_above_content(self):
+        # Terms found in most rows are all but ignored by `bm25()`.
+        for title in ('Lawns', 'Hedges', 'Ponds', 'Sheds', 'Tools'):
+            Page.objects.create(parent=self.page, title=title)
+        TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+            content='Roses, roses, roses.',
+            published=True,
+        )
+
+        self.assertEqual(self.search('roses')[0].page.id, self.child.id)
+        self.assertIsNone(self.search('roses')[0].block_id)
+
+    @tag('functional')
+    def test_edits_renames_and_moves_are_reflected(self):
+        self.block.content = 'Cut back roses in late autumn.'
+        self.block.save()
+        self.child.title = 'Climbing roses'
+        self.child.save()
+        self.child.parent = None
+        self.child.save()
+
+        self.assertEqual(self.search('spring'), [])
+        [result] = self.search('autumn')
+        self.assertEqual(result.url, f'/roses/#{self.block.id}')
+        self.assertEqual(self.search('climbing')[0].page.id, self.child.id)
+
+    @tag('functional')
+    def test_deleted_content_is_not_found(self):
+        self.page.delete()
+
+        self.assertEqual(self.search('roses'), [])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM cms_search')
+            self.assertEqual(cursor.fetchone(), (0, ))
+
+    @tag('functional')
+    def test_pages_being_deleted_are_not_found(self):
+        job = DeletionJob.objects.start(self.child)
+
+        self.assertEqual(self.search('roses'), [])
+
+        job.run_batch(10)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM cms_search')
+            self.assertEqual(cursor.fetchone(), (1, ))
+
+    @tag('functional')
+    def test_the_last_word_is_a_prefix(self):
+        self.assertEqual(len(self.search('prun')), 1)
+        self.assertEqual(self.search('"pruning" OR'), [])
+
+    @tag('functional')
+    def test_index_can_be_rebuilt(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM cms_search')
+
+        out = StringIO()
+        call_command('rebuild_search_index', chunk_size=1, stdout=out)
+
+        self.assertEqual(
+            out.getvalue(),
+            'Indexed 2 page(s) and 1 block(s), and removed 0 stale entries.\n',
+        )
+        self.assertEqual(len(self.search('spring')), 1)
+
+    @tag('functional')
+    def test_rebuilding_removes_stale_entries(self):
+        search_backend = Page._meta.app_config.search_backend
+        search_backend.index_blocks([(999, self.page.pk, 'Mulch in May.')])
+        search_backend.index_pages([(999, 'Compost')])
+
+        out = StringIO()
+        call_command('rebuild_search_index', chunk_size=1, stdout=out)
+
+        self.assertIn('removed 2 stale entries', out.getvalue())
+        self.assertEqual(self.search('mulch'), [])
+        self.assertEqual(len(self.search('spring')), 1)
+
+    @tag('functional')
+    def test_search_view(self):
+        response = self.client.get('/search/', {'q': 'pruning'})
+
+        self.assertContains(
+            response,
+            f'href="/gardening/roses/#{self.block.id}"',
+        )
+        self.assertContains(response, 'Gardening / Roses')
+
+    @tag('functional')
+    def test_search_is_off_on_databases_without_a_backend(self):
+        app_config = Page._meta.app_config
+
+        self.assertIsNotNone(app_config._create_search_backend())
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertIsNone(app_config._create_search_backend())
+
+
+class HomePageListing(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        for title in ('Date', 'Apple', 'Cherry', 'Banana', 'Elderberry'):
+            Page.objects.create(title=title)
+        Page.objects.create(
+            parent=Page.objects.get(title='Cherry'),
+            title='Stone',
+        )
+
+    def titles(self, response):
+        return [page.title for page in response.context['pages']]
+
+    @tag('functional')
+    def test_top_level_pages_are_listed_by_title_a_page_at_a_time(self):
+        with mock.patch.object(HomeView, 'paginate_by', 2):
+            first = self.client.get('/')
+            second = self.client.get(
+                '/',
+                {'cursor': first.context['next_cursor']},
+            )
+            third = self.client.get(
+                '/',
+                {'cursor': second.context['next_cursor']},
+            )
+
+        self.assertEqual(self.titles(first), ['Apple', 'Banana'])
+        self.assertEqual(self.titles(second), ['Cherry', 'Date'])
+        self.assertEqual(self.titles(third), ['Elderberry'])
+        self.assertIsNone(third.context['next_cursor'])
+
+    @tag('functional', 'performance')
+    def test_listing_is_cached_until_the_tree_changes(self):
+        self.client.get('/')
+
+        with self.assertNumQueries(0):
+            self.client.get('/')
+
+        Page.objects.create(title='Fig')
+
+        self.assertIn('Fig', self.titles(self.client.get('/')))
+
+    @tag('functional')
+    def test_pages_being_deleted_drop_out_of_the_cached_listing(self):
+        self.client.get('/')
+
+        DeletionJob.objects.start(Page.objects.get(title='Date'))
+
+        self.assertNotIn('Date', self.titles(self.client.get('/')))
+
+
+class ContentApi(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.guide = Page.objects.create(title='Guide')
+        self.install = Page.objects.create(parent=self.guide, title='Install')
+        for title in ('Upgrade', 'Configure'):
+            Page.objects.create(parent=self.guide, title=title)
+
+        for position, content in enumerate(('# One', '# Two', '# Three')):
+            TextBlock.objects.create(
+                parent_page=self.guide,
+                position=position,
+                content=content,
+                published=content != '# Two',
+            )
+
+    def get(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+
+        return response.json()
+
+    @tag('functional')
+    def test_pages_can_be_found_by_id_uuid_or_path(self):
+        expected = {
+            'id': self.install.pk,
+            'uuid': str(self.install.uuid),
+            'title': 'Install',
+            'url': '/guide/install/',
+            'parent': self.guide.pk,
+        }
+
+        for path in (
+                f'/api/pages/{self.install.pk}/',
+                f'/api/pages/{self.install.uuid}/',
+                '/api/paths/guide/install/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path), expected)
+
+    @tag('functional')
+    def test_clients_choose_fields_and_relations(self):
+        page = self.get(
+            f'/api/pages/{self.guide.pk}/',
+            **{
+                'fields[page]': 'title,blocks,children,navigation',
+                'fields[block]': 'position,content',
+            },
+        )
+
+        self.assertEqual(page['title'], 'Guide')
+        self.assertEqual(page['blocks'], {
+            'results': [
+                {'position': 0, 'content': '# One'},
+                {'position': 2, 'content': '# Three'},
+            ],
+            'next': None,
+        })
+        self.assertEqual(
+            page['children']['results'],
+            [
+                {'title': 'Configure'},
+                {'title': 'Install'},
+                {'title': 'Upgrade'},
+            ],
+        )
+        self.assertEqual(page['navigation'], self.guide.get_sidebar_links())
+
+    @tag('functional')
+    def test_published_blocks_come_rendered(self):
+        blocks = self.get(f'/api/pages/{self.guide.pk}/blocks/')
+
+        self.assertEqual(
+            [block['rendered'] for block in blocks['results']],
+            ['<h1>One</h1>', '<h1>Three</h1>'],
+        )
+        self.assertEqual(blocks['results'][0]['type'], 'textblock')
+
+    @tag('performance')
+    def test_rendered_blocks_are_loaded_in_one_query(self):
+        self.get(f'/api/pages/{self.guide.pk}/blocks/')
+
+        with self.assertNumQueries(1):
+            api.serialise_blocks(self.guide, {})
+
+    @tag('functional')
+    def test_lists_are_paginated_by_cursor(self):
+        with mock.patch.object(ApiView, 'limit', 2):
+            first = self.get(f'/api/pages/{self.guide.pk}/children/')
+            second = self.get(
+                f'/api/pages/{self.guide.pk}/children/',
+                cursor=first['next'],
+            )
+
+        self.assertEqual(
+            [page['title'] for page in first['results']],
+            ['Configure', 'Install'],
+        )
+        self.assertEqual(
+            [page['title'] for page in second['results']],
+            ['Upgrade'],
+        )
+        self.assertIsNone(second['next'])
+
+    @tag('functional')
+    def test_bad_requests_are_refused(self):
+        blocks_path = f'/api/pages/{self.guide.pk}/blocks/'
+        for path, params in (
+                ('/api/pages/', {'fields[page]': 'title,colour'}),
+                ('/api/pages/', {'fields[page]': 'children'}),
+                ('/api/pages/', {'cursor': 'nonsense'}),
+                ('/api/pages/', {'cursor': encode_cursor(['A', 'x'])}),
+                ('/api/pages/', {'cursor': encode_cursor([['A'], 1])}),
+                ('/api/pages/', {'cursor': encode_cursor([None, 1])}),
+                (blocks_path, {'cursor': encode_cursor([{'x': 1}])}),
+                (blocks_path, {'fields[block]': 'label,x'})):
+            with self.subTest(path=path, params=params):
+                response = self.client.get(path, params)
+
+                self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/api/paths/nowhere/')
+        self.assertEqual(response.status_code, 404)
+
+
+class NavigationCaching(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.guide = Page.objects.create(title='Guide')
+        self.install = Page.objects.create(parent=self.guide, title='Install')
+
+    def titles(self):
+        return [
+            link['title'] for link
+            in self.install.get_cached_sidebar_links()[0]['children']
+        ]
+
+    @tag('performance')
+    def test_navigation_is_cached_until_the_tree_changes(self):
+        self.install.get_cached_sidebar_links()
+
+        with self.assertNumQueries(0):
+            self.install.get_cached_sidebar_links()
+
+        Page.objects.create(parent=self.guide, title='Uninstall')
+
+        self.assertIn('Uninstall', self.titles())
+
+    @tag('functional')
+    def test_the_tree_version_changes_only_once_writes_commit(self):
+        self.install.get_cached_sidebar_links()
+
+        with transaction.atomic():
+            Page.objects.create(parent=self.guide, title='Uninstall')
+
+            # Other connections can't see the new page yet, so nor
+            # should anything they cache against the current version.
+            self.assertNotIn('Uninstall', self.titles())
+
+        self.assertIn('Uninstall', self.titles())
+
+    @tag('functional')
+    def test_caches_local_to_a_process_are_warned_about(self):
+        for backend, ids in (
+                ('locmem.LocMemCache', ['cms.W001']),
+                ('memcached.MemcachedCache', [])):
+            backend = f'django.core.cache.backends.{backend}'
+            with self.subTest(backend=backend), \
+                    self.settings(CACHES={'default': {'BACKEND': backend}}):
+                self.assertEqual(
+                    [warning.id for warning in check_cache_is_shared(None)],
+                    ids,
+                )
+
+
+class ChangeFeed(TestCase):
+
+    def setUp(self):
+        self.a = Page.objects.create(title='A')
+        self.b = Page.objects.create(title='B', parent=self.a)
+        self.c = Page.objects.create(title='C')
+
+    def events_during(self, action):
+        seq = ChangeEvent.objects.order_by('seq').last().seq
+        action()
+
+        return [
+            (event.kind, event.page_id, event.block_id, event.reference_id)
+            for event in ChangeEvent.objects.since(seq)
+        ]
+
+    @tag('functional')
+    def test_pages_created_are_recorded(self):
+        self.assertEqual(
+            list(ChangeEvent.objects.values_list('kind', 'page_id')),
+            [
+                (ChangeEvent.PAGE_CREATED, self.a.pk),
+                (ChangeEvent.PAGE_CREATED, self.b.pk),
+                (ChangeEvent.PAGE_CREATED, self.c.pk),
+            ],
+        )
+
+    @tag('functional')
+    def test_moves_renames_and_deletions_are_recorded_once(self):
+        def move():
+            self.a.parent = self.c
+            self.a.save()
+
+        def rename():
+            self.c.title = 'See'
+            self.c.save()
+
+        self.assertEqual(
+            self.events_during(move),
+            [(ChangeEvent.PAGE_MOVED, self.a.pk, None, None)],
+        )
+        self.assertEqual(
+            self.events_during(rename),
+            [(ChangeEvent.PAGE_RENAMED, self.c.pk, None, None)],
+        )
+        self.assertEqual(
+            self.events_during(lambda: DeletionJob.objects.start(self.c)),
+            [(ChangeEvent.PAGE_DELETED, self.c.pk, None, None)],
+        )
+
+    @tag('functional')
+    def test_only_changes_to_published_blocks_are_recorded(self):
+        block = TextBlock.objects.create(
+            parent_page=self.a,
+            position=0,
+            content='# Draft',
+        )
+
+        def edit(**changes):
+            def action():
+                for name, value in changes.items():
+                    setattr(block, name, value)
+                block.save()
+
+            return action
+
+        block_id = block.pk
+
+        def event(kind, page=self.a):
+            return [(kind, page.pk, block_id, None)]
+
+        self.assertEqual(self.events_during(edit(content='# Redraft')), [])
+        self.assertEqual(
+            self.events_during(block.publish),
+            event(ChangeEvent.BLOCK_PUBLISHED),
+        )
+        self.assertEqual(
+            self.events_during(edit(content='# Final')),
+            event(ChangeEvent.BLOCK_EDITED),
+        )
+        self.assertEqual(
+            self.events_during(edit(parent_page=self.b)),
+            event(ChangeEvent.BLOCK_MOVED, page=self.b),
+        )
+        self.assertEqual(
+            self.events_during(block.delete),
+            event(ChangeEvent.BLOCK_DELETED, page=self.b),
+        )
+
+    @tag('functional')
+    def test_reference_changes_are_recorded(self):
+        block = TextBlock.objects.create(
+            parent_page=self.a,
+            position=0,
+            published=True,
+        )
+        reference = Reference(containing_block=block, referenced_page=self.c)
+
+        self.assertEqual(
+            self.events_during(reference.save),
+            [(ChangeEvent.REFERENCE_CREATED, self.a.pk, block.pk, 1)],
+        )
+        self.assertEqual(
+            self.events_during(reference.delete),
+            [(ChangeEvent.REFERENCE_DELETED, self.a.pk, block.pk, 1)],
+        )
+
+    @tag('functional')
+    def test_only_changes_to_published_blocks_references_are_recorded(self):
+        block = TextBlock.objects.create(parent_page=self.a, position=0)
+        reference = Reference(containing_block=block, referenced_page=self.c)
+
+        self.assertEqual(self.events_during(reference.save), [])
+        self.assertEqual(self.events_during(reference.delete), [])
+
+    @tag('functional')
+    def test_references_deleted_in_bulk_are_recorded(self):
+        published = TextBlock.objects.create(
+            parent_page=self.a,
+            position=0,
+            published=True,
+        )
+        unpublished = TextBlock.objects.create(parent_page=self.a, position=1)
+        reference = Reference.objects.create(
+            containing_block=published,
+            referenced_page=self.c,
+        )
+        Reference.objects.create(
+            containing_block=unpublished,
+            referenced_page=self.c,
+        )
+
+        self.assertEqual(
+            self.events_during(Reference.objects.all().delete),
+            [(
+                ChangeEvent.REFERENCE_DELETED,
+                self.a.pk,
+                published.pk,
+                reference.pk,
+            )],
+        )
+
+    @tag('functional')
+    def test_feed_is_followed_from_a_sequence_number(self):
+        with mock.patch.object(ApiView, 'limit', 2):
+            first = self.client.get('/api/changes/').json()
+            second = self.client.get(
+                '/api/changes/',
+                {'since': first['next']},
+            ).json()
+
+        self.assertEqual(
+            [event['page'] for event in first['results']],
+            [self.a.pk, self.b.pk],
+        )
+        self.assertEqual(
+            [event['page'] for event in second['results']],
+            [self.c.pk],
+        )
+        self.assertEqual(second['results'][0]['kind'], 'page.created')
+        self.assertIsNone(second['next'])
+
+        response = self.client.get('/api/changes/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SiteImport(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.existing = Page.objects.create(title='Existing')
+        TextBlock.objects.create(parent_page=self.existing, position=0)
+
+        self.records = [
+            {'type': 'page', 'id': 1, 'parent': None, 'title': 'Guide'},
+            {'type': 'page', 'id': 2, 'parent': 1, 'title': 'Install'},
+            {
+                'type': 'page',
+                'id': 3,
+                'parent': 2,
+                'title': 'On Linux',
+                'slug': 'linux',
+            },
+            {
+                'type': 'block',
+                'id': 1,
+                'page': 3,
+                'published': True,
+                'content': '# Linux\n\nUnlike !ref(1).',
+            },
+            {'type': 'block', 'id': 2, 'page': 3, 'content': 'Draft'},
+            {
+                'type': 'reference',
+                'id': 1,
+                'block': 1,
+                'referenced_page': 2,
+            },
+        ]
+
+    def write(self, records, suffix='.jsonl'):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        path = os.path.join(directory, f'site{suffix}')
+        with open(path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+
+        return path
+
+    def import_site(self, path, **options):
+        stdout = StringIO()
+        call_command('import_site', path, stdout=stdout, **options)
+
+        return stdout.getvalue()
+
+    @tag('functional')
+    def test_trees_are_imported_with_offset_ids_and_rewritten_hooks(self):
+        output = self.import_site(self.write(self.records))
+
+        self.assertIn('3 page(s), 2 block(s) and 1 reference(s)', output)
+
+        linux = Page.objects.get(title='On Linux')
+        self.assertEqual(linux.pk, self.existing.pk + 3)
+        self.assertEqual(linux.get_absolute_url(), '/guide/install/linux/')
+        self.assertEqual(str(linux), 'Guide / Install / On Linux')
+
+        published, draft = linux.blocks.order_by('position')
+        self.assertEqual(type(published), TextBlock)
+        self.assertEqual((published.position, draft.position), (100, 200))
+        self.assertEqual(published.label, 'Linux')
+        self.assertFalse(draft.published)
+
+        reference = Reference.objects.get()
+        self.assertIn(reference.hook_text, published.content)
+        self.assertEqual(reference.target_page, linux.parent)
+        self.assertIn('/guide/install/', published.get_rendered())
+
+    @tag('performance')
+    def test_queries_do_not_grow_with_the_site(self):
+        def count_queries(pages):
+            records = [
+                {
+                    'type': 'page',
+                    'id': n,
+                    'parent': None,
+                    'title': f'{pages} {n}',
+                }
+                for n in range(1, pages + 1)
+            ] + [
+                {'type': 'block', 'id': n, 'page': n, 'content': 'Hi'}
+                for n in range(1, pages + 1)
+            ]
+            path = self.write(records)
+
+            with CaptureQueriesContext(connection) as context:
+                self.import_site(path)
+
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(5), count_queries(50))
+
+    @tag('functional')
+    def test_tar_archives_are_imported_beneath_a_parent(self):
+        path = self.write(self.records)
+        archive_path = path + '.tar'
+        with tarfile.open(archive_path, 'w') as archive:
+            archive.add(path, arcname='site.jsonl')
+
+        self.import_site(archive_path, parent=self.existing.pk)
+
+        self.assertEqual(
+            Page.objects.get(title='On Linux').get_absolute_url(),
+            '/existing/guide/install/linux/',
+        )
+
+    @tag('functional')
+    def test_bad_imports_import_nothing(self):
+        broken_hook = dict(self.records[3], content='See !ref(2).')
+
+        for records in (
+                [self.records[1], self.records[0]],
+                self.records[:3] + [broken_hook],
+                self.records[:1] + [{'type': 'comment'}]):
+            with self.subTest(records=records):
+                with self.assertRaises(CommandError):
+                    self.import_site(self.write(records))
+
+                self.assertEqual(Page.objects.count(), 1)
+
+
+class SiteExport(TestCase):
+
+    def setUp(self):
+        self.guide = Page.objects.create(title='Guide')
+        self.install = Page.objects.create(parent=self.guide, title='Install')
+        self.doomed = Page.objects.create(title='Doomed')
+
+        self.draft = TextBlock.objects.create(
+            parent_page=self.guide,
+            position=0,
+            content='Draft',
+        )
+        self.block = TextBlock.objects.create(
+            parent_page=self.install,
+            position=0,
+            content='# Install',
+            published=True,
+        )
+        TextBlock.objects.create(parent_page=self.doomed, position=0)
+
+        self.reference = Reference.objects.create(
+            containing_block=self.block,
+            referenced_page=self.guide,
+        )
+        Reference.objects.create(
+            containing_block=self.draft,
+            referenced_page=self.doomed,
+        )
+        self.block.content += f'\n\nBack to {self.reference.hook_text}.'
+        self.block.save()
+
+        DeletionJob.objects.start(self.doomed)
+
+    def export(self):
+        stdout = StringIO()
+        call_command('export_site', stdout=stdout)
+
+        return stdout.getvalue()
+
+    @tag('functional')
+    def test_live_pages_come_after_their_parents_then_blocks(self):
+        records = [json.loads(line) for line in self.export().splitlines()]
+
+        self.assertEqual(
+            [(record['type'], record['id']) for record in records],
+            [
+                ('page', self.guide.pk),
+                ('page', self.install.pk),
+                ('block', self.draft.pk),
+                ('block', self.block.pk),
+                ('reference', self.reference.pk),
+            ],
+        )
+
+    @tag('functional')
+    def test_exports_round_trip_through_import(self):
+        export = self.export()
+
+        Reference.objects.all().delete()
+        Block.objects.all().delete()
+        Page.objects.all().delete()
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'site.jsonl')
+        with open(path, 'w') as f:
+            f.write(export)
+        call_command('import_site', path, stdout=StringIO())
+
+        self.assertEqual(self.export(), export)
+        self.assertIn(
+            '/guide/',
+            Block.objects.get(pk=self.block.pk).get_rendered(),
+        )
+
+    @tag('performance')
+    def test_queries_do_not_grow_with_the_site(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.export()
+
+            return len(context.captured_queries)
+
+        few = count_queries()
+        for n in range(10):
+            page = Page.objects.create(parent=self.install, title=f'P{n}')
+            TextBlock.objects.create(parent_page=page, position=0)
+
+        self.assertEqual(count_queries(), few)
+
+    @tag('functional')
+    def test_staff_can_download_exports(self):
+        self.assertEqual(self.client.get('/export/').status_code, 302)
+
+        self.client.force_login(
+            get_user_model().objects.create(username='vincent', is_staff=True)
+        )
+        response = self.client.get('/export/')
+
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            self.export(),
+        )
+
+
+class Benchmarking(TestCase):
+
+    @tag('performance')
+    def test_site_benchmark_times_every_operation(self):
+        out = StringIO()
+        call_command(
+            'cms_bench',
+            'site',
+            pages=13,
+            depth=3,
+            fan_out=3,
+            blocks_per_page=2,
+            reference_density=1.5,
+            repeat=2,
+            stdout=out,
+        )
+
+        results = json.loads(out.getvalue())
+        self.assertEqual(
+            [result['operation'] for result in results],
+            [
+                'page_view',
+                'sidebar_links',
+                'breadcrumbs',
+                'render',
+                'move_page',
+                'position_after',
+                'redistribute_positions',
+                'delete_preview',
+                'delete_page',
+            ],
+        )
+        self.assertTrue(all(result['runs'] == 2 for result in results))
+        self.assertFalse(Page.objects.exists())
+
+    @tag('performance')
+    def test_site_benchmark_copes_with_flat_sites(self):
+        out = StringIO()
+        call_command(
+            'cms_bench',
+            'site',
+            pages=3,
+            depth=1,
+            blocks_per_page=1,
+            repeat=2,
+            stdout=out,
+        )
+
+        self.assertEqual(len(json.loads(out.getvalue())), 9)
+        self.assertFalse(Page.objects.exists())
+
+
+class LoadTesting(TransactionTestCase):
+
+    @tag('performance')
+    def test_every_endpoint_is_exercised_without_errors(self):
+        cache.clear()
+        build_site(pages=12, depth=3, fan_out=3, blocks_per_page=2)
+
+        results = run_load_test(
+            get_internal_wsgi_application(),
+            scenarios=40,
+            concurrency=1,
+        )
+
+        self.assertEqual(
+            set(results['endpoints']),
+            {
+                'add_block_choose_type',
+                'add_block_form',
+                'add_block_submit',
+                'edit_block_form',
+                'edit_block_submit',
+                'home',
+                'move_page_form',
+                'move_page_submit',
+                'page_by_path',
+                'page_by_uuid',
+            },
+        )
+        self.assertEqual(results['overall']['errors'], 0)
+        self.assertGreater(results['endpoints']['page_by_path']['p50_ms'], 0)
+        self.assertGreater(
+            results['endpoints']['page_by_path']['mean_queries'],
+            0,
+        )
+
+
+class RequestInstrumentation(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.view_aggregates.clear()
+
+        self.page = Page.objects.create(title='A')
+        self.block = TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+            content='# Hello',
+            published=True,
+        )
+
+    @tag('functional')
+    def test_timings_are_reported_in_a_header(self):
+        response = self.client.get('/a/')
+
+        server_timing = response['Server-Timing']
+        self.assertRegex(server_timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(server_timing, r'tpl;dur=[\d.]+')
+        self.assertIn('desc="Markdown, 1 blocks"', server_timing)
+        self.assertRegex(server_timing, r'total;dur=[\d.]+')
+
+    @tag('functional')
+    def test_requests_are_logged_as_json(self):
+        with self.assertLogs('cms.instrumentation', 'INFO') as logs:
+            self.client.get('/')
+            self.client.get('/')
+
+        first, second = (
+            json.loads(record.getMessage()) for record in logs.records
+        )
+        self.assertEqual(first['view'], 'cms:home')
+        self.assertEqual(first['status'], 200)
+        self.assertEqual(
+            (first['cache_hits'], first['cache_misses']),
+            (1, 1),
+        )
+        self.assertEqual(
+            (second['cache_hits'], second['cache_misses']),
+            (2, 0),
+        )
+        self.assertEqual(second['queries'], 0)
+
+    @tag('functional')
+    def test_aggregates_are_kept_per_view(self):
+        self.client.get('/a/')
+        self.client.get('/a/')
+        self.client.get('/')
+
+        aggregates = instrumentation.view_aggregates.snapshot()
+
+        self.assertEqual(aggregates['cms:path_page_root']['requests'], 2)
+        self.assertEqual(aggregates['cms:home']['requests'], 1)
+        self.assertGreater(aggregates['cms:path_page_root']['queries'], 0)
+        self.assertEqual(
+            aggregates['cms:path_page_root']['mean_queries'],
+            aggregates['cms:path_page_root']['queries'] / 2,
+        )
+
+
+class Metrics(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def scrape(self):
+        response = self.client.get('/metrics/')
+        self.assertEqual(
+            response['Content-Type'],
+            'text/plain; version=0.0.4; charset=utf-8',
+        )
+
+        return response.content.decode()
+
+    @tag('functional')
+    def test_histograms_are_exposed_cumulatively(self):
+        histogram = metrics.Histogram('test_seconds', 'Test.', (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.expose(), '\n'.join([
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{le="0.1"} 2',
+            'test_seconds_bucket{le="1"} 3',
+            'test_seconds_bucket{le="+Inf"} 4',
+            'test_seconds_sum 2.65',
+            'test_seconds_count 4',
+        ]))
+
+    @tag('functional')
+    def test_hot_paths_are_measured(self):
+        page = Page.objects.create(title='A')
+        child = Page.objects.create(parent=page, title='B')
+        Page.objects.create(parent=child, title='C')
+        TextBlock.objects.create(
+            parent_page=page,
+            position=0,
+            content='Hello',
+            published=True,
+        )
+
+        self.client.get('/a/')
+        self.client.get('/')
+        self.client.get('/')
+        page.slug = 'moved'
+        page.save()
+        page.blocks.redistribute_positions()
+        call_command('cms_sweep', stdout=StringIO())
+
+        scraped = self.scrape()
+
+        for line in [
+            'cms_view_duration_seconds_count{view="cms:home"} 2',
+            'cms_view_duration_seconds_count{view="cms:path_page_root"} 1',
+            'cms_markdown_render_duration_seconds_count 1',
+            'cms_redenormalisation_pages_sum 2',
+            'cms_redenormalisation_duration_seconds_count 1',
+            'cms_position_redistribution_blocks_sum 1',
+            'cms_cache_lookups_total{result="hit"}',
+            'cms_cache_lookups_total{result="miss"}',
+            'cms_sweep_duration_seconds_count 1',
+        ]:
+            self.assertIn(line, scraped)
+
+    @tag('functional')
+    def test_scraping_is_limited_by_address(self):
+        response = self.client.get('/metrics/', REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(response.status_code, 403)
+
+
+class RequestProfiling(TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+        config = Page._meta.app_config
+        for name, value in {
+            'profile_output_dir': self.output_dir,
+            'profile_requests_slower_than': None,
+            'profile_sample_interval': 0.0005,
+        }.items():
+            patcher = mock.patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.page = Page.objects.create(title='A')
+        TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+            content='```python\n' + 'print("Hello")\n' * 200 + '```',
+            published=True,
+        )
+
+    def profiles(self):
+        return sorted(os.listdir(self.output_dir))
+
+    @tag('functional')
+    def test_every_nth_request_is_written_as_collapsed_stacks(self):
+        with mock.patch.object(
+                Page._meta.app_config, 'profile_every_nth_request', 2):
+            for _request in range(4):
+                self.client.get('/a/')
+            self.client.get('/')
+
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 2)
+        self.assertIn('-cms.path_page_root-', profiles[0])
+
+        with open(os.path.join(self.output_dir, profiles[0])) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            self.assertRegex(line, r'^\S+(;\S+)* \d+$')
+        self.assertTrue(any('cms.views:' in line for line in lines))
+
+    @tag('functional')
+    def test_staff_can_ask_for_a_profile(self):
+        self.client.get('/a/', {'profile': ''})
+        self.assertEqual(self.profiles(), [])
+
+        self.client.force_login(
+            get_user_model().objects.create(username='vincent', is_staff=True)
+        )
+        self.client.get('/a/', {'profile': ''})
+        self.assertEqual(len(self.profiles()), 1)
+
+    @tag('functional')
+    def test_only_slow_requests_are_written(self):
+        with mock.patch.object(
+                Page._meta.app_config, 'profile_requests_slower_than', 60):
+            self.client.get('/a/')
+
+        self.assertEqual(self.profiles(), [])
+
+    @tag('functional')
+    def test_slow_requests_count_towards_every_nth(self):
+        middleware = ProfilingMiddleware(lambda request: None)
+        request = RequestFactory().get('/a/')
+
+        config = Page._meta.app_config
+        with mock.patch.object(config, 'profile_every_nth_request', 2):
+            with mock.patch.object(
+                    config, 'profile_requests_slower_than', 1):
+                self.assertTrue(middleware.should_write(request, 2))
+                self.assertTrue(middleware.should_write(request, 0))
+                self.assertFalse(middleware.should_write(request, 0))
+
+
+class ReaderFastPath(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.page = Page.objects.create(title='A')
+        TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+            content='# Hello',
+            published=True,
+        )
+
+    @tag('functional')
+    def test_readers_get_shared_cacheable_pages_without_sessions(self):
+        response = self.client.get('/a/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        self.assertEqual(response.cookies, {})
+        self.assertNotIn('session', vars(response.wsgi_request))
+        self.assertNotContains(response, 'Edit block')
+        self.assertContains(response, 'Login')
+
+    @tag('functional')
+    def test_template_rendering_is_still_timed(self):
+        response = self.client.get('/a/')
+
+        template_ms = re.search(
+            r'tpl;dur=([\d.]+)',
+            response['Server-Timing'],
+        ).group(1)
+        self.assertGreater(float(template_ms), 0)
+
+    @tag('functional')
+    def test_staff_still_get_editing_tools(self):
+        self.client.force_login(
+            get_user_model().objects.create(username='vincent', is_staff=True)
+        )
+
+        response = self.client.get('/a/')
+
+        self.assertContains(response, 'Edit block')
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+
+    @tag('functional')
+    def test_missing_pages_are_still_not_found(self):
+        response = self.client.get('/nowhere/')
+
+        self.assertEqual(response.status_code, 404)
+
+    @tag('functional')
+    def test_other_views_take_the_usual_path(self):
+        response = self.client.get('/add-page/')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+
+
+# Reads from the `replica` database, a test mirror of `default`, only
+# see what's been committed.
+@mock.patch.object(
+    Page._meta.app_config,
+    'replica_databases',
+    ('replica', ),
+)
+class ReplicaRouting(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.page = Page.objects.create(title='A')
+        self.block = TextBlock.objects.create(
+            parent_page=self.page,
+            position=0,
+            content='# Hello',
+            published=True,
+        )
+
+    def count_reads(self, path):
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(path)
+
+        self.assertEqual(response.status_code, 200)
+
+        # Writes, such as saving rendered `Block`s, always go to the
+        # primary.
+        def reads(queries):
+            return sum(
+                query['sql'].startswith('SELECT') for query in queries
+            )
+
+        return reads(default), reads(replica)
+
+    @tag('functional')
+    def test_only_cms_reads_go_to_replicas_and_only_when_asked(self):
+        router = ReplicaRouter()
+        User = get_user_model()
+
+        self.assertIsNone(router.db_for_read(Page))
+        with use_replicas():
+            self.assertEqual(router.db_for_read(Page), 'replica')
+            self.assertIsNone(router.db_for_read(User))
+            self.assertEqual(router.db_for_write(Page), 'default')
+        self.assertIsNone(router.db_for_read(Page))
+
+    @tag('functional')
+    def test_readers_read_from_replicas(self):
+        for path in ('/', '/a/', f'/{self.page.uuid}/'):
+            with self.subTest(path=path):
+                default_reads, replica_reads = self.count_reads(path)
+
+                self.assertEqual(default_reads, 0)
+                self.assertGreater(replica_reads, 0)
+
+    @tag('functional')
+    def test_staff_views_use_the_primary(self):
+        self.client.force_login(
+            get_user_model().objects.create(username='vincent', is_staff=True)
+        )
+
+        default_reads, replica_reads = self.count_reads(
+            f'/edit-block/{self.block.pk}/',
+        )
+
+        self.assertGreater(default_reads, 0)
+        self.assertEqual(replica_reads, 0)
+
+    @tag('functional')
+    def test_writers_read_their_writes_from_the_primary_for_a_while(self):
+        self.client.force_login(
+            get_user_model().objects.create(username='vincent', is_staff=True)
+        )
+        _, replica_reads = self.count_reads('/a/')
+        self.assertGreater(replica_reads, 0)
+
+        response = self.client.post(
+            f'/edit-block/{self.block.pk}/',
+            {'content': '# Goodbye'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('cms_primary_until', response.cookies)
+
+        _, replica_reads = self.count_reads('/a/')
+        self.assertEqual(replica_reads, 0)
+
+        with mock.patch('time.time', return_value=float('inf')):
+            _, replica_reads = self.count_reads('/a/')
+        self.assertGreater(replica_reads, 0)
+
+    @tag('functional')
+    def test_nothing_changes_without_replicas(self):
+        self.client.force_login(
+            get_user_model().objects.create(username='vincent', is_staff=True)
+        )
+
+        with mock.patch.object(
+            Page._meta.app_config,
+            'replica_databases',
+            (),
+        ):
+            default_reads, replica_reads = self.count_reads('/a/')
+            response = self.client.post(
+                f'/edit-block/{self.block.pk}/',
+                {'content': '# Goodbye'},
+            )
+
+        self.assertGreater(default_reads, 0)
+        self.assertEqual(replica_reads, 0)
+        self.assertNotIn('cms_primary_until', response.cookies)
@@ -0,0 +1,387 @@
+"""
+Storage for editors' unsaved work.
+
+Work is stashed whenever an editor leaves a form part way through, such
+as to add a `Reference`, and restored when they return to it.  Which
+storage is used is set by `CmsConfig.unsaved_work_storage`.
+
+Work is stored compressed and, where the editor's form was filled from
+existing content, as a line-wise diff against that content.
+"""
+
+from difflib import SequenceMatcher
+from hashlib import md5
+import json
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import instrumentation
+from .models import UnsavedWork
+
+
+RAW = b'j'
+COMPRESSED = b'z'
+
+# Left in `WriteBehindStorage`'s slots a flush gave up waiting for.
+SKIPPED = 'skipped'
+# Left in place of `WriteBehindStorage`'s entries for discarded work.
+DISCARDED = 'discarded'
+
+
+def checksum(text):
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def diff(base, text):
+    """
+    Returns a list of operations which turn `base` into `text`; ranges
+    of `base`'s lines to copy as `[start, end]`, and text to insert.
+    """
+
+    base_lines = base.splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+
+    matcher = SequenceMatcher(None, base_lines, lines, autojunk=False)
+
+    operations = []
+    for tag, base_start, base_end, start, end in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([base_start, base_end])
+        elif tag in ('replace', 'insert'):
+            operations.append(''.join(lines[start:end]))
+
+    return operations
+
+
+def patch(base, operations):
+    base_lines = base.splitlines(keepends=True)
+
+    return ''.join(
+        operation if isinstance(operation, str)
+        else ''.join(base_lines[operation[0]:operation[1]])
+        for operation in operations
+    )
+
+
+def encode_work(work, base=None, compress=True):
+    """
+    Serialises `work`, a `dict` of form values, to `bytes`.  Values
+    which have a counterpart in `base` are stored as diffs against it.
+    """
+
+    base = base or {}
+
+    fields = {}
+    deltas = {}
+    for name, value in work.items():
+        base_value = base.get(name)
+        if isinstance(value, str) and isinstance(base_value, str):
+            if base_value:
+                deltas[name] = [checksum(base_value), diff(base_value, value)]
+
+                continue
+
+        fields[name] = value
+
+    payload = json.dumps({'fields': fields, 'deltas': deltas}).encode('utf-8')
+    if compress:
+        return COMPRESSED + zlib.compress(payload)
+
+    return RAW + payload
+
+
+def decode_work(payload, base=None):
+    """
+    The inverse of `encode_work()`.  `base` must be the same values
+    the work was encoded against; diffs against values which have since
+    changed can't be applied, and are dropped.
+    """
+
+    base = base or {}
+
+    payload = bytes(payload)
+    header, payload = payload[:1], payload[1:]
+    if header == COMPRESSED:
+        payload = zlib.decompress(payload)
+
+    encoded = json.loads(payload.decode('utf-8'))
+
+    work = encoded['fields']
+    for name, (base_checksum, operations) in encoded['deltas'].items():
+        base_value = base.get(name)
+        if base_value is None or checksum(base_value) != base_checksum:
+            continue
+
+        work[name] = patch(base_value, operations)
+
+    return work
+
+
+class DatabaseStorage(object):
+    """
+    Reads and writes `UnsavedWork` directly.
+    """
+
+    compress = True
+
+    def encode(self, work, base=None):
+        return encode_work(work, base, compress=self.compress)
+
+    def get(self, user, path, base=None):
+        try:
+            unsaved_work = UnsavedWork.objects.get(user=user, path=path)
+        except UnsavedWork.DoesNotExist:
+            return None
+        else:  # noexcept
+            if unsaved_work.fresh:
+                return decode_work(unsaved_work.work, base)
+
+            # Left for `manage.py cms_sweep` to clear up.
+            return None
+
+    def stash(self, user, path, work, base=None):
+        UnsavedWork.objects.update_or_create(
+            user=user,
+            path=path,
+            defaults={'work': self.encode(work, base)},
+        )
+
+    def discard(self, user, path):
+        UnsavedWork.objects.filter(user=user, path=path).delete()
+
+    def flush(self):
+        pass
+
+
+class WriteBehindStorage(DatabaseStorage):
+    """
+    Stashes work in a cache, and writes it to `UnsavedWork` in batches,
+    once `flush_batch_size` stashes are waiting or the oldest has
+    waited `flush_after` seconds.  Reads check the cache first.
+
+    Stashes are logged to numbered slots, numbered by `cache.incr()`,
+    so concurrent stashes never overwrite one another's, and only one
+    process flushes at a time, holding a lock taken with `cache.add()`.
+    The cache must therefore be shared between processes, with atomic
+    `add()` and `incr()`, like memcached or Redis; others are refused.
+    """
+
+    cache_alias = 'default'
+    key_prefix = 'cms:unsaved-work'
+    flush_batch_size = 50
+    flush_after = 60
+    # Seconds a crashed flush can hold the lock for.
+    flush_lock_timeout = 60
+    # Backends which are local to a process, or whose `add()` and
+    # `incr()` aren't atomic.
+    unshared_cache_backends = (
+        'django.core.cache.backends.dummy.DummyCache',
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.filebased.FileBasedCache',
+        'django.core.cache.backends.db.DatabaseCache',
+    )
+
+    def __init__(self):
+        backend = settings.CACHES[self.cache_alias]['BACKEND']
+        if backend in self.unshared_cache_backends:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__} needs a cache shared between'
+                f' processes, not {backend}.'
+            )
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def timeout(self):
+        ttl = UnsavedWork._meta.app_config.delete_unsaved_work_after
+
+        return ttl.total_seconds()
+
+    @property
+    def last_slot_key(self):
+        return f'{self.key_prefix}:last-slot'
+
+    @property
+    def flushed_slot_key(self):
+        return f'{self.key_prefix}:flushed-slot'
+
+    @property
+    def flush_lock_key(self):
+        return f'{self.key_prefix}:flushing'
+
+    def get_slot_key(self, slot):
+        return f'{self.key_prefix}:slot:{slot}'
+
+    def get_key(self, user, path):
+        path_hash = md5(path.encode('utf-8')).hexdigest()
+
+        return f'{self.key_prefix}:{user.pk}:{path_hash}'
+
+    def get(self, user, path, base=None):
+        self.flush_if_overdue()
+
+        entry = self.cache.get(self.get_key(user, path))
+        instrumentation.record_cache_lookup(entry is not None)
+        if entry == DISCARDED:
+            return None
+        if entry is not None:
+            return decode_work(entry['work'], base)
+
+        return super().get(user, path, base)
+
+    def next_slot(self):
+        try:
+            return self.cache.incr(self.last_slot_key)
+        except ValueError:
+            # Never used, or evicted; carry on from the last flushed.
+            self.cache.add(
+                self.last_slot_key,
+                self.cache.get(self.flushed_slot_key, 0),
+                None,
+            )
+
+            return self.cache.incr(self.last_slot_key)
+
+    def stash(self, user, path, work, base=None):
+        key = self.get_key(user, path)
+        entry = {
+            'user_id': user.pk,
+            'path': path,
+            'work': self.encode(work, base),
+            'updated': timezone.now(),
+        }
+        self.cache.set(key, entry, self.timeout)
+
+        slot = self.next_slot()
+        if not self.cache.add(
+                self.get_slot_key(slot), (key, time.time()), self.timeout):
+            # A flush gave up waiting for this slot, so write it
+            # ourselves.
+            super().stash(user, path, work, base)
+
+            return
+
+        if slot - self.cache.get(self.flushed_slot_key, 0) >= (
+                self.flush_batch_size):
+            self.flush()
+        else:
+            self.flush_if_overdue()
+
+    def discard(self, user, path):
+        # Rather than deleting the entry, which any slot left logging it
+        # would then be skipped for, mark it discarded, so a flush
+        # already writing it knows to delete it again.  Done before
+        # deleting from the database, so one of us always has the last
+        # word.
+        self.cache.set(self.get_key(user, path), DISCARDED, self.timeout)
+
+        super().discard(user, path)
+
+    def flush_if_overdue(self):
+        flushed = self.cache.get(self.flushed_slot_key, 0)
+        oldest = self.cache.get(self.get_slot_key(flushed + 1))
+        if oldest is None or oldest == SKIPPED:
+            return
+
+        _key, stashed = oldest
+        if time.time() - stashed >= self.flush_after:
+            self.flush()
+
+    def flush(self):
+        if not self.cache.add(self.flush_lock_key, 1, self.flush_lock_timeout):
+            # Another process is flushing.
+            return
+
+        try:
+            self.flush_slots()
+        finally:
+            self.cache.delete(self.flush_lock_key)
+
+    def flush_slots(self):
+        flushed = self.cache.get(self.flushed_slot_key, 0)
+        last = self.cache.get(self.last_slot_key, 0)
+        if last <= flushed:
+            return
+
+        slot_keys = [
+            self.get_slot_key(slot) for slot in range(flushed + 1, last + 1)
+        ]
+        slots = self.cache.get_many(slot_keys)
+        for slot_key in slot_keys:
+            # Numbered but not yet written; skip it, unless its stash
+            # gets there first.  Skipped slots are left to expire, so
+            # their stashes know to write to the database themselves.
+            if slot_key not in slots and not self.cache.add(
+                    slot_key, SKIPPED, self.timeout):
+                slots[slot_key] = self.cache.get(slot_key)
+
+        logged = {
+            slot_key: slot for slot_key, slot in slots.items()
+            if slot is not None and slot != SKIPPED
+        }
+        keys = {key for key, _stashed in logged.values()}
+        entries = {
+            key: entry for key, entry
+            in self.cache.get_many(list(keys)).items()
+            if entry != DISCARDED
+        }
+        if entries:
+            self.write(entries.values())
+
+            # Anything discarded whilst we were writing it was possibly
+            # deleted from the database before we wrote it back.
+            discarded = [
+                entries[key] for key, entry
+                in self.cache.get_many(list(entries)).items()
+                if entry == DISCARDED
+            ]
+            if discarded:
+                self.delete(discarded)
+
+        self.cache.set(self.flushed_slot_key, last, None)
+        self.cache.delete_many(list(logged))
+
+    def delete(self, entries):
+        condition = Q()
+        for entry in entries:
+            condition |= Q(user=entry['user_id'], path=entry['path'])
+
+        UnsavedWork.objects.filter(condition).delete()
+
+    def write(self, entries):
+        users = {entry['user_id'] for entry in entries}
+        paths = {entry['path'] for entry in entries}
+        with transaction.atomic():
+            existing = {
+                (user_id, path): pk for pk, user_id, path
+                in UnsavedWork.objects.filter(
+                    user__in=users,
+                    path__in=paths,
+                ).values_list('pk', 'user', 'path')
+            }
+
+            new = []
+            for entry in entries:
+                pk = existing.get((entry['user_id'], entry['path']))
+                if pk is None:
+                    new.append(UnsavedWork(
+                        user_id=entry['user_id'],
+                        path=entry['path'],
+                        work=entry['work'],
+                    ))
+                else:
+                    UnsavedWork.objects.filter(pk=pk).update(
+                        work=entry['work'],
+                        updated=entry['updated'],
+                    )
+
+            UnsavedWork.objects.bulk_create(new)
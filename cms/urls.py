@@ -5,14 +5,26 @@ from .views import (
     AddBlockOfTypeView,
     AddPageView,
     AddReferenceView,
+    ApiBlockListView,
+    ApiChangeListView,
+    ApiChildListView,
+    ApiPageListView,
+    ApiPageView,
+    BlockAutocompleteView,
     DeleteBlockView,
     DeletePageView,
+    DeletionJobView,
     DeleteReferenceView,
     EditBlockView,
+    ExportView,
     HomeView,
+    InstrumentationView,
+    MetricsView,
     MoveBlockView,
     MovePageView,
+    PageSearchView,
     PathPageView,
+    SearchView,
     UUIDPageView,
 )
 
@@ -21,6 +33,7 @@ app_name = 'cms'
 
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
+    path('search/', SearchView.as_view(), name='search'),
     path('add-page/', AddPageView.as_view(), name='add_page'),
     path('move-page/<int:pk>/', MovePageView.as_view(), name='move_page'),
     path(
@@ -28,6 +41,11 @@ urlpatterns = [
         DeletePageView.as_view(),
         name='delete_page',
     ),
+    path(
+        'deletion-job/<int:pk>/',
+        DeletionJobView.as_view(),
+        name='deletion_job',
+    ),
     path('add-block/', AddBlockView.as_view(), name='add_block'),
     path(
         'add-block-of-type/',
@@ -41,6 +59,42 @@ urlpatterns = [
         DeleteBlockView.as_view(),
         name='delete_block',
     ),
+    path('page-search/', PageSearchView.as_view(), name='page_search'),
+    path(
+        'block-autocomplete/',
+        BlockAutocompleteView.as_view(),
+        name='block_autocomplete',
+    ),
+    path(
+        'instrumentation/',
+        InstrumentationView.as_view(),
+        name='instrumentation',
+    ),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('export/', ExportView.as_view(), name='export'),
+    path('api/pages/', ApiPageListView.as_view(), name='api_pages'),
+    path('api/pages/<int:pk>/', ApiPageView.as_view(), name='api_page'),
+    path(
+        'api/pages/<uuid:uuid>/',
+        ApiPageView.as_view(),
+        name='api_uuid_page',
+    ),
+    path(
+        'api/pages/<int:pk>/blocks/',
+        ApiBlockListView.as_view(),
+        name='api_page_blocks',
+    ),
+    path(
+        'api/pages/<int:pk>/children/',
+        ApiChildListView.as_view(),
+        name='api_page_children',
+    ),
+    path('api/changes/', ApiChangeListView.as_view(), name='api_changes'),
+    path(
+        'api/paths/<path:path>/',
+        ApiPageView.as_view(),
+        name='api_path_page',
+    ),
     path('add-reference/', AddReferenceView.as_view(), name='add_reference'),
     path(
         'delete-reference/<int:pk>/',
@@ -1,23 +1,35 @@
-import json
 from urllib.parse import unquote, urlencode
 
-from django.contrib.admin.utils import NestedObjects
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.core.exceptions import ImproperlyConfigured
-from django.db.models import ProtectedError
-from django.http import HttpResponseBadRequest, HttpResponseRedirect
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Count, ProtectedError, Q
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
     FormView,
-    ListView,
+    TemplateView,
     UpdateView,
     View,
 )
 
+from . import api, instrumentation, metrics
+from .api import InvalidFields
+from .caching import get_or_set, make_tree_key
+from .exporting import export_site
 from .forms import (
     BlockTypeChoiceForm,
     MoveBlockForm,
@@ -26,7 +38,15 @@ from .forms import (
     ReferenceForm,
     TextBlockForm,
 )
-from .models import Block, Page, Reference, TextBlock, UnsavedWork
+from .models import (
+    Block,
+    DeletionJob,
+    Page,
+    Reference,
+    TextBlock,
+    UnsavedWork,
+)
+from .pagination import InvalidCursor, paginate
 
 
 class StaffOnlyMixin(UserPassesTestMixin):
@@ -38,11 +58,21 @@ class StaffOnlyMixin(UserPassesTestMixin):
 class PageView(DetailView):
     model = Page
     context_object_name = 'page'
+    queryset = Page.objects.live()
 
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(*args, **kwargs)
 
         context['breadcrumbs'] = self.object.get_breadcrumbs()
+        # Loaded once for both the table of contents and the content.
+        context['blocks'] = list(
+            self.object.blocks.published().order_by('position'),
+        )
+        # Readers on the fast path have no session to look staff up in.
+        context['editing'] = (
+            not getattr(self.request, 'cms_reader', False)
+            and self.request.user.is_staff
+        )
 
         return context
 
@@ -103,11 +133,23 @@ class UnsavedWorkMixin(object):
     alternate_submit_button_name = None
     alternate_success_url = None
 
+    def get_unsaved_work_storage(self):
+        return UnsavedWork._meta.app_config.unsaved_work_storage
+
+    def get_unsaved_work_base(self):
+        """
+        Returns a `dict` of the values the form started with, which
+        stashed work is stored as a diff against, or `None`.
+        """
+
+        return None
+
     def stash_unsaved_work(self, request):
-        UnsavedWork.objects.update_or_create(
-            user=request.user,
-            path=request.get_raw_uri(),
-            defaults={'work': json.dumps(self.request.POST)},
+        self.get_unsaved_work_storage().stash(
+            request.user,
+            request.get_raw_uri(),
+            self.request.POST.dict(),
+            base=self.get_unsaved_work_base(),
         )
 
     def post(self, request, *args, **kwargs):
@@ -139,34 +181,26 @@ class UnsavedWorkMixin(object):
         return self.alternate_success_url
 
     def get_unsaved_work(self):
-        try:
-            unsaved_work = UnsavedWork.objects.get(
-                user=self.request.user,
-                path=self.request.get_raw_uri(),
-            )
-        except UnsavedWork.DoesNotExist:
-            return None
-        else:  # noexcept
-            if unsaved_work.fresh:
-                return unsaved_work
-            else:
-                UnsavedWork.objects.delete_old_unsaved_work()
-
-                return None
+        return self.get_unsaved_work_storage().get(
+            self.request.user,
+            self.request.get_raw_uri(),
+            base=self.get_unsaved_work_base(),
+        )
 
     def get_initial(self):
         initial = super().get_initial()
 
         unsaved_work = self.get_unsaved_work()
         if unsaved_work is not None:
-            initial.update(json.loads(unsaved_work.work))
+            initial.update(unsaved_work)
 
         return initial
 
     def form_valid(self, form):
-        unsaved_work = self.get_unsaved_work()
-        if unsaved_work is not None:
-            unsaved_work.delete()
+        self.get_unsaved_work_storage().discard(
+            self.request.user,
+            self.request.get_raw_uri(),
+        )
 
         return super().form_valid(form)
 
@@ -183,6 +217,11 @@ class GetCurrentURLMixin(object):
 class AddReferenceMixin(GetCurrentURLMixin, UnsavedWorkMixin):
     alternate_submit_button_name = 'addReference'
 
+    def get_unsaved_work_base(self):
+        block = getattr(self, 'object', None) or self.get_object()
+
+        return {block.content_field: block.get_content()}
+
     def get_alternate_success_url(self):
         parameters = {
             'block_id': self.get_object().id,
@@ -251,8 +290,6 @@ class AddGenericBlockOfTypeBaseView(AddReferenceMixin, CreateView):
     def form_valid(self, form):
         form.instance.publish()
 
-        self.model.objects.delete_old_unpublished()
-
         return super().form_valid(form)
 
 
@@ -275,6 +312,220 @@ class AddBlockOfTypeView(StaffOnlyMixin, View):
         return self.handlers[blocktype](request, *args, **kwargs)
 
 
+class BlockAutocompleteView(StaffOnlyMixin, View):
+    """
+    Lists the `Block`s on the `Page` given by `forward` whose labels
+    start with `q`, in order.
+    """
+
+    limit = 20
+
+    def get(self, request, *args, **kwargs):
+        try:
+            page_id = int(request.GET.get('forward', ''))
+        except ValueError:
+            return JsonResponse({'results': []})
+
+        # A range over the case-folded label rather than `istartswith`,
+        # which is a `LIKE`, so can't use the index.
+        q = request.GET.get('q', '').casefold()
+        blocks = Block.objects.non_polymorphic().filter(
+            parent_page=page_id,
+            search_label__gte=q,
+            search_label__lt=f'{q}\uffff',
+        ).order_by('position')
+
+        return JsonResponse({
+            'results': [
+                {'id': block_id, 'label': label or f'Block {block_id}'}
+                for block_id, label
+                in blocks.values_list('id', 'label')[:self.limit]
+            ],
+        })
+
+
+class PageSearchView(StaffOnlyMixin, View):
+    """
+    Lists live `Page`s matching `q`, in the order `PageQuerySet.search()`
+    gives, `limit` at a time.  Pass the returned `next` cursor as
+    `cursor` for more.
+    """
+
+    limit = 20
+
+    def get(self, request, *args, **kwargs):
+        pages = Page.objects.search(request.GET.get('q', ''))
+
+        try:
+            pages, next_cursor = paginate(
+                pages,
+                pages.query.order_by,
+                cursor=request.GET.get('cursor'),
+                limit=self.limit,
+            )
+        except InvalidCursor:
+            return HttpResponseBadRequest('Malformed cursor')
+
+        return JsonResponse({
+            'results': [{'id': page.id, 'label': str(page)} for page in pages],
+            'next': next_cursor,
+        })
+
+
+class ApiView(View):
+    """
+    The read-only JSON API, for headless front ends; see `cms.api`.
+    Lists are `limit` at a time.
+    """
+
+    limit = 50
+
+    def get_data(self):
+        raise NotImplementedError()
+
+    def get(self, request, *args, **kwargs):
+        try:
+            data = self.get_data()
+        except InvalidCursor:
+            return HttpResponseBadRequest('Malformed cursor')
+        except InvalidFields as e:
+            return HttpResponseBadRequest(str(e))
+
+        return JsonResponse(data)
+
+    def get_cursor(self):
+        return self.request.GET.get('cursor')
+
+
+class ApiPageListView(ApiView):
+    """
+    Lists the top level `Page`s.
+    """
+
+    def get_data(self):
+        return api.serialise_pages(
+            Page.objects.live().filter(parent=None),
+            self.request.GET,
+            cursor=self.get_cursor(),
+            limit=self.limit,
+        )
+
+
+class ApiPageView(ApiView):
+    """
+    A `Page`, looked up by ID, UUID or path.
+    """
+
+    def get_page(self):
+        pages = Page.objects.live()
+        if 'path' in self.kwargs:
+            *parents, slug = self.kwargs['path'].strip('/').split('/')
+
+            return get_object_or_404(
+                pages,
+                denormalised_path='/'.join(parents),
+                slug=slug,
+            )
+
+        if 'uuid' in self.kwargs:
+            return get_object_or_404(pages, uuid=self.kwargs['uuid'])
+
+        return get_object_or_404(pages, pk=self.kwargs['pk'])
+
+    def get_data(self):
+        return api.serialise_page(
+            self.get_page(),
+            self.request.GET,
+            limit=self.limit,
+        )
+
+
+class ApiBlockListView(ApiPageView):
+    """
+    Lists a `Page`'s published `Block`s, in order.
+    """
+
+    def get_data(self):
+        return api.serialise_blocks(
+            self.get_page(),
+            self.request.GET,
+            cursor=self.get_cursor(),
+            limit=self.limit,
+        )
+
+
+class ApiChildListView(ApiPageView):
+    """
+    Lists a `Page`'s children.
+    """
+
+    def get_data(self):
+        return api.serialise_pages(
+            self.get_page().children.live(),
+            self.request.GET,
+            cursor=self.get_cursor(),
+            limit=self.limit,
+        )
+
+
+class ApiChangeListView(ApiView):
+    """
+    The change feed: `ChangeEvent`s after the `seq` passed as `since`.
+    Follow it by passing `next`, or once caught up, the last `seq`.
+    """
+
+    def get_data(self):
+        return api.serialise_changes(
+            self.request.GET.get('since', 0),
+            limit=self.limit,
+        )
+
+
+class ExportView(StaffOnlyMixin, View):
+    """
+    Streams the whole site as JSON lines, for `manage.py import_site`,
+    as of a single moment; see `cms.exporting`.
+    """
+
+    def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(
+            export_site(),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
+        filename = f'site-{timezone.now():%Y%m%d}.jsonl'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+        return response
+
+
+class InstrumentationView(StaffOnlyMixin, View):
+    """
+    Lists the totals and means `InstrumentationMiddleware` has gathered
+    per view, for this process.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(instrumentation.view_aggregates.snapshot())
+
+
+class MetricsView(View):
+    """
+    Exposes `cms.metrics` for Prometheus to scrape, to the addresses in
+    `CmsConfig.metrics_allowed_ips`.
+    """
+
+    def get(self, request, *args, **kwargs):
+        allowed_ips = Page._meta.app_config.metrics_allowed_ips
+        if allowed_ips is not None and (
+                request.META.get('REMOTE_ADDR') not in allowed_ips):
+            raise PermissionDenied()
+
+        return HttpResponse(
+            metrics.registry.expose(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
 class PolymorphicTemplateNameOverrideMixin(object):
 
     def get_template_names(self):
@@ -341,6 +592,7 @@ class AddPageView(StaffOnlyMixin, CreateView):
 
 class MovePageView(StaffOnlyMixin, UpdateView):
     model = Page
+    queryset = Page.objects.live()
     form_class = MovePageForm
     template_name_suffix = '_move_form'
 
@@ -357,57 +609,150 @@ class MoveBlockView(
 
 class DeletePageView(StaffOnlyMixin, DeleteView):
     model = Page
+    queryset = Page.objects.live()
     context_object_name = 'page'
     protected_objects = None
+    children_shown = 50
+    descendants_paginate_by = 50
 
     def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+
         try:
-            return super().delete(request, *args, **kwargs)
+            job = DeletionJob.objects.start(self.object)
         except ProtectedError as e:
             self.protected_objects = e.protected_objects
 
             return self.get(request, *args, **kwargs)
 
+        return HttpResponseRedirect(
+            reverse('cms:deletion_job', kwargs={'pk': job.pk}),
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
         context['protected_objects'] = self.protected_objects
 
-        collector = NestedObjects(using='default')
-        collector.collect([self.object])
-        to_be_deleted = collector.nested()
+        # Everything here is counted or paginated in the database, so
+        # previewing a huge subtree costs the same as a small one.
+        subtree = Page.objects.subtree(self.object)
+        blocks = Block.objects.filter(parent_page__in=subtree).published()
 
-        def remove_unpublished(tree):
-            filtered_tree = []
-            for item in tree:
-                if type(item) == list:
-                    filtered_tree.append(remove_unpublished(item))
+        block_types = (
+            blocks.order_by()
+            .values('polymorphic_ctype')
+            .annotate(count=Count('pk'))
+        )
+        context['block_counts'] = [
+            {
+                'type': ContentType.objects.get_for_id(
+                    block_type['polymorphic_ctype'],
+                ).model_class()._meta.verbose_name_plural,
+                'count': block_type['count'],
+            }
+            for block_type in block_types
+        ]
+        context['page_count'] = subtree.count()
+        context['reference_count'] = Reference.objects.filter(
+            containing_block__in=blocks,
+        ).count()
+        context['unpublished_referee_count'] = (
+            Reference.objects.to_subtree(self.object)
+            .from_unpublished()
+            .exclude(containing_block__parent_page__in=subtree)
+            .count()
+        )
 
-                elif type(item) == Page:
-                    filtered_tree.append(item)
+        published_block_count = Count(
+            'blocks',
+            filter=Q(blocks__published=True),
+        )
 
-                elif issubclass(type(item), Block) and type(item) != Block:
-                    if item.published:
-                        filtered_tree.append(item)
+        children = self.object.children.order_by('title')
+        context['children'] = children.annotate(
+            published_block_count=published_block_count,
+        )[:self.children_shown]
+        context['hidden_children_count'] = max(
+            children.count() - self.children_shown,
+            0,
+        )
 
-                elif type(item) == Reference:
-                    if item.containing_block.published:
-                        filtered_tree.append(item)
+        descendants = (
+            subtree.exclude(pk=self.object.pk)
+            .order_by('denormalised_path', 'slug')
+            .annotate(published_block_count=published_block_count)
+        )
+        paginator = Paginator(descendants, self.descendants_paginate_by)
+        context['descendants'] = paginator.get_page(
+            self.request.GET.get('descendants_page'),
+        )
 
-            return filtered_tree
+        return context
 
-        context['to_be_deleted'] = remove_unpublished(to_be_deleted)
 
-        return context
+class DeletionJobView(StaffOnlyMixin, DetailView):
+    model = DeletionJob
+    context_object_name = 'job'
 
-    def get_success_url(self):
-        if self.object.parent:
-            return self.object.parent.get_absolute_url()
 
-        else:
-            return '/'
+class SearchView(TemplateView):
+    template_name = 'cms/search.html'
+    limit = 20
 
+    def get_context_data(self, **kwargs):
+        search_backend = Page._meta.app_config.search_backend
+        if search_backend is None:
+            raise Http404('Search is turned off')
+
+        query = self.request.GET.get('q', '')
+
+        return super().get_context_data(
+            query=query,
+            results=search_backend.search(query, limit=self.limit),
+            **kwargs,
+        )
+
+
+class HomeView(TemplateView):
+    """
+    Lists the top level `Page`s by title, `paginate_by` at a time, using
+    cursors from `cms.pagination` so later pages cost no more than the
+    first.  Each page of the listing is cached until the tree changes.
+    """
+
+    template_name = 'cms/page_list.html'
+    paginate_by = 100
+
+    def get_pages(self, cursor):
+        def get_uncached_pages():
+            pages = Page.objects.live().filter(parent=None).only(
+                'parent',
+                'title',
+                'slug',
+                'denormalised_path',
+                'denormalised_titles',
+            )
+
+            return paginate(
+                pages,
+                ('title', 'id'),
+                cursor=cursor,
+                limit=self.paginate_by,
+            )
 
-class HomeView(ListView):
-    queryset = Page.objects.filter(parent=None)
-    context_object_name = 'pages'
+        return get_or_set(
+            make_tree_key('root-pages', self.paginate_by, cursor),
+            get_uncached_pages,
+        )
+
+    def get(self, request, *args, **kwargs):
+        try:
+            pages, next_cursor = self.get_pages(request.GET.get('cursor'))
+        except InvalidCursor:
+            return HttpResponseBadRequest('Malformed cursor')
+
+        return self.render_to_response(self.get_context_data(
+            pages=pages,
+            next_cursor=next_cursor,
+        ))
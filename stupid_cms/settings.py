@@ -45,13 +45,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cms.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'cms.middleware.ProfilingMiddleware',
+    'cms.middleware.ReplicaRoutingMiddleware',
+    'cms.middleware.ReaderFastPathMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'stupid_cms.urls'
@@ -82,9 +86,20 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # A stand-in for a read replica, unused unless named in
+    # `CmsConfig.replica_databases`; see `cms.routers`.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
 
+DATABASE_ROUTERS = ['cms.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators